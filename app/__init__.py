@@ -1,12 +1,14 @@
 import os
-import logging
-from flask import Flask, jsonify, request
+import click
+from flask import Flask, jsonify, request, Response
 from flask_jwt_extended import JWTManager, create_access_token
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from app.config import config
-from app.database import init_db
+from app.database import init_db, create_schema, commit_request, rollback_request
+from app.utils.metrics import init_metrics, registry, scrape_allowed, CONTENT_TYPE
 from app.utils.helpers import JSONEncoder
+from app.utils.logs import log_pipeline
 
 # Initialize JWT
 jwt = JWTManager()
@@ -14,8 +16,14 @@ jwt = JWTManager()
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
-def create_app(config_name='dev'):
-    """Create and configure the Flask application"""
+def create_app(config_name='dev', preload=False):
+    """
+    Create and configure the Flask application
+    
+    With preload, the app is being created in a pre-fork master (see
+    app/prefork.py): per-process background threads are not started here
+    but in each forked worker.
+    """
     # Create Flask app
     app = Flask(__name__, 
                 static_folder='../static',
@@ -23,6 +31,12 @@ def create_app(config_name='dev'):
     
     # Load configuration
     app.config.from_object(config)
+    app.config['PRELOADING'] = preload
+    
+    # One of several instances: refuse per-process state (see app/cluster.py)
+    if app.config.get('REQUIRE_SHARED_STATE'):
+        from app.cluster import check_shared_state
+        check_shared_state(app)
     
     # Handle environment variable mapping for FLASK_ENV
     if config_name == 'development':
@@ -38,13 +52,8 @@ def create_app(config_name='dev'):
     app.config['JWT_HEADER_TYPE'] = 'Bearer'
     app.config['JWT_IDENTITY_CLAIM'] = 'sub'
     
-    # Set up logging
-    handler = logging.StreamHandler()
-    handler.setLevel(logging.INFO)
-    app.logger.addHandler(handler)
-    app.logger.setLevel(logging.INFO)
-    
-    app.logger.info(f"App starting with JWT_SECRET_KEY: {app.config['JWT_SECRET_KEY']}")
+    # Set up logging; records are written out by a background thread
+    log_pipeline.init_app(app)
     
     # Ensure COUNTRIES_API_URL is set
     if 'COUNTRIES_API_URL' not in app.config:
@@ -62,6 +71,38 @@ def create_app(config_name='dev'):
     # Initialize rate limiter
     limiter.init_app(app)
     
+    # Initialize metrics instrumentation
+    init_metrics(app)
+    
+    # Initialize the opt-in profiler (installs no hooks when disabled)
+    from app.utils.profiling import profiler
+    profiler.init_app(app)
+    
+    # Build fingerprinted static assets (templates use asset_url())
+    from app.utils.assets import assets, BUILD_DIR
+    assets.init_app(app)
+    
+    # Serve static-content pages from a rendered-page cache
+    from app.utils.pages import page_cache
+    page_cache.init_app(app)
+    
+    # Run bcrypt on a bounded process pool
+    from app.utils.hashing import password_hasher, HashingPoolBusy
+    password_hasher.init_app(app)
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create the database tables"""
+        create_schema(app)
+        app.logger.info('Database tables created')
+    
+    @app.cli.command('build-assets')
+    @click.argument('output_dir', default=os.path.join(app.static_folder, BUILD_DIR))
+    def build_assets_command(output_dir):
+        """Write fingerprinted assets and their manifest to a directory"""
+        count = assets.write(output_dir)
+        app.logger.info('Wrote %s assets to %s', count, output_dir)
+    
     # Add token generation endpoint
     @app.route('/generate-test-token')
     def generate_test_token():
@@ -139,13 +180,32 @@ def create_app(config_name='dev'):
         # Import services and initialize them with the app
         from app.services.countries_service import countries_service
         from app.services.auth_service import auth_service
+        from app.services.usage_service import usage_service
+        from app.services.rate_limit_service import rate_limit_service
         
         # Initialize services with app
         countries_service.init_app(app)
+        auth_service.init_app(app)
+        usage_service.init_app(app)
+        rate_limit_service.init_app(app)
         
         # Import and register blueprints
         from app.routes import register_blueprints
         register_blueprints(app)
+        
+        # API routes are limited per API key rather than per client IP
+        from app.routes.api_routes import api_bp
+        limiter.exempt(api_bp)
+    
+    # Time requests end to end and record the result on API usage logs
+    from app.utils.timing import start_request_timer
+    from app.utils.security import finalize_api_usage
+    app.before_request(start_request_timer)
+    # after_request hooks run in reverse order: usage records are completed,
+    # then the request's changes are committed once, before responding
+    app.after_request(commit_request)
+    app.after_request(finalize_api_usage)
+    app.teardown_request(rollback_request)
     
     # Configure error handlers
     @app.errorhandler(404)
@@ -154,9 +214,13 @@ def create_app(config_name='dev'):
     
     @app.errorhandler(500)
     def internal_error(error):
-        app.logger.error(f"Internal server error: {str(error)}")
+        app.logger.error('Internal server error: %s', error)
         return jsonify({'error': 'Internal server error'}), 500
     
+    @app.errorhandler(HashingPoolBusy)
+    def hashing_busy(error):
+        return jsonify({'error': 'Server is busy, please retry shortly'}), 503, {'Retry-After': '1'}
+    
     @app.route('/health')
     def health_check():
         """Health check endpoint"""
@@ -166,10 +230,18 @@ def create_app(config_name='dev'):
             'jwt_secret': app.config['JWT_SECRET_KEY'][:5] + '...'
         })
     
+    @app.route('/metrics')
+    @limiter.exempt
+    def metrics():
+        """Prometheus metrics endpoint"""
+        if not scrape_allowed(app.config.get('METRICS_TOKEN')):
+            return jsonify({'error': 'Forbidden'}), 403
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+    
     # JWT error handlers
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
-        app.logger.warning(f"Expired token: {jwt_payload}")
+        app.logger.warning('Expired token: %s', jwt_payload)
         return jsonify({
             'message': 'The token has expired',
             'error': 'token_expired'
@@ -177,7 +249,7 @@ def create_app(config_name='dev'):
     
     @jwt.invalid_token_loader
     def invalid_token_callback(error):
-        app.logger.warning(f"Invalid token: {error}")
+        app.logger.warning('Invalid token: %s', error)
         return jsonify({
             'message': 'Signature verification failed',
             'error': 'invalid_token'
@@ -185,7 +257,7 @@ def create_app(config_name='dev'):
     
     @jwt.unauthorized_loader
     def missing_token_callback(error):
-        app.logger.warning(f"Missing token: {error}")
+        app.logger.warning('Missing token: %s', error)
         return jsonify({
             'message': 'Request does not contain an access token',
             'error': 'authorization_required'
@@ -0,0 +1,336 @@
+"""
+Async (ASGI) serving mode
+
+The /api/v1 country routes are served on an event loop: upstream requests
+go through a pooled httpx.AsyncClient, so a worker waiting on the
+RestCountries API is not tied up for the round trip, and concurrent
+misses for the same upstream endpoint share a single request. API key
+validation, rate limiting and usage records use the same synchronous
+code as the Flask routes, run on a bounded thread pool.
+
+Every other path is handed to the Flask app through asgiref's WSGI
+adapter, so one server exposes the whole API:
+    
+    uvicorn --factory app.asgi:create_asgi_app --workers 4
+"""
+import re
+import time
+import asyncio
+import contextvars
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+from app.database import db
+from app.services.countries_service import countries_service, split_codes, merge_countries, unavailable_error
+from app.utils.security import (
+    authorize_api_key, record_api_usage, complete_api_usage, MISSING_API_KEY_ERROR
+)
+from app.utils.helpers import paginate_results, dumps
+from app.utils.validators import sanitize_string
+from app.utils.timing import phase, start_request_timer, request_elapsed_ms, get_phase_timings
+from app.utils.metrics import (
+    registry, http_requests_total, http_request_duration_seconds,
+    upstream_requests_total, upstream_request_duration_seconds
+)
+
+Route = namedtuple('Route', 'pattern view endpoint paginate multi error_status error')
+
+# Country routes served natively, mirroring app/routes/api_routes.py
+ROUTES = (
+    Route(re.compile(r'/api/v1/countries/?'), 'get_all_countries',
+          'all', True, False, 500, 'Failed to retrieve countries'),
+    Route(re.compile(r'/api/v1/countries/currency/([^/]+)'), 'get_countries_by_currency',
+          'currency/{}', True, True, 404, 'No countries found with currency: {}'),
+    Route(re.compile(r'/api/v1/countries/language/([^/]+)'), 'get_countries_by_language',
+          'lang/{}', True, True, 404, 'No countries found with language: {}'),
+    Route(re.compile(r'/api/v1/countries/region/([^/]+)'), 'get_countries_by_region',
+          'region/{}', True, True, 404, 'No countries found in region: {}'),
+    Route(re.compile(r'/api/v1/countries/(?!changes$)([^/]+)'), 'get_country_by_name',
+          'name/{}', False, False, 404, 'Country not found: {}')
+)
+
+class AsyncCountriesApp:
+    """ASGI application serving the country routes asynchronously"""
+    
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.base_url = flask_app.config.get('COUNTRIES_API_URL', 'https://restcountries.com/v3.1')
+        self.timeout = flask_app.config.get('ASYNC_UPSTREAM_TIMEOUT', 10.0)
+        self.max_connections = flask_app.config.get('ASYNC_UPSTREAM_MAX_CONNECTIONS', 100)
+        self.executor = ThreadPoolExecutor(
+            max_workers=flask_app.config.get('ASYNC_DB_THREADS', 16),
+            thread_name_prefix='asgi-db'
+        )
+        self.client = None
+        self._inflight = {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            for route in ROUTES:
+                match = route.pattern.fullmatch(scope['path'])
+                if match:
+                    await self._serve(scope, send, route, *match.groups())
+                    return
+        
+        await self.wsgi(scope, receive, send)
+    
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._get_client()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    def _get_client(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self.client
+    
+    async def aclose(self):
+        """Close the upstream connection pool and the database threads"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        self.executor.shutdown(wait=False)
+    
+    async def _run_sync(self, func, *args):
+        """Run blocking (database) work on the thread pool in this context"""
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, context.run, self._in_thread, func, *args)
+    
+    @staticmethod
+    def _in_thread(func, *args):
+        try:
+            return func(*args)
+        finally:
+            # Sessions are scoped per thread; do not carry one over to
+            # the next request served by this thread
+            db.session.remove()
+    
+    @staticmethod
+    def _authorize(api_key, path, ip_address, user_agent):
+        key, error, status_code, limit_headers = authorize_api_key(api_key)
+        if error is not None:
+            return error, status_code, limit_headers, None
+        
+        usage = record_api_usage(key, path, 'GET', ip_address, user_agent)
+        # The record is completed from another thread once the response is sent
+        db.session.commit()
+        return None, 200, limit_headers, usage.id
+    
+    async def _fetch(self, endpoint):
+        """Fetch an upstream endpoint, sharing one request between concurrent callers"""
+        task = self._inflight.get(endpoint)
+        if task is None:
+            task = asyncio.ensure_future(self._request(endpoint))
+            self._inflight[endpoint] = task
+            task.add_done_callback(lambda _: self._inflight.pop(endpoint, None))
+        
+        with phase('upstream'):
+            return await asyncio.shield(task)
+    
+    async def _lookup(self, endpoint):
+        """
+        Get filtered countries for an upstream endpoint, using the shared caches
+        
+        Returns (countries, failed) like CountriesService._lookup
+        """
+        countries = countries_service.get_cached(endpoint)
+        if countries is not None or countries_service.is_missing(endpoint):
+            return countries, False
+        
+        data, live = await self._fetch(endpoint)
+        if isinstance(data, dict) and data.get('status') == 404:
+            return None, False
+        countries = countries_service.store(endpoint, data, live)
+        return countries, countries is None
+    
+    async def _lookup_codes(self, template, codes):
+        """
+        Look up several codes concurrently within the fan-out deadline
+        
+        Returns (countries, failed, timed_out) like CountriesService.get_countries_for_codes
+        """
+        if len(codes) <= 1:
+            countries, failed = await self._lookup(template.format(codes[0])) if codes else (None, False)
+            return countries, codes if failed else [], []
+        
+        tasks = [asyncio.ensure_future(self._lookup(template.format(code))) for code in codes]
+        done, pending = await asyncio.wait(tasks, timeout=countries_service.fanout_deadline)
+        
+        results = []
+        failed = []
+        timed_out = []
+        for code, task in zip(codes, tasks):
+            if task in pending:
+                task.cancel()
+                timed_out.append(code)
+            elif task.exception() is not None or task.result()[1]:
+                failed.append(code)
+            elif task.result()[0] is not None:
+                results.append(task.result()[0])
+        
+        return (merge_countries(results) if results else None), failed, timed_out
+    
+    async def _request(self, endpoint):
+        """
+        Request an upstream endpoint, using the response store like CountriesService
+        
+        Returns (data, live) like CountriesService._make_request
+        """
+        stored = None
+        if countries_service.response_store is not None:
+            stored = await self._run_sync(countries_service.get_stored, endpoint)
+            if stored is not None and stored.fresh():
+                return stored.data, False
+        
+        url = f"{self.base_url}/{endpoint}"
+        headers = {'If-None-Match': stored.etag} if stored is not None and stored.etag else None
+        start = time.perf_counter()
+        outcome = 'success'
+        
+        try:
+            response = await self._get_client().get(url, headers=headers)
+            if stored is not None and response.status_code == 304:
+                outcome = 'not_modified'
+                await self._run_sync(countries_service.revalidated, endpoint)
+                return stored.data, True
+            response.raise_for_status()
+            data = response.json()
+            if countries_service.response_store is not None:
+                await self._run_sync(countries_service.save_response, endpoint,
+                                     response.content, response.headers.get('etag'))
+            return data, True
+        except httpx.HTTPStatusError as e:
+            outcome = f'http_{e.response.status_code}'
+            self.flask_app.logger.error('Countries API error: %s', e)
+            if e.response.status_code == 404:
+                countries_service.remember_missing(endpoint)
+                return {'error': str(e), 'status': 404}, False
+            if stored is not None and e.response.status_code >= 500:
+                return stored.data, False
+        except (httpx.HTTPError, ValueError) as e:
+            outcome = 'error'
+            self.flask_app.logger.error('Countries API error: %s', e)
+            if stored is not None:
+                return stored.data, False
+        finally:
+            upstream_requests_total.inc(outcome=outcome)
+            upstream_request_duration_seconds.observe(time.perf_counter() - start, outcome=outcome)
+        return None, False
+    
+    async def _handle(self, scope, route, value):
+        """Return (status, body, headers, usage_id) for a country route"""
+        headers = {name.decode('latin-1').lower(): v.decode('latin-1') for name, v in scope['headers']}
+        args = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        
+        api_key = headers.get('x-api-key') or args.get('api_key', [None])[0]
+        if not api_key:
+            return 401, MISSING_API_KEY_ERROR, {}, None
+        
+        client = scope.get('client')
+        error, status_code, limit_headers, usage_id = await self._run_sync(
+            self._authorize, api_key, scope['path'],
+            client[0] if client else None, headers.get('user-agent')
+        )
+        if error is not None:
+            return status_code, error, limit_headers, None
+        
+        if value is not None:
+            value = sanitize_string(value)
+        codes = split_codes(value) if route.multi else [value]
+        
+        if len(codes) > countries_service.max_codes:
+            return 400, {
+                'error': True,
+                'message': f'At most {countries_service.max_codes} codes can be requested at once'
+            }, limit_headers, usage_id
+        
+        countries, failed, timed_out = await self._lookup_codes(route.endpoint, codes)
+        
+        unavailable = unavailable_error(failed, timed_out) if route.multi else None
+        if unavailable is not None:
+            return unavailable['status'], {
+                'error': True,
+                'message': unavailable['error']
+            }, limit_headers, usage_id
+        
+        if not countries and (countries is None or not route.paginate):
+            return route.error_status, {
+                'error': True,
+                'message': route.error.format(value)
+            }, limit_headers, usage_id
+        
+        if route.paginate:
+            page = _int_arg(args, 'page', 1)
+            per_page = _int_arg(args, 'per_page', 20)
+            return 200, paginate_results(countries, page, per_page), limit_headers, usage_id
+        return 200, countries, limit_headers, usage_id
+    
+    async def _serve(self, scope, send, route, value=None):
+        with self.flask_app.app_context():
+            start_request_timer()
+            usage_id = None
+            
+            try:
+                status, data, headers, usage_id = await self._handle(scope, route, value)
+            except Exception as e:
+                self.flask_app.logger.error('Error in %s: %s', route.view, e)
+                status, data, headers = 500, {'error': True, 'message': 'Internal server error'}, {}
+            
+            with phase('serialize'):
+                body = dumps(data).encode('utf-8')
+            
+            raw_headers = [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('latin-1'))
+            ]
+            raw_headers += [(name.lower().encode('latin-1'), str(v).encode('latin-1'))
+                            for name, v in headers.items()]
+            await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+            await send({'type': 'http.response.body', 'body': body})
+            
+            elapsed_ms = request_elapsed_ms()
+            endpoint = f'api.{route.view}'
+            http_requests_total.inc(blueprint='api', endpoint=endpoint, method='GET', status=status)
+            http_request_duration_seconds.observe(elapsed_ms / 1e3, blueprint='api', endpoint=endpoint)
+            registry.maybe_flush()
+            
+            # Complete the usage record once the response has been sent
+            if usage_id is not None:
+                values = {'status_code': status, 'response_time_ms': int(round(elapsed_ms))}
+                for name, duration_ms in get_phase_timings().items():
+                    values[f'{name}_ms'] = round(duration_ms, 3)
+                try:
+                    await self._run_sync(complete_api_usage, usage_id, values)
+                except Exception as e:
+                    self.flask_app.logger.error('Error finalizing API usage: %s', e)
+
+def _int_arg(args, name, default):
+    try:
+        return int(args[name][0])
+    except (KeyError, ValueError):
+        return default
+
+def create_asgi_app(config_name='dev'):
+    """Create the ASGI application (use with uvicorn --factory)"""
+    return AsyncCountriesApp(create_app(config_name))
@@ -0,0 +1,108 @@
+"""
+Multi-node deployment
+
+Any number of workers, on any number of hosts, can serve the API behind
+one load balancer as long as the state they must agree on is not kept in
+a single process. That state goes through configurable backends:
+
+- DATABASE_URL: users, API keys (and so revocation), usage records and
+  the versions of the countries change feed
+- RATELIMIT_STORAGE_URL: the per-IP limits of the web and auth routes
+- API_KEY_RATELIMIT_STORAGE_URI: per-API-key rate limits and quotas
+- SHARED_CACHE_URL: cached user identities, so invalidating one after a
+  change reaches every worker
+
+Started with FLASK_ENV=cluster (or REQUIRE_SHARED_STATE=true), the app
+refuses to start while any of these is per process (memory://, an
+in-memory database) or a SQLite file at a relative path, which every
+instance would resolve to a file of its own:
+    
+    FLASK_ENV=cluster \\
+    DATABASE_URL=postgresql://db/countries \\
+    RATELIMIT_STORAGE_URL=redis://cache:6379/0 \\
+    API_KEY_RATELIMIT_STORAGE_URI=redis://cache:6379/1 \\
+    SHARED_CACHE_URL=redis://cache:6379/2 \\
+    gunicorn -c gunicorn.conf.py
+
+SQLite files at absolute paths are accepted; they are shared by all
+workers of one host, not across hosts. Cached upstream country data
+stays per process: it is the same on every instance and each one
+refreshes it on its own TTL.
+
+The drivers of these backends are not in requirements.txt; install them
+with `pip install -r requirements-cluster.txt`. A missing driver is
+reported at startup rather than on the first request that needs it.
+"""
+from importlib.util import find_spec
+
+# Module and package needed by each URI scheme
+DRIVERS = {
+    'postgresql': ('psycopg2', 'psycopg2-binary'),
+    'postgresql+psycopg2': ('psycopg2', 'psycopg2-binary'),
+    'redis': ('redis', 'redis'),
+    'rediss': ('redis', 'redis'),
+    'memcached': ('pymemcache', 'pymemcache')
+}
+
+def sqlite_path(uri):
+    """Database path of a sqlite:// URI ('' for an in-memory database), or None"""
+    if not uri.startswith('sqlite:'):
+        return None
+    path = uri[len('sqlite:///'):] if uri.startswith('sqlite:///') else ''
+    return '' if path == ':memory:' else path
+
+def is_per_process(uri):
+    """Whether a storage URI keeps its state in the process (or a relative file)"""
+    if uri.startswith('memory://'):
+        return True
+    path = sqlite_path(uri)
+    return path is not None and not path.startswith('/')
+
+def per_process_state(config):
+    """
+    Settings that keep shared state per process
+    
+    Returns:
+        list: One message per offending setting (empty if none)
+    """
+    problems = []
+    for name, uri in _storage_uris(config):
+        if is_per_process(uri):
+            problems.append(f'{name} ({uri}) is not shared between instances')
+    return problems
+
+def missing_drivers(config):
+    """
+    Settings whose backend driver is not installed
+    
+    Returns:
+        list: One message per offending setting (empty if none)
+    """
+    problems = []
+    for name, uri in _storage_uris(config):
+        scheme = uri.split('://', 1)[0].lower()
+        module, package = DRIVERS.get(scheme, (None, None))
+        if module and find_spec(module) is None:
+            problems.append(f'{name} ({scheme}://) needs the {package} package '
+                            '(pip install -r requirements-cluster.txt)')
+    return problems
+
+def _storage_uris(config):
+    """(setting, URI) of each shared-state backend in use"""
+    checks = [
+        ('SQLALCHEMY_DATABASE_URI', True),
+        ('DATABASE_REPLICA_URL', bool(config.get('DATABASE_REPLICA_URL'))),
+        ('RATELIMIT_STORAGE_URL', config.get('RATELIMIT_ENABLED', True)),
+        ('API_KEY_RATELIMIT_STORAGE_URI', config.get('API_KEY_RATELIMIT_ENABLED', True)),
+        ('SHARED_CACHE_URL', config.get('USER_CACHE_TTL', 30) > 0)
+    ]
+    return [(name, config.get(name) or 'memory://') for name, in_use in checks if in_use]
+
+def check_shared_state(app):
+    """
+    Raise RuntimeError if any state the instances must agree on is per
+    process, or its backend's driver is not installed
+    """
+    problems = per_process_state(app.config) + missing_drivers(app.config)
+    if problems:
+        raise RuntimeError('Shared state is required: ' + '; '.join(problems))
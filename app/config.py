@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -9,6 +10,12 @@ class Config:
     # Database configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///countries_api.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Optional read replica: reads marked read_only() go there, and may lag
+    # the primary by up to DATABASE_REPLICA_MAX_LAG seconds
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL') or None
+    DATABASE_REPLICA_MAX_LAG = float(os.environ.get('DATABASE_REPLICA_MAX_LAG', 5))  # Seconds
+    # Create missing tables on every app start (otherwise run `flask init-db`)
+    AUTO_CREATE_SCHEMA = os.environ.get('AUTO_CREATE_SCHEMA', 'False').lower() == 'true'
     
     # JWT configuration
     JWT_SECRET_KEY = 'secret-key-451544875512781287184'
@@ -16,12 +23,122 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
     # API configuration
-    COUNTRIES_API_URL = 'https://restcountries.com/v3.1'
+    COUNTRIES_API_URL = os.environ.get('COUNTRIES_API_URL', 'https://restcountries.com/v3.1')
+    COUNTRIES_CACHE_TTL = int(os.environ.get('COUNTRIES_CACHE_TTL', 300))  # Seconds
+    COUNTRIES_CACHE_SIZE = int(os.environ.get('COUNTRIES_CACHE_SIZE', 256))  # Entries
+    # Lookups upstream answered with 404, remembered to answer repeats locally
+    NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 60))  # Seconds
+    NEGATIVE_CACHE_SIZE = int(os.environ.get('NEGATIVE_CACHE_SIZE', 1024))  # Entries
+    # Multi-code lookups (e.g. /currency/EUR,USD) run concurrently on a
+    # bounded pool and fail with 504 if not complete within the deadline
+    UPSTREAM_FANOUT_WORKERS = int(os.environ.get('UPSTREAM_FANOUT_WORKERS', 8))
+    UPSTREAM_FANOUT_DEADLINE = float(os.environ.get('UPSTREAM_FANOUT_DEADLINE', 10))  # Seconds
+    UPSTREAM_FANOUT_MAX_CODES = int(os.environ.get('UPSTREAM_FANOUT_MAX_CODES', 10))
+    # Re-fetch /all in the background and diff it (0 disables); changes are
+    # kept in the database for /api/v1/countries/changes
+    COUNTRIES_REFRESH_INTERVAL = int(os.environ.get('COUNTRIES_REFRESH_INTERVAL', 0))  # Seconds
+    COUNTRIES_CHANGE_LOG_SIZE = int(os.environ.get('COUNTRIES_CHANGE_LOG_SIZE', 10000))  # Entries
+    # SQLite file persisting upstream responses across restarts (unset
+    # disables it). Responses older than the TTL are revalidated with
+    # If-None-Match, and served anyway while upstream is unreachable.
+    UPSTREAM_STORE_PATH = os.environ.get('UPSTREAM_STORE_PATH') or None
+    UPSTREAM_STORE_TTL = int(os.environ.get('UPSTREAM_STORE_TTL', 3600))  # Seconds
+    UPSTREAM_STORE_MAX_STALE = int(os.environ.get('UPSTREAM_STORE_MAX_STALE', 7 * 86400))  # Seconds
     
     # Rate limiting
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True').lower() == 'true'
     RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '300/day;30/hour;5/minute')
     RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')
     
+    # Async (ASGI) serving mode: upstream connection pool size and timeout,
+    # and threads for blocking database work
+    ASYNC_UPSTREAM_MAX_CONNECTIONS = int(os.environ.get('ASYNC_UPSTREAM_MAX_CONNECTIONS', 100))
+    ASYNC_UPSTREAM_TIMEOUT = float(os.environ.get('ASYNC_UPSTREAM_TIMEOUT', 10))
+    ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 16))
+    
+    # Cache of users and their API keys for JWT-authenticated routes. It is
+    # per process with memory://, where other workers may serve a changed
+    # user for up to the TTL; sqlite:///<path> shares it between the
+    # workers of a host and redis:// between hosts.
+    SHARED_CACHE_URL = os.environ.get('SHARED_CACHE_URL', 'memory://')
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    # Seconds a successful API key check is remembered (per process), so a
+    # busy key is not checked with bcrypt on every request
+    API_KEY_VERIFY_TTL = int(os.environ.get('API_KEY_VERIFY_TTL', 60))
+    # Seconds an API key's last_used (or a user's last_login) may lag
+    # before it is written again; 0 writes it on every request. Each
+    # write also drops the owner's cached identity.
+    LAST_USED_GRANULARITY = int(os.environ.get('LAST_USED_GRANULARITY', 60))
+    
+    # bcrypt work factor; stored password hashes are upgraded on next login
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    # Worker processes for bcrypt (0 hashes in the request thread), the
+    # number of calls allowed to wait for them before answering 503, and
+    # the seconds a request waits for its hash
+    HASH_POOL_SIZE = int(os.environ.get('HASH_POOL_SIZE', 2))
+    HASH_POOL_MAX_QUEUE = int(os.environ.get('HASH_POOL_MAX_QUEUE', 16))
+    HASH_POOL_TIMEOUT = float(os.environ.get('HASH_POOL_TIMEOUT', 10))
+    HASH_POOL_START_METHOD = os.environ.get('HASH_POOL_START_METHOD') or None
+    
+    # Per-API-key rate limits and quotas for /api/v1, by user plan.
+    # Use a sqlite:/// or redis:// store so all workers share counters.
+    API_KEY_RATELIMIT_ENABLED = os.environ.get('API_KEY_RATELIMIT_ENABLED', 'True').lower() == 'true'
+    API_KEY_RATELIMIT_STORAGE_URI = os.environ.get('API_KEY_RATELIMIT_STORAGE_URI', 'memory://')
+    RATE_LIMIT_DEFAULT_PLAN = 'free'
+    RATE_LIMIT_PLANS = {
+        'free': {'rate': '60/minute', 'daily': 1000, 'monthly': 20000},
+        'pro': {'rate': '600/minute', 'daily': 50000, 'monthly': 1000000},
+        'enterprise': {'rate': '6000/minute', 'daily': None, 'monthly': None}
+    }
+    
+    # Refuse to start while state that workers must agree on is kept per
+    # process or per host (see app/cluster.py)
+    REQUIRE_SHARED_STATE = os.environ.get('REQUIRE_SHARED_STATE', 'False').lower() == 'true'
+    
+    # Pre-fork preloading (see app/prefork.py): fetch the countries dataset
+    # in the master so every worker starts with it
+    PRELOAD_COUNTRIES = os.environ.get('PRELOAD_COUNTRIES', 'True').lower() == 'true'
+    
+    # Static assets are minified and served under content-hashed names
+    # with a year-long immutable Cache-Control
+    ASSETS_MINIFY = os.environ.get('ASSETS_MINIFY', 'True').lower() == 'true'
+    ASSETS_MAX_AGE = int(os.environ.get('ASSETS_MAX_AGE', 31536000))
+    
+    # Static-content pages (docs, login, dashboard) are rendered once and
+    # served with an ETag; browsers may reuse them for PAGE_CACHE_MAX_AGE seconds
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+    PAGE_CACHE_MAX_AGE = int(os.environ.get('PAGE_CACHE_MAX_AGE', 300))
+    # Compiled templates are kept here across restarts (empty to disable)
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get(
+        'TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'countries_api_templates')
+    )
+    
+    # Logging: level of the app logger, per-logger levels
+    # ('app.routes.web_routes=WARNING,sqlalchemy.engine=INFO'), 'text' or
+    # 'json' lines, and at most LOG_SAMPLE_BURST records of the same
+    # message below WARNING per LOG_SAMPLE_INTERVAL seconds (0 disables)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_SAMPLE_BURST = int(os.environ.get('LOG_SAMPLE_BURST', 10))
+    LOG_SAMPLE_INTERVAL = float(os.environ.get('LOG_SAMPLE_INTERVAL', 60))
+    
+    # Metrics
+    # Directory shared by all worker processes so /metrics aggregates them
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))  # Seconds
+    # Bearer token scrapers must send to /metrics; without one, only
+    # requests from loopback are answered
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    
+    # Profiling (admin-only, see /admin/profiling)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))  # Fraction of requests
+    # Directory shared by all worker processes, so profiler controls reach
+    # every worker and reports include their stacks
+    PROFILING_DIR = os.environ.get('PROFILING_DIR')
+    
     # Security
     WTF_CSRF_ENABLED = True
     
@@ -35,12 +152,27 @@ class TestingConfig(Config):
     
 class ProductionConfig(Config):
     DEBUG = False
+    API_KEY_RATELIMIT_STORAGE_URI = os.environ.get(
+        'API_KEY_RATELIMIT_STORAGE_URI',
+        'sqlite:///' + os.path.join(tempfile.gettempdir(), 'countries_api_ratelimit.db')
+    )
+    UPSTREAM_STORE_PATH = os.environ.get(
+        'UPSTREAM_STORE_PATH', os.path.join(tempfile.gettempdir(), 'countries_api_upstream.db')
+    )
+    
+class ClusterConfig(ProductionConfig):
+    # One of several instances behind a load balancer: every shared backend
+    # (DATABASE_URL, RATELIMIT_STORAGE_URL, API_KEY_RATELIMIT_STORAGE_URI,
+    # SHARED_CACHE_URL) must be configured explicitly
+    REQUIRE_SHARED_STATE = True
+    API_KEY_RATELIMIT_STORAGE_URI = os.environ.get('API_KEY_RATELIMIT_STORAGE_URI', 'memory://')
     
 # Configuration dictionary
 config_by_name = {
     'dev': DevelopmentConfig,
     'test': TestingConfig,
     'prod': ProductionConfig,
+    'cluster': ClusterConfig,
     'development': DevelopmentConfig  # Add this line to support 'development' as well
 }
 
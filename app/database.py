@@ -1,22 +1,201 @@
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+import os
+from contextlib import contextmanager
+from flask import current_app, jsonify, g
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
 from flask_bcrypt import Bcrypt
+from sqlalchemy import event, inspect, literal, orm, text
+from sqlalchemy.orm import Session
 
-# Initialize SQLAlchemy for database management
-db = SQLAlchemy()
+# Bind key of the read replica engine (DATABASE_REPLICA_URL)
+REPLICA_BIND = 'replica'
+
+class RoutingSession(SignallingSession):
+    """
+    Session that sends reads marked read_only() to the replica engine
+    
+    Only while the session has no pending or flushed changes: a request
+    that wrote reads its own writes from the primary. Flushes and
+    everything not marked go to the primary.
+    """
+    
+    def __init__(self, db, **options):
+        super().__init__(db, **options)
+        binds = self.app.config.get('SQLALCHEMY_BINDS') or {}
+        self.replica = db.get_engine(self.app, bind=REPLICA_BIND) if REPLICA_BIND in binds else None
+    
+    def get_bind(self, mapper=None, clause=None):
+        if (self.replica is not None and self.info.get('read_only')
+                and not self._flushing and not has_pending_writes(self)):
+            return self.replica
+        return super().get_bind(mapper, clause)
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy extension whose sessions route reads to a replica"""
+    
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
 
-# Initialize Flask-Migrate for database migrations
-migrate = Migrate()
+# Initialize SQLAlchemy for database management
+db = RoutingSQLAlchemy()
 
 # Initialize Bcrypt for password hashing
 bcrypt = Bcrypt()
 
 def init_db(app):
     """Initialize database and related extensions with Flask app"""
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **{REPLICA_BIND: replica_url})
+    
     db.init_app(app)
-    migrate.init_app(app, db)
     bcrypt.init_app(app)
     
-    # Create database tables if they don't exist
+    if not event.contains(Session, 'after_flush', _track_writes):
+        event.listen(Session, 'after_flush', _track_writes)
+        event.listen(Session, 'after_commit', _clear_writes)
+        event.listen(Session, 'after_rollback', _clear_writes)
+    
+    # Flask-Migrate (and Alembic) is only needed by the `flask db` commands
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    
+    # Tables are created by `flask init-db`; doing it on every worker boot is opt-in
+    if app.config.get('AUTO_CREATE_SCHEMA'):
+        create_schema(app)
+
+def create_schema(app):
+    """Create database tables that don't exist yet, and add new columns to existing ones"""
     with app.app_context():
-        db.create_all()
\ No newline at end of file
+        db.create_all()
+        for table, column in add_missing_columns(db.engine):
+            app.logger.info('Added column %s.%s', table, column)
+
+def add_missing_columns(engine):
+    """
+    Add columns defined on the models but missing from existing tables
+    
+    create_all only creates tables, so a database created by an earlier
+    release keeps its old columns. Nullable columns and NOT NULL columns
+    with a scalar default are added with ALTER TABLE (running it again
+    changes nothing); anything else needs a migration.
+    
+    Returns:
+        list: (table, column) of each column added
+    """
+    dialect = engine.dialect
+    preparer = dialect.identifier_preparer
+    existing = inspect(engine)
+    added = []
+    
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.info.get('bind_key') or not existing.has_table(table.name):
+                continue
+            present = {column['name'] for column in existing.get_columns(table.name)}
+            new_columns = [column for column in table.columns if column.name not in present]
+            new_names = {column.name for column in new_columns}
+            
+            for column in new_columns:
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if column.primary_key or column.unique or (not column.nullable and default is None):
+                    raise RuntimeError(f'Cannot add column {table.name}.{column.name}; migrate it by hand')
+                
+                ddl = f'{preparer.format_column(column)} {column.type.compile(dialect=dialect)}'
+                if default is not None:
+                    value = literal(default, column.type).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+                    ddl += f' DEFAULT {value}'
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+                connection.execute(text(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}'))
+                added.append((table.name, column.name))
+            
+            for index in table.indexes:
+                if new_names.intersection(column.name for column in index.columns):
+                    index.create(connection)
+    
+    return added
+
+def _track_writes(session, flush_context):
+    session.info['flushed_writes'] = True
+
+def _clear_writes(session):
+    session.info.pop('flushed_writes', None)
+
+@contextmanager
+def read_only(enabled=True):
+    """
+    Send the reads of a block (or decorated function) to the replica
+    
+    Without a configured replica this changes nothing. Data read this way
+    may lag the primary by up to DATABASE_REPLICA_MAX_LAG seconds;
+    read_only(False) forces the primary inside a read-only block.
+    """
+    session = db.session()
+    previous = session.info.get('read_only', False)
+    session.info['read_only'] = enabled
+    try:
+        yield
+    finally:
+        session.info['read_only'] = previous
+
+def has_pending_writes(session):
+    """Whether the session holds changes that are not committed yet"""
+    return bool(session.new or session.dirty or session.deleted or session.info.get('flushed_writes'))
+
+def commit_request(response):
+    """
+    Commit the request's unit of work (after_request hook)
+    
+    Models and services only change session state (flushing where they
+    need generated keys or constraint errors); everything a request
+    changed is committed here at once, before the response is sent, so a
+    client is never told a write succeeded that was not committed. A
+    failed commit turns the response into a 500. Requests that changed
+    nothing do not commit, and a 5xx response (from an error handler or a
+    route's own except block) rolls the changes back, except for records
+    passed to keep_on_rollback, which are then committed on their own.
+    """
+    session = db.session
+    if response.status_code >= 500:
+        kept = g.pop('kept_records', [])
+        session.rollback()
+        if kept:
+            _insert_alone(session, kept)
+        return response
+    
+    if not has_pending_writes(session):
+        return response
+    
+    try:
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        current_app.logger.error('Error committing request changes: %s', e)
+        response = jsonify({'error': 'Internal server error'})
+        response.status_code = 500
+    return response
+
+def keep_on_rollback(record):
+    """Insert a new record (such as a usage log) even if its request fails"""
+    g.setdefault('kept_records', []).append(record)
+
+def _insert_alone(session, records):
+    # Rolled back pending records are transient again; clear keys that a
+    # flush assigned, as another transaction may have taken them since
+    for record in records:
+        mapper = inspect(record).mapper
+        for column in mapper.primary_key:
+            setattr(record, mapper.get_property_by_column(column).key, None)
+        session.add(record)
+    
+    try:
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        current_app.logger.error('Error committing records of a failed request: %s', e)
+
+def rollback_request(exc=None):
+    """Roll back what an unhandled exception left uncommitted (teardown_request hook)"""
+    if exc is not None:
+        db.session.rollback()
@@ -1,5 +1,7 @@
 from app.models.user import User
 from app.models.api_key import APIKey
 from app.models.api_usage import APIUsage
+from app.models.country import Country
+from app.models.country_change import ChangeFeedState, CountryState, CountryChange
 
-__all__ = ['User', 'APIKey', 'APIUsage']
\ No newline at end of file
+__all__ = ['User', 'APIKey', 'APIUsage', 'Country', 'ChangeFeedState', 'CountryState', 'CountryChange']
\ No newline at end of file
@@ -1,6 +1,8 @@
 import uuid
 from datetime import datetime, timedelta
-from app.database import db, bcrypt
+from app.database import db
+from app.utils.metrics import bcrypt_verifications_total
+from app.utils.hashing import password_hasher
 from sqlalchemy.orm import relationship
 
 class APIKey(db.Model):
@@ -28,14 +30,21 @@ class APIKey(db.Model):
         # Generate a unique API key using UUID
         self.key_value = str(uuid.uuid4())
         # Store a hash of the key for verification
-        self.key_hash = bcrypt.generate_password_hash(self.key_value).decode('utf-8')
+        self.key_hash = password_hasher.hash(self.key_value)
         # Set expiration date
         if expires_in_days:
             self.expires_at = datetime.utcnow() + timedelta(days=expires_in_days)
     
     def check_key(self, key):
-        """Verify if provided key matches stored hash"""
-        return bcrypt.check_password_hash(self.key_hash, key)
+        """
+        Verify if provided key matches stored hash
+        
+        Runs in the calling thread rather than on the hashing pool: every
+        API request checks its key, and the pool is kept for passwords.
+        """
+        matches = password_hasher.verify_in_thread(self.key_hash, key)
+        bcrypt_verifications_total.inc(kind='api_key', result='match' if matches else 'mismatch')
+        return matches
     
     def is_valid(self):
         """Check if key is active and not expired"""
@@ -45,23 +54,32 @@ class APIKey(db.Model):
             return False
         return True
     
-    def log_usage(self):
-        """Update last used timestamp"""
-        self.last_used = datetime.utcnow()
-        db.session.commit()
+    def log_usage(self, granularity=0):
+        """
+        Update last used timestamp (committed with the request)
+        
+        The timestamp is only moved once it is at least `granularity`
+        seconds old, so a busy key is not rewritten on every call.
+        
+        Returns:
+            bool: whether the timestamp was updated
+        """
+        now = datetime.utcnow()
+        if self.last_used and (now - self.last_used).total_seconds() < granularity:
+            return False
+        self.last_used = now
+        return True
     
     def revoke(self):
-        """Disable the API key"""
+        """Disable the API key (committed with the request)"""
         self.is_active = False
-        db.session.commit()
     
     def extend(self, days=365):
-        """Extend key expiration"""
+        """Extend key expiration (committed with the request)"""
         if self.expires_at:
             self.expires_at = self.expires_at + timedelta(days=days)
         else:
             self.expires_at = datetime.utcnow() + timedelta(days=days)
-        db.session.commit()
     
     def to_dict(self):
         """Convert API key object to dictionary"""
@@ -13,6 +13,12 @@ class APIUsage(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     status_code = db.Column(db.Integer, nullable=False)
     response_time_ms = db.Column(db.Integer, nullable=True)
+    # Per-phase latency breakdown in milliseconds (see app.utils.timing)
+    auth_ms = db.Column(db.Float, nullable=True)
+    cache_ms = db.Column(db.Float, nullable=True)
+    upstream_ms = db.Column(db.Float, nullable=True)
+    filter_ms = db.Column(db.Float, nullable=True)
+    serialize_ms = db.Column(db.Float, nullable=True)
     ip_address = db.Column(db.String(45), nullable=True)
     user_agent = db.Column(db.String(255), nullable=True)
     
@@ -40,6 +46,13 @@ class APIUsage(db.Model):
             'timestamp': self.timestamp.isoformat(),
             'status_code': self.status_code,
             'response_time_ms': self.response_time_ms,
+            'phases': {
+                'auth_ms': self.auth_ms,
+                'cache_ms': self.cache_ms,
+                'upstream_ms': self.upstream_ms,
+                'filter_ms': self.filter_ms,
+                'serialize_ms': self.serialize_ms
+            },
             'ip_address': self.ip_address,
             'user_agent': self.user_agent
         }
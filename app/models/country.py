@@ -0,0 +1,114 @@
+import sys
+import json
+import threading
+import weakref
+
+class Country:
+    """
+    Immutable record of the country fields served by the API
+    
+    Records are slotted and hold interned strings and tuples instead of
+    nested dicts. Building the same country twice (e.g. from the /all and
+    /region responses) returns one shared record, and the JSON encoding of
+    a record is computed once and reused by every response that includes it.
+    """
+    
+    __slots__ = ('name', 'official_name', 'capital', 'languages', 'currencies',
+                 'flag', 'error', '_json', '__weakref__')
+    
+    # Live records by field values, so equal countries share one record
+    _registry = weakref.WeakValueDictionary()
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, name, official_name='', capital='', languages=(), currencies=(), flag='', error=None):
+        """
+        Initialize a country record
+        
+        Args:
+            languages: Tuple of (code, name) pairs
+            currencies: Tuple of (code, name, symbol) triples
+        """
+        set_field = object.__setattr__
+        set_field(self, 'name', name)
+        set_field(self, 'official_name', official_name)
+        set_field(self, 'capital', capital)
+        set_field(self, 'languages', languages)
+        set_field(self, 'currencies', currencies)
+        set_field(self, 'flag', flag)
+        set_field(self, 'error', error)
+        set_field(self, '_json', None)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('Country records are immutable')
+    
+    def __delattr__(self, name):
+        raise AttributeError('Country records are immutable')
+    
+    def __repr__(self):
+        return f'<Country {self.name}>'
+    
+    @classmethod
+    def from_api(cls, country):
+        """Build (or reuse) the record for a RestCountries v3.1 country"""
+        names = country.get('name', {})
+        capital = country.get('capital')
+        
+        record = cls(
+            _intern(names.get('common', '')),
+            names.get('official', ''),
+            _intern(capital[0]) if capital else '',
+            tuple((_intern(code), _intern(language))
+                  for code, language in country.get('languages', {}).items()),
+            tuple((_intern(code), _intern(details.get('name', '')), _intern(details.get('symbol', '')))
+                  for code, details in country.get('currencies', {}).items()),
+            country.get('flags', {}).get('png', '')
+        )
+        return record.shared()
+    
+    @classmethod
+    def unparsed(cls, name):
+        """Record for a country whose data could not be parsed"""
+        return cls(_intern(name), error='Could not parse all data').shared()
+    
+    def shared(self):
+        """The live record equal to this one, registering this one if there is none"""
+        key = (self.name, self.official_name, self.capital, self.languages,
+               self.currencies, self.flag, self.error)
+        with self._registry_lock:
+            record = self._registry.get(key)
+            if record is None:
+                record = self._registry[key] = self
+        return record
+    
+    @property
+    def key(self):
+        """Identity used to de-duplicate merged results"""
+        return self.official_name or self.name
+    
+    def to_dict(self):
+        """Build a new dict in the API response format"""
+        if self.error is not None:
+            return {'name': self.name, 'error': self.error}
+        
+        return {
+            'name': self.name,
+            'official_name': self.official_name,
+            'capital': self.capital,
+            'languages': dict(self.languages),
+            'currencies': {
+                code: {'name': name, 'symbol': symbol} for code, name, symbol in self.currencies
+            },
+            'flag': self.flag
+        }
+    
+    @property
+    def json(self):
+        """JSON encoding of the record, computed on first use"""
+        encoded = self._json
+        if encoded is None:
+            encoded = json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'))
+            object.__setattr__(self, '_json', encoded)
+        return encoded
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else ''
@@ -0,0 +1,31 @@
+from app.database import db
+
+class ChangeFeedState(db.Model):
+    """Single row holding the shared version of the countries dataset"""
+    __tablename__ = 'country_feed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Newest version with entries trimmed from the change log
+    trimmed_version = db.Column(db.Integer, nullable=False, default=0)
+
+class CountryState(db.Model):
+    """Content hash of each country in the latest recorded dataset"""
+    __tablename__ = 'country_states'
+    
+    country = db.Column(db.String(255), primary_key=True)
+    content_hash = db.Column(db.String(32), nullable=False)
+
+class CountryChange(db.Model):
+    """A country added, updated or removed at a dataset version"""
+    __tablename__ = 'country_changes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, index=True)
+    country = db.Column(db.String(255), nullable=False)
+    change = db.Column(db.String(10), nullable=False)
+    # JSON of the country record (None once removed)
+    data = db.Column(db.Text, nullable=True)
+    
+    def __repr__(self):
+        return f"<CountryChange {self.version} - {self.country} {self.change}>"
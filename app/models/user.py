@@ -1,5 +1,7 @@
 from datetime import datetime
-from app.database import db, bcrypt
+from app.database import db
+from app.utils.metrics import bcrypt_verifications_total
+from app.utils.hashing import password_hasher
 from sqlalchemy.orm import relationship
 
 class User(db.Model):
@@ -13,25 +15,41 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
     is_admin = db.Column(db.Boolean, default=False)
+    # Rate limit plan, a key of RATE_LIMIT_PLANS
+    plan = db.Column(db.String(20), nullable=False, default='free')
     
     # Relationships
     api_keys = relationship('APIKey', back_populates='user', cascade='all, delete-orphan')
     
-    def __init__(self, username, email, password, is_admin=False):
+    def __init__(self, username, email, password, is_admin=False, plan='free'):
         """Initialize a new user"""
         self.username = username
         self.email = email
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.set_password(password)
         self.is_admin = is_admin
+        self.plan = plan
+    
+    def set_password(self, password):
+        """Hash and store a new password"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Check if provided password matches stored hash"""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        matches = password_hasher.verify(self.password_hash, password)
+        bcrypt_verifications_total.inc(kind='password', result='match' if matches else 'mismatch')
+        return matches
+    
+    def password_needs_rehash(self):
+        """Check if the password hash uses an outdated work factor"""
+        return password_hasher.needs_rehash(self.password_hash)
     
-    def update_last_login(self):
-        """Update the last login timestamp"""
-        self.last_login = datetime.utcnow()
-        db.session.commit()
+    def update_last_login(self, granularity=0):
+        """Update the last login timestamp if older than `granularity` seconds (committed with the request)"""
+        now = datetime.utcnow()
+        if self.last_login and (now - self.last_login).total_seconds() < granularity:
+            return False
+        self.last_login = now
+        return True
     
     def to_dict(self):
         """Convert user object to dictionary"""
@@ -41,7 +59,8 @@ class User(db.Model):
             'email': self.email,
             'created_at': self.created_at.isoformat(),
             'last_login': self.last_login.isoformat() if self.last_login else None,
-            'is_admin': self.is_admin
+            'is_admin': self.is_admin,
+            'plan': self.plan
         }
     
     def __repr__(self):
@@ -0,0 +1,87 @@
+"""
+Pre-fork preloading
+
+With a pre-fork server started in preload mode, the app is created once
+in the master process and workers are forked from it, so the app, its
+compiled templates and regexes and the cached countries dataset are
+shared copy-on-write instead of rebuilt by every worker:
+    
+    gunicorn -c gunicorn.conf.py
+
+preload() runs in the master after create_app, and post_fork() in each
+worker, to re-create what cannot be shared across a fork: database and
+SQLite connections, thread pools and background threads. shutdown() runs
+in each worker as it exits.
+"""
+import gc
+from app import create_app
+from app.database import db
+from app.utils.metrics import registry
+from app.utils.logs import log_pipeline
+
+def preload(app):
+    """Build shared state in the master process, before workers are forked"""
+    from app.services.countries_service import countries_service
+    
+    with app.app_context():
+        # Compile every template into the environment's cache
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+        
+        if app.config.get('PRELOAD_COUNTRIES', True):
+            countries = countries_service.get_all_countries()
+            if 'error' in countries:
+                app.logger.warning('Countries dataset not preloaded; workers will fetch it on demand')
+        
+        # Workers must not share connections opened by the master
+        db.engine.dispose()
+    
+    # Preloading is not traffic; workers start counting from zero
+    registry.reset()
+    
+    # Move everything built so far out of the collector's reach, so
+    # collections in workers do not write to (and un-share) these pages
+    gc.collect()
+    gc.freeze()
+
+def post_fork(app):
+    """Re-create per-process resources in a newly forked worker"""
+    from app.services.countries_service import countries_service
+    from app.services.rate_limit_service import rate_limit_service
+    from app.services.auth_service import auth_service
+    
+    # This process serves requests: later init_app calls start threads
+    app.config['PRELOADING'] = False
+    with app.app_context():
+        db.engine.dispose()
+    countries_service.after_fork(app)
+    rate_limit_service.after_fork()
+    auth_service.after_fork()
+    registry.start_flusher()
+
+def shutdown(app):
+    """
+    Release a worker's resources as it exits (graceful shutdown)
+    
+    Runs after the worker has finished its last request: pools are closed
+    once their pending work is done, and this process' metrics and queued
+    log records are written out.
+    """
+    from app.services.countries_service import countries_service
+    from app.utils.hashing import password_hasher
+    
+    countries_service.shutdown(app)
+    password_hasher.shutdown()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    
+    registry.stop_flusher()
+    registry.flush()
+    log_pipeline.stop()
+
+def create_prefork_app(config_name='prod'):
+    """Create the app and preload it (use as the app of a preloading server)"""
+    app = create_app(config_name, preload=True)
+    preload(app)
+    return app
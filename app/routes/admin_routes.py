@@ -0,0 +1,81 @@
+from flask import Blueprint, request, current_app, Response
+from app.utils.profiling import profiler
+from app.utils.security import require_admin
+from app.utils.helpers import format_response, error_response
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+PROFILE_MODES = ('cprofile', 'sampler')
+
+@admin_bp.route('/profiling', methods=['GET'])
+@require_admin
+def profiling_status():
+    """Get profiler state and recorded samples per endpoint"""
+    return format_response(profiler.summary(), 200)
+
+@admin_bp.route('/profiling/cprofile', methods=['PUT'])
+@require_admin
+def set_cprofile_rate():
+    """Set the fraction of requests profiled with cProfile"""
+    if not profiler.enabled:
+        return error_response("Profiling is disabled (set PROFILING_ENABLED)", 409)
+    
+    data = request.json or {}
+    try:
+        rate = float(data.get('sample_rate'))
+    except (TypeError, ValueError):
+        return error_response("sample_rate must be a number between 0 and 1", 400)
+    
+    profiler.set_sample_rate(rate)
+    current_app.logger.info('cProfile sample rate set to %s', profiler.sample_rate)
+    
+    return format_response(profiler.summary(), 200)
+
+@admin_bp.route('/profiling/sampler', methods=['POST'])
+@require_admin
+def start_sampler():
+    """Sample request stacks in the background for a number of seconds"""
+    if not profiler.enabled:
+        return error_response("Profiling is disabled (set PROFILING_ENABLED)", 409)
+    
+    data = request.json or {}
+    try:
+        seconds = float(data.get('seconds', 10))
+        interval_ms = float(data.get('interval_ms', 5))
+    except (TypeError, ValueError):
+        return error_response("seconds and interval_ms must be numbers", 400)
+    
+    if not 0 < seconds <= 300:
+        return error_response("seconds must be between 0 and 300", 400)
+    if not 1 <= interval_ms <= 1000:
+        return error_response("interval_ms must be between 1 and 1000", 400)
+    
+    if not profiler.start_sampler(seconds, interval_ms / 1000):
+        return error_response("A sampler is already running", 409)
+    
+    current_app.logger.info('Stack sampler started for %ss', seconds)
+    
+    return format_response({
+        'message': 'Sampler started',
+        'seconds': seconds,
+        'interval_ms': interval_ms
+    }, 202)
+
+@admin_bp.route('/profiling/stacks', methods=['GET'])
+@require_admin
+def get_stacks():
+    """Get collapsed stacks, usable with flamegraph.pl or speedscope"""
+    mode = request.args.get('mode', 'sampler')
+    if mode not in PROFILE_MODES:
+        return error_response("mode must be one of: " + ", ".join(PROFILE_MODES), 400)
+    
+    endpoint = request.args.get('endpoint')
+    
+    return Response(profiler.collapsed(mode, endpoint), mimetype='text/plain')
+
+@admin_bp.route('/profiling/stacks', methods=['DELETE'])
+@require_admin
+def clear_stacks():
+    """Discard recorded stacks"""
+    profiler.clear()
+    return format_response({'message': 'Profiling data cleared'}, 200)
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.services.countries_service import countries_service
+from app.services.countries_service import countries_service, split_codes
+from app.utils.columnar import DIMENSIONS
 from app.utils.security import require_api_key, update_api_usage
 from app.utils.helpers import paginate_results, error_response, format_response
 from app.utils.validators import sanitize_string
@@ -31,7 +32,7 @@ def get_all_countries():
         
         return format_response(result, 200)
     except Exception as e:
-        current_app.logger.error(f"Error in get_all_countries: {str(e)}")
+        current_app.logger.error('Error in get_all_countries: %s', e)
         update_api_usage(500)
         return error_response("Internal server error", 500)
 
@@ -56,14 +57,14 @@ def get_country_by_name(name):
         
         return format_response(country, 200)
     except Exception as e:
-        current_app.logger.error(f"Error in get_country_by_name: {str(e)}")
+        current_app.logger.error('Error in get_country_by_name: %s', e)
         update_api_usage(500)
         return error_response("Internal server error", 500)
 
 @api_bp.route('/countries/currency/<code>', methods=['GET'])
 @require_api_key
 def get_countries_by_currency(code):
-    """Get countries by currency code"""
+    """Get countries by currency code (comma-separate several codes)"""
     try:
         # Sanitize input
         code = sanitize_string(code)
@@ -77,8 +78,9 @@ def get_countries_by_currency(code):
         
         # Check for errors in the response
         if 'error' in countries:
-            update_api_usage(404)
-            return error_response(countries['error'], 404)
+            status_code = countries.get('status', 404)
+            update_api_usage(status_code)
+            return error_response(countries['error'], status_code)
         
         # Paginate results
         result = paginate_results(countries, page, per_page)
@@ -88,14 +90,14 @@ def get_countries_by_currency(code):
         
         return format_response(result, 200)
     except Exception as e:
-        current_app.logger.error(f"Error in get_countries_by_currency: {str(e)}")
+        current_app.logger.error('Error in get_countries_by_currency: %s', e)
         update_api_usage(500)
         return error_response("Internal server error", 500)
 
 @api_bp.route('/countries/language/<code>', methods=['GET'])
 @require_api_key
 def get_countries_by_language(code):
-    """Get countries by language code"""
+    """Get countries by language code (comma-separate several codes)"""
     try:
         # Sanitize input
         code = sanitize_string(code)
@@ -109,8 +111,9 @@ def get_countries_by_language(code):
         
         # Check for errors in the response
         if 'error' in countries:
-            update_api_usage(404)
-            return error_response(countries['error'], 404)
+            status_code = countries.get('status', 404)
+            update_api_usage(status_code)
+            return error_response(countries['error'], status_code)
         
         # Paginate results
         result = paginate_results(countries, page, per_page)
@@ -120,14 +123,14 @@ def get_countries_by_language(code):
         
         return format_response(result, 200)
     except Exception as e:
-        current_app.logger.error(f"Error in get_countries_by_language: {str(e)}")
+        current_app.logger.error('Error in get_countries_by_language: %s', e)
         update_api_usage(500)
         return error_response("Internal server error", 500)
 
 @api_bp.route('/countries/region/<region>', methods=['GET'])
 @require_api_key
 def get_countries_by_region(region):
-    """Get countries by region"""
+    """Get countries by region (comma-separate several regions)"""
     try:
         # Sanitize input
         region = sanitize_string(region)
@@ -141,8 +144,9 @@ def get_countries_by_region(region):
         
         # Check for errors in the response
         if 'error' in countries:
-            update_api_usage(404)
-            return error_response(countries['error'], 404)
+            status_code = countries.get('status', 404)
+            update_api_usage(status_code)
+            return error_response(countries['error'], status_code)
         
         # Paginate results
         result = paginate_results(countries, page, per_page)
@@ -152,7 +156,68 @@ def get_countries_by_region(region):
         
         return format_response(result, 200)
     except Exception as e:
-        current_app.logger.error(f"Error in get_countries_by_region: {str(e)}")
+        current_app.logger.error('Error in get_countries_by_region: %s', e)
+        update_api_usage(500)
+        return error_response("Internal server error", 500)
+
+@api_bp.route('/countries/changes', methods=['GET'])
+@require_api_key
+def get_country_changes():
+    """Get countries added, updated or removed since a dataset version"""
+    try:
+        since = request.args.get('since', 0, type=int)
+        
+        changes = countries_service.get_changes(since)
+        
+        # Check for errors in the response
+        if 'error' in changes:
+            update_api_usage(changes['status'])
+            return error_response(changes['error'], changes['status'])
+        
+        update_api_usage(200)
+        
+        return format_response(changes, 200)
+    except Exception as e:
+        current_app.logger.error('Error in get_country_changes: %s', e)
+        update_api_usage(500)
+        return error_response("Internal server error", 500)
+
+@api_bp.route('/stats', methods=['GET'])
+@require_api_key
+def get_country_stats():
+    """Count countries and sum population and area, optionally grouped and filtered"""
+    try:
+        group_by = request.args.get('group_by')
+        if group_by and group_by not in DIMENSIONS:
+            update_api_usage(400)
+            return error_response("group_by must be one of: " + ", ".join(DIMENSIONS), 400)
+        
+        # Filters accept comma-separated values, any of which may match
+        filters = {}
+        for dimension in DIMENSIONS:
+            value = sanitize_string(request.args.get(dimension))
+            if value:
+                filters[dimension] = split_codes(value)
+        
+        columns = countries_service.get_columns()
+        if columns is None:
+            update_api_usage(500)
+            return error_response("Failed to retrieve countries", 500)
+        
+        mask = columns.mask(filters)
+        result = {
+            'filters': filters,
+            'total': columns.total(mask)
+        }
+        if group_by:
+            result['group_by'] = group_by
+            result['groups'] = columns.group_by(group_by, mask)
+        
+        update_api_usage(200)
+        
+        return format_response(result, 200)
+    except Exception as e:
+        current_app.logger.error('Error in get_country_stats: %s', e)
         update_api_usage(500)
         return error_response("Internal server error", 500)
 
@@ -175,6 +240,15 @@ def api_docs():
                     'per_page': 'Items per page (default: 20, max: 100)'
                 }
             },
+            {
+                'path': '/api/v1/countries/changes',
+                'method': 'GET',
+                'description': 'Countries added, updated or removed since a dataset version',
+                'auth': 'API Key required',
+                'params': {
+                    'since': 'Dataset version already synced (default: 0, i.e. everything)'
+                }
+            },
             {
                 'path': '/api/v1/countries/{name}',
                 'method': 'GET',
@@ -184,7 +258,7 @@ def api_docs():
             {
                 'path': '/api/v1/countries/currency/{code}',
                 'method': 'GET',
-                'description': 'Get countries by currency code',
+                'description': 'Get countries by currency code; comma-separate several codes (e.g. EUR,USD)',
                 'auth': 'API Key required',
                 'params': {
                     'page': 'Page number (default: 1)',
@@ -194,7 +268,7 @@ def api_docs():
             {
                 'path': '/api/v1/countries/language/{code}',
                 'method': 'GET',
-                'description': 'Get countries by language code',
+                'description': 'Get countries by language code; comma-separate several codes (e.g. eng,fra)',
                 'auth': 'API Key required',
                 'params': {
                     'page': 'Page number (default: 1)',
@@ -204,12 +278,25 @@ def api_docs():
             {
                 'path': '/api/v1/countries/region/{region}',
                 'method': 'GET',
-                'description': 'Get countries by region',
+                'description': 'Get countries by region; comma-separate several regions',
                 'auth': 'API Key required',
                 'params': {
                     'page': 'Page number (default: 1)',
                     'per_page': 'Items per page (default: 20, max: 100)'
                 }
+            },
+            {
+                'path': '/api/v1/stats',
+                'method': 'GET',
+                'description': 'Country count, population and area, optionally grouped and filtered',
+                'auth': 'API Key required',
+                'params': {
+                    'group_by': 'region, subregion, currency or language',
+                    'region': 'Filter by region (comma-separate several)',
+                    'subregion': 'Filter by subregion (comma-separate several)',
+                    'currency': 'Filter by currency code (comma-separate several)',
+                    'language': 'Filter by language code (comma-separate several)'
+                }
             }
         ]
     }
@@ -44,12 +44,9 @@ def register():
         # Register the user
         result, status_code = auth_service.register_user(username, email, password)
         
-        # Log the JWT secret key
-        current_app.logger.info(f"Registration using JWT_SECRET_KEY: {current_app.config['JWT_SECRET_KEY']}")
-        
         return format_response(result, status_code)
     except Exception as e:
-        current_app.logger.error(f"Error in register: {str(e)}")
+        current_app.logger.error('Error in register: %s', e)
         return error_response("Internal server error", 500)
 
 @auth_bp.route('/login', methods=['POST'])
@@ -65,9 +62,6 @@ def login():
         username_or_email = data.get('username') or data.get('email')
         password = data.get('password')
         
-        # Log the JWT secret key
-        current_app.logger.info(f"Login using JWT_SECRET_KEY: {current_app.config['JWT_SECRET_KEY']}")
-        
         if not username_or_email:
             return error_response("Username or email is required", 400)
         
@@ -75,28 +69,23 @@ def login():
             return error_response("Password is required", 400)
         
         # Add more detailed logging
-        current_app.logger.info(f"Login attempt for: {username_or_email}")
+        current_app.logger.info('Login attempt for: %s', username_or_email)
         
         try:
             # Login the user
             result, status_code = auth_service.login_user(username_or_email, password)
             
-            # Log access token details if login successful
+            # Log successful logins (never the tokens)
             if status_code == 200 and 'access_token' in result:
-                access_token = result['access_token']
-                current_app.logger.info(f"Generated access token: {access_token[:20]}...")
+                current_app.logger.info('Login succeeded for: %s', username_or_email)
             
             return format_response(result, status_code)
         except Exception as inner_e:
-            current_app.logger.error(f"Login processing error: {str(inner_e)}")
-            import traceback
-            current_app.logger.error(traceback.format_exc())
+            current_app.logger.exception('Login processing error: %s', inner_e)
             return error_response(f"Login processing error: {str(inner_e)}", 500)
-            
+    
     except Exception as e:
-        current_app.logger.error(f"Error in login: {str(e)}")
-        import traceback
-        current_app.logger.error(traceback.format_exc())
+        current_app.logger.exception('Error in login: %s', e)
         return error_response(f"Internal server error: {str(e)}", 500)
 
 @auth_bp.route('/refresh', methods=['POST'])
@@ -106,20 +95,16 @@ def refresh():
     try:
         current_user_id = get_jwt_identity()
         
-        # Log the JWT secret key
-        current_app.logger.info(f"Token refresh using JWT_SECRET_KEY: {current_app.config['JWT_SECRET_KEY']}")
-        
         access_token = create_access_token(identity=current_user_id)
         
-        # Log new token details
-        current_app.logger.info(f"New access token generated: {access_token[:20]}...")
+        current_app.logger.debug('Access token refreshed for user ID: %s', current_user_id)
         
         return format_response({
             'message': 'Token refreshed successfully',
             'access_token': access_token
         }, 200)
     except Exception as e:
-        current_app.logger.error(f"Error in refresh: {str(e)}")
+        current_app.logger.error('Error in refresh: %s', e)
         return error_response("Internal server error", 500)
 
 # Add a debug endpoint to create a test token
@@ -130,9 +115,7 @@ def debug_token():
         # Create a token with user ID 1
         access_token = create_access_token(identity=1)
         
-        # Log token details
-        current_app.logger.info(f"Debug token created using JWT_SECRET_KEY: {current_app.config['JWT_SECRET_KEY']}")
-        current_app.logger.info(f"Debug token: {access_token[:20]}...")
+        current_app.logger.info('Debug token created')
         
         return format_response({
             'message': 'Debug token created',
@@ -140,5 +123,5 @@ def debug_token():
             'jwt_secret_used': current_app.config['JWT_SECRET_KEY']
         }, 200)
     except Exception as e:
-        current_app.logger.error(f"Error creating debug token: {str(e)}")
+        current_app.logger.error('Error creating debug token: %s', e)
         return error_response("Internal server error", 500)
\ No newline at end of file
@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.auth_service import auth_service
-from app.utils.validators import sanitize_string
+from app.services.usage_service import usage_service, EXPORT_FORMATS
+from app.utils.validators import sanitize_string, validate_datetime
 from app.utils.helpers import format_response, error_response
 
 user_bp = Blueprint('user', __name__, url_prefix='/user')
@@ -12,29 +13,22 @@ def get_api_keys():
     try:
         # Log current user identity
         current_user_id = get_jwt_identity()
-        current_app.logger.info(f"Retrieving API keys for user ID: {current_user_id}")
-        
-        # Log request headers for debugging
-        auth_header = request.headers.get('Authorization', 'None')
-        current_app.logger.info(f"Authorization header: {auth_header[:20]}...")
-        current_app.logger.info(f"Request headers: {dict(request.headers)}")
+        current_app.logger.debug('Retrieving API keys for user ID: %s', current_user_id)
         
         result, status_code = auth_service.get_user_api_keys(current_user_id)
-        current_app.logger.info(f"API keys response: status {status_code}")
+        current_app.logger.debug('API keys response: status %s', status_code)
         return format_response(result, status_code)
     except Exception as e:
-        current_app.logger.error(f"Error in get_api_keys: {str(e)}")
-        import traceback
-        current_app.logger.error(traceback.format_exc())
+        current_app.logger.exception('Error in get_api_keys: %s', e)
         return error_response(f"Internal server error: {str(e)}", 500)
-    
+
 @user_bp.route('/api-keys', methods=['POST'])
 @jwt_required()
 def create_api_key():
     """Create a new API key for the current user"""
     try:
         user_id = get_jwt_identity()
-        current_app.logger.info(f"Creating API key for user ID: {user_id}")
+        current_app.logger.debug('Creating API key for user ID: %s', user_id)
         
         data = request.json or {}
         
@@ -51,13 +45,11 @@ def create_api_key():
             return error_response("Invalid expiration days", 400)
         
         result, status_code = auth_service.create_api_key(user_id, name, expires_in_days)
-        current_app.logger.info(f"API key creation response: status {status_code}")
+        current_app.logger.debug('API key creation response: status %s', status_code)
         
         return format_response(result, status_code)
     except Exception as e:
-        current_app.logger.error(f"Error in create_api_key: {str(e)}")
-        import traceback
-        current_app.logger.error(traceback.format_exc())
+        current_app.logger.exception('Error in create_api_key: %s', e)
         return error_response(f"Internal server error: {str(e)}", 500)
 
 @user_bp.route('/api-keys/<int:key_id>', methods=['DELETE'])
@@ -66,16 +58,52 @@ def revoke_api_key(key_id):
     """Revoke an API key"""
     try:
         user_id = get_jwt_identity()
-        current_app.logger.info(f"Revoking API key {key_id} for user ID: {user_id}")
+        current_app.logger.debug('Revoking API key %s for user ID: %s', key_id, user_id)
         
         result, status_code = auth_service.revoke_api_key(user_id, key_id)
-        current_app.logger.info(f"API key revocation response: status {status_code}")
+        current_app.logger.debug('API key revocation response: status %s', status_code)
         
         return format_response(result, status_code)
     except Exception as e:
-        current_app.logger.error(f"Error in revoke_api_key: {str(e)}")
-        import traceback
-        current_app.logger.error(traceback.format_exc())
+        current_app.logger.exception('Error in revoke_api_key: %s', e)
+        return error_response(f"Internal server error: {str(e)}", 500)
+
+@user_bp.route('/api-keys/<int:key_id>/usage/export', methods=['GET'])
+@jwt_required()
+def export_api_key_usage(key_id):
+    """Stream the usage history of an API key as CSV or NDJSON"""
+    try:
+        user_id = get_jwt_identity()
+        current_app.logger.debug('Exporting usage of API key %s for user ID: %s', key_id, user_id)
+        
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return error_response("Format must be one of: " + ", ".join(EXPORT_FORMATS), 400)
+        
+        # Parse optional time range filters
+        time_range = {}
+        for param in ('start', 'end'):
+            value = request.args.get(param)
+            if value:
+                valid, result = validate_datetime(value)
+                if not valid:
+                    return error_response(result, 400)
+                time_range[param] = result
+        
+        api_key, error, status_code = usage_service.get_owned_api_key(user_id, key_id)
+        if error:
+            return format_response(error, status_code)
+        
+        rows = usage_service.export_usage(api_key.id, export_format, **time_range)
+        filename = f"api-key-{api_key.id}-usage.{export_format}"
+        
+        return Response(
+            stream_with_context(rows),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    except Exception as e:
+        current_app.logger.exception('Error in export_api_key_usage: %s', e)
         return error_response(f"Internal server error: {str(e)}", 500)
 
 @user_bp.route('/profile', methods=['GET'])
@@ -84,19 +112,16 @@ def get_profile():
     """Get user profile information"""
     try:
         user_id = get_jwt_identity()
-        current_app.logger.info(f"Getting profile for user ID: {user_id}")
+        current_app.logger.debug('Getting profile for user ID: %s', user_id)
         
-        from app.models import User
-        user = User.query.get(user_id)
+        identity = auth_service.get_identity(user_id)
         
-        if not user:
+        if not identity:
             return error_response("User not found", 404)
         
         return format_response({
-            'user': user.to_dict()
+            'user': identity['user']
         }, 200)
     except Exception as e:
-        current_app.logger.error(f"Error in get_profile: {str(e)}")
-        import traceback
-        current_app.logger.error(traceback.format_exc())
+        current_app.logger.exception('Error in get_profile: %s', e)
         return error_response(f"Internal server error: {str(e)}", 500)
\ No newline at end of file
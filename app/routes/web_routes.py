@@ -1,13 +1,14 @@
-from flask import Blueprint, render_template, jsonify, request, current_app, redirect, url_for
+from flask import Blueprint, jsonify, request, current_app, redirect, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from functools import wraps
+from app.utils.assets import assets
+from app.utils.pages import page_cache
 import logging
 
 web_bp = Blueprint('web', __name__)
 
 # Configure logging
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
 # Define a custom decorator that renders templates even if JWT is missing
 def optional_jwt(route_function):
@@ -16,10 +17,10 @@ def optional_jwt(route_function):
         try:
             # Try to verify the JWT, but continue even if it fails
             verify_jwt_in_request()
-            current_app.logger.info("JWT verified successfully")
+            current_app.logger.debug("JWT verified successfully")
         except Exception as e:
             # Log but don't stop execution
-            current_app.logger.info(f"JWT verification failed: {str(e)}")
+            current_app.logger.debug('JWT verification failed: %s', e)
         
         # Always continue to the route function
         return route_function(*args, **kwargs)
@@ -28,49 +29,54 @@ def optional_jwt(route_function):
 @web_bp.route('/')
 def index():
     """Render the homepage"""
-    return render_template('base.html')
+    return page_cache.render('base.html')
 
 @web_bp.route('/login')
 def login():
     """Render the login page"""
-    return render_template('auth/login.html')
+    return page_cache.render('auth/login.html')
 
 @web_bp.route('/register')
 def register():
     """Render the registration page"""
-    return render_template('auth/register.html')
+    return page_cache.render('auth/register.html')
 
 @web_bp.route('/dashboard')
 @optional_jwt
 def dashboard():
     """Render the dashboard page"""
-    current_app.logger.info("Accessing dashboard page")
-    return render_template('dashboard/index.html')
+    current_app.logger.debug("Accessing dashboard page")
+    return page_cache.render('dashboard/index.html')
 
 @web_bp.route('/dashboard/api-keys')
 @optional_jwt
 def api_keys():
     """Render the API keys management page"""
-    current_app.logger.info("Accessing API keys page")
-    return render_template('dashboard/api_keys.html')
+    current_app.logger.debug("Accessing API keys page")
+    return page_cache.render('dashboard/api_keys.html')
 
 @web_bp.route('/dashboard/api-keys-minimal')
 def api_keys_minimal():
     """Render a minimal API keys page for testing"""
-    current_app.logger.info("Accessing minimal API keys page")
-    return render_template('dashboard/api_keys_minimal.html')
+    current_app.logger.debug("Accessing minimal API keys page")
+    return page_cache.render('dashboard/api_keys_minimal.html')
 
 @web_bp.route('/dashboard/profile')
 @optional_jwt
 def profile():
     """Render the user profile page"""
-    current_app.logger.info("Accessing profile page")
-    return render_template('dashboard/profile.html')
+    current_app.logger.debug("Accessing profile page")
+    return page_cache.render('dashboard/profile.html')
 
 @web_bp.route('/docs')
 def docs():
     """Render the API documentation page"""
-    return render_template('docs.html')
+    return page_cache.render('docs.html')
+
+@web_bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted asset (cached by browsers for a year)"""
+    return assets.response(filename)
 
 # API protected routes - these still need JWT
 @web_bp.route('/dashboard/check-auth')
@@ -78,7 +84,7 @@ def docs():
 def check_auth():
     """Simple endpoint to check authentication"""
     current_user_id = get_jwt_identity()
-    current_app.logger.info(f"Authentication check for user ID: {current_user_id}")
+    current_app.logger.debug('Authentication check for user ID: %s', current_user_id)
     return jsonify({"authenticated": True, "user_id": current_user_id})
 
 @web_bp.route('/debug/token-info')
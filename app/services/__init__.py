@@ -1,5 +1,7 @@
 # Import services
 from app.services.countries_service import countries_service
 from app.services.auth_service import auth_service
+from app.services.usage_service import usage_service
+from app.services.rate_limit_service import rate_limit_service
 
-__all__ = ['countries_service', 'auth_service']
\ No newline at end of file
+__all__ = ['countries_service', 'auth_service', 'usage_service', 'rate_limit_service']
\ No newline at end of file
@@ -1,22 +1,116 @@
+import hashlib
 from datetime import datetime
-from flask import current_app
+from itertools import chain
+from flask import current_app, g, has_app_context
 from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
 from app.models import User, APIKey
-from app.database import db
+from app.database import db, read_only
+from app.utils.cache import TTLCache, cache_from_uri
+from app.utils.hashing import HashingPoolBusy
 import re
 import uuid
 
 class AuthService:
     """Service for handling user authentication and API key management"""
     
+    # Returned when password hashing is saturated
+    BUSY_RESPONSE = ({'error': 'Server is busy, please retry shortly'}, 503)
+    
     def __init__(self, app=None):
         self.app = app
+        self.user_cache = TTLCache(name='users')
+        self.key_cache = TTLCache(name='api_keys')
+        self.last_used_granularity = 60
+        self.replica_lag = 0
+        self.recent_changes = TTLCache(name='recent_changes')
         if app is not None:
             self.init_app(app)
     
     def init_app(self, app):
         """Initialize with Flask app"""
         self.app = app
+        # Shared by all workers unless SHARED_CACHE_URL is memory://, so an
+        # invalidation reaches every worker
+        self.user_cache = cache_from_uri(
+            app.config.get('SHARED_CACHE_URL', 'memory://'),
+            maxsize=app.config.get('USER_CACHE_SIZE', 1024),
+            ttl=app.config.get('USER_CACHE_TTL', 30),
+            name='users'
+        )
+        self.key_cache = TTLCache(
+            maxsize=app.config.get('USER_CACHE_SIZE', 1024),
+            ttl=app.config.get('API_KEY_VERIFY_TTL', 60),
+            name='api_keys'
+        )
+        self.last_used_granularity = app.config.get('LAST_USED_GRANULARITY', 60)
+        
+        # Users changed within the replica lag are read from the primary
+        self.replica_lag = app.config.get('DATABASE_REPLICA_MAX_LAG', 5) if app.config.get('DATABASE_REPLICA_URL') else 0
+        self.recent_changes = cache_from_uri(
+            app.config.get('SHARED_CACHE_URL', 'memory://'),
+            maxsize=4096,
+            ttl=self.replica_lag,
+            name='recent_changes'
+        )
+        
+        # Drop cached identities whenever a user or one of their keys changes
+        if not event.contains(Session, 'after_flush', _collect_changed_users):
+            event.listen(Session, 'after_flush', _collect_changed_users)
+            event.listen(Session, 'after_commit', _invalidate_changed_users)
+            event.listen(Session, 'after_rollback', _discard_changed_users)
+    
+    def after_fork(self):
+        """Re-create shared cache connections in a forked worker"""
+        self.user_cache.reconnect()
+        self.recent_changes.reconnect()
+    
+    def changed_recently(self, user_id):
+        """Whether a user or their keys changed recently enough for the replica to lag"""
+        return bool(self.replica_lag) and self.recent_changes.get(str(user_id)) is not None
+    
+    def get_identity(self, user_id):
+        """
+        Get a user and their API keys as plain data, with as few queries as possible
+        
+        Results are memoized for the current request and cached for a
+        short TTL across requests. On a miss the user and their keys are
+        loaded together with selectinload.
+        
+        Returns:
+            dict: {'user': ..., 'api_keys': [...]} or None if the user does not exist
+        """
+        cache_key = str(user_id)
+        memo = g.setdefault('identities', {}) if has_app_context() else {}
+        if cache_key in memo:
+            return memo[cache_key]
+        
+        identity = self.user_cache.get(cache_key)
+        if identity is None:
+            # Caching what a lagging replica returns would undo an invalidation
+            with read_only(not self.changed_recently(user_id)):
+                user = User.query.options(selectinload(User.api_keys)).get(user_id)
+            if user is None:
+                return None
+            
+            identity = {
+                'user': user.to_dict(),
+                'api_keys': [key.to_safe_dict() for key in user.api_keys]
+            }
+            self.user_cache.set(cache_key, identity)
+        
+        memo[cache_key] = identity
+        return identity
+    
+    def invalidate_identity(self, user_id):
+        """Forget the cached identity of a user (and read it from the primary while the replica may lag)"""
+        cache_key = str(user_id)
+        self.user_cache.delete(cache_key)
+        if self.replica_lag:
+            self.recent_changes.set(cache_key, True)
+        if has_app_context():
+            g.get('identities', {}).pop(cache_key, None)
     
     def register_user(self, username, email, password):
         """Register a new user"""
@@ -39,7 +133,8 @@ class AuthService:
                 password=password
             )
             db.session.add(user)
-            db.session.commit()
+            # Assigns the user ID; the request commits
+            db.session.flush()
             
             # Generate tokens
             tokens = self._generate_tokens(user)
@@ -49,9 +144,12 @@ class AuthService:
                 'user': user.to_dict(),
                 **tokens
             }, 201
+        except HashingPoolBusy:
+            db.session.rollback()
+            return self.BUSY_RESPONSE
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error registering user: {str(e)}")
+            current_app.logger.error('Error registering user: %s', e)
             return {'error': 'Failed to register user'}, 500
     
     def login_user(self, username_or_email, password):
@@ -60,18 +158,25 @@ class AuthService:
         user = User.query.filter((User.username == username_or_email) | 
                                 (User.email == username_or_email)).first()
         
-        if not user or not user.check_password(password):
-            return {'error': 'Invalid credentials'}, 401
+        try:
+            if not user or not user.check_password(password):
+                return {'error': 'Invalid credentials'}, 401
+            
+            # Upgrade the hash when the configured work factor has changed
+            if user.password_needs_rehash():
+                user.set_password(password)
+        except HashingPoolBusy:
+            return self.BUSY_RESPONSE
         
-        # Update last login timestamp
-        user.update_last_login()
+        # Update last login timestamp (a rehashed password is saved regardless)
+        user.update_last_login(self.last_used_granularity)
         
         # Generate tokens
         tokens = self._generate_tokens(user)
         
         # Log token info
         if 'access_token' in tokens:
-            current_app.logger.info(f"Generated access token for user {user.id}: {tokens['access_token'][:20]}...")
+            current_app.logger.info('Generated access token for user %s', user.id)
         
         return {
             'message': 'Login successful',
@@ -95,7 +200,7 @@ class AuthService:
             )
             
             db.session.add(api_key)
-            db.session.commit()
+            db.session.flush()
             
             # Return the full API key information (including the key value)
             # This is the only time the key value will be returned
@@ -103,26 +208,27 @@ class AuthService:
                 'message': 'API key created successfully',
                 'api_key': api_key.to_dict()
             }, 201
+        except HashingPoolBusy:
+            db.session.rollback()
+            return self.BUSY_RESPONSE
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error creating API key: {str(e)}")
+            current_app.logger.error('Error creating API key: %s', e)
             return {'error': 'Failed to create API key'}, 500
     
     def get_user_api_keys(self, user_id):
         """Get all API keys for a user"""
         try:
-            user = User.query.get(user_id)
-            if not user:
+            identity = self.get_identity(user_id)
+            if not identity:
                 return {'error': 'User not found'}, 404
             
             # Return list of API keys (without key values)
-            api_keys = [key.to_safe_dict() for key in user.api_keys]
-            
             return {
-                'api_keys': api_keys
+                'api_keys': identity['api_keys']
             }, 200
         except Exception as e:
-            current_app.logger.error(f"Error retrieving API keys: {str(e)}")
+            current_app.logger.error('Error retrieving API keys: %s', e)
             return {'error': 'Failed to retrieve API keys'}, 500
     
     def revoke_api_key(self, user_id, key_id):
@@ -144,62 +250,81 @@ class AuthService:
                 'message': 'API key revoked successfully'
             }, 200
         except Exception as e:
-            current_app.logger.error(f"Error revoking API key: {str(e)}")
+            current_app.logger.error('Error revoking API key: %s', e)
             return {'error': 'Failed to revoke API key'}, 500
     
     def validate_api_key(self, api_key_value):
         """Validate an API key and return the associated user"""
         try:
-            # Find API key by value
-            api_keys = APIKey.query.all()
-            found_key = None
-            
-            for key in api_keys:
-                if key.check_key(api_key_value):
-                    found_key = key
-                    break
-                    
-            if not found_key:
+            # Find API key by value (indexed) on the replica, then verify it
+            # against its hash
+            with read_only():
+                found_key = APIKey.query.filter_by(key_value=api_key_value).first()
+            
+            # The replica may not have a new key yet, or still show a key
+            # revoked (or otherwise changed) within its lag: look again on
+            # the primary
+            if found_key is None or self.changed_recently(found_key.user_id):
+                found_key = APIKey.query.filter_by(key_value=api_key_value).populate_existing().first()
+            
+            if not found_key or not self.key_matches(found_key, api_key_value):
                 return None, {'error': 'Invalid API key'}, 401
             
             # Check if key is active and not expired
             if not found_key.is_valid():
                 return None, {'error': 'API key is expired or inactive'}, 401
             
-            # Log usage
-            found_key.log_usage()
-            
             # Return the user associated with this key
-            user = User.query.get(found_key.user_id)
+            with read_only():
+                user = User.query.get(found_key.user_id)
+            
+            # Log usage last: the change is committed with the request and
+            # a later query would flush it (and take the write lock) early
+            found_key.log_usage(self.last_used_granularity)
             
             return found_key, {'user': user.to_dict()}, 200
+        except HashingPoolBusy:
+            return (None, *self.BUSY_RESPONSE)
         except Exception as e:
-            current_app.logger.error(f"Error validating API key: {str(e)}")
+            current_app.logger.error('Error validating API key: %s', e)
             return None, {'error': 'Failed to validate API key'}, 500
     
+    def key_matches(self, api_key, api_key_value):
+        """
+        Check a presented key against its hash, remembering matches
+        
+        A match is cached for API_KEY_VERIFY_TTL seconds under the key's id
+        and hash, so a new hash is checked again. Whether the key is still
+        active is checked on every request, not cached.
+        """
+        digest = hashlib.sha256(api_key_value.encode('utf-8')).hexdigest()
+        cache_key = f'{api_key.id}:{api_key.key_hash}'
+        if self.key_cache.get(cache_key) == digest:
+            return True
+        
+        matches = api_key.check_key(api_key_value)
+        if matches:
+            self.key_cache.set(cache_key, digest)
+        return matches
+    
     def _generate_tokens(self, user):
         """Generate access and refresh tokens for a user"""
         try:
             # Convert user ID to string to avoid type issues
             user_id_str = str(user.id)
             
-            # Log the JWT secret key being used
-            current_app.logger.info(f"Generating tokens with JWT_SECRET_KEY: {current_app.config['JWT_SECRET_KEY']}")
-            
             access_token = create_access_token(identity=user_id_str)
             refresh_token = create_refresh_token(identity=user_id_str)
             
             # Log successful token generation
-            current_app.logger.info(f"Generated tokens for user ID: {user_id_str}")
+            current_app.logger.debug('Generated tokens for user ID: %s', user_id_str)
             
             return {
                 'access_token': access_token,
                 'refresh_token': refresh_token
             }
         except Exception as e:
-            current_app.logger.error(f"Error generating tokens: {str(e)}")
-            import traceback
-            current_app.logger.error(traceback.format_exc())
+            current_app.logger.exception('Error generating tokens: %s', e)
             return {'error': 'Failed to generate authentication tokens'}
     
     def _validate_password(self, password):
@@ -207,7 +332,7 @@ class AuthService:
         # At least 8 characters, 1 uppercase, 1 lowercase, 1 number, 1 special character
         if len(password) < 8:
             return False
-            
+        
         patterns = [
             r'[A-Z]',  # Uppercase
             r'[a-z]',  # Lowercase
@@ -217,5 +342,21 @@ class AuthService:
         
         return all(re.search(pattern, password) for pattern in patterns)
 
+def _collect_changed_users(session, flush_context):
+    """Remember which users were affected by a flush (after_flush hook)"""
+    changed = session.info.setdefault('changed_user_ids', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+        elif isinstance(obj, APIKey):
+            changed.add(obj.user_id)
+
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        auth_service.invalidate_identity(user_id)
+
+def _discard_changed_users(session):
+    session.info.pop('changed_user_ids', None)
+
 # Initialize the auth service
 auth_service = AuthService()
\ No newline at end of file
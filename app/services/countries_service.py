@@ -1,13 +1,77 @@
 import requests
+import time
+import zlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from flask import current_app
+from app.models.country import Country
+from app.utils.cache import TTLCache
+from sqlalchemy.exc import SQLAlchemyError
+from app.database import db
+from app.utils.changefeed import ChangeFeed, SharedChangeLog
+from app.utils.columnar import CountryColumns
+from app.utils.response_store import ResponseStore, response_key
+from app.utils.metrics import upstream_requests_total, upstream_request_duration_seconds, cache_requests_total
+from app.utils.timing import phase
 import json
 
+# Cache key of the columnar view of the /all dataset
+COLUMNS_KEY = 'columns:all'
+
+def split_codes(value):
+    """Split a comma-separated filter value into unique, non-empty codes"""
+    codes = []
+    for code in value.split(','):
+        code = code.strip()
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+def merge_countries(results):
+    """Merge country lists in order, dropping countries already seen"""
+    merged = []
+    seen = set()
+    for countries in results:
+        for country in countries:
+            if country.key not in seen:
+                seen.add(country.key)
+                merged.append(country)
+    return merged
+
+def unavailable_error(failed, timed_out):
+    """
+    Error dict naming the codes upstream did not answer, or None
+    
+    504 if any code missed the fan-out deadline, otherwise 502.
+    """
+    if not failed and not timed_out:
+        return None
+    
+    reasons = []
+    if timed_out:
+        reasons.append(f"Upstream deadline exceeded for: {', '.join(timed_out)}")
+    if failed:
+        reasons.append(f"Upstream request failed for: {', '.join(failed)}")
+    return {'error': '; '.join(reasons), 'status': 504 if timed_out else 502}
+
 class CountriesService:
     """Service for interacting with RestCountries API"""
     
     def __init__(self, app=None):
         self.app = app
         self.base_url = None
+        self.cache = TTLCache(name='countries')
+        self.negative_cache = TTLCache(name='countries_negative')
+        self.executor = None
+        self.fanout_workers = 0
+        self.fanout_deadline = 10.0
+        self.max_codes = 10
+        self.feed = ChangeFeed()
+        self.change_log = SharedChangeLog()
+        self._refresher = None
+        self.response_store = None
+        self.store_ttl = 3600
         
         if app is not None:
             self.init_app(app)
@@ -16,90 +80,462 @@ class CountriesService:
         """Initialize with Flask app"""
         self.app = app
         self.base_url = app.config.get('COUNTRIES_API_URL', 'https://restcountries.com/v3.1')
+        self.cache = TTLCache(
+            maxsize=app.config.get('COUNTRIES_CACHE_SIZE', 256),
+            ttl=app.config.get('COUNTRIES_CACHE_TTL', 300),
+            name='countries'
+        )
+        self.negative_cache = TTLCache(
+            maxsize=app.config.get('NEGATIVE_CACHE_SIZE', 1024),
+            ttl=app.config.get('NEGATIVE_CACHE_TTL', 60),
+            name='countries_negative'
+        )
+        
+        # Bounded pool for fanning out multi-code lookups
+        self.fanout_deadline = app.config.get('UPSTREAM_FANOUT_DEADLINE', 10.0)
+        self.max_codes = app.config.get('UPSTREAM_FANOUT_MAX_CODES', 10)
+        workers = app.config.get('UPSTREAM_FANOUT_WORKERS', 8)
+        if self.executor is None or workers != self.fanout_workers:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='countries-fanout')
+            self.fanout_workers = workers
+        
+        # Persistent upstream responses
+        self.response_store = None
+        self.store_ttl = app.config.get('UPSTREAM_STORE_TTL', 3600)
+        store_path = app.config.get('UPSTREAM_STORE_PATH')
+        if store_path:
+            self.response_store = ResponseStore(store_path)
+            self.response_store.purge(app.config.get('UPSTREAM_STORE_MAX_STALE', 7 * 86400))
+        
+        # This process' copy of the dataset starts over with the cache;
+        # versions and the change log are kept in the database
+        self.feed = ChangeFeed()
+        self.change_log = SharedChangeLog(app.config.get('COUNTRIES_CHANGE_LOG_SIZE', 10000))
+        
+        # A preloading master does not refresh: a thread holding a lock
+        # when a worker is forked would leave it held in the worker.
+        # Workers start their own refresher in after_fork.
+        interval = app.config.get('COUNTRIES_REFRESH_INTERVAL', 0)
+        self.start_refresher(app, 0 if app.config.get('PRELOADING') else interval)
     
-    def _make_request(self, endpoint, params=None):
-        """Make a request to the RestCountries API"""
+    def after_fork(self, app):
+        """
+        Re-create per-process resources in a forked worker
+        
+        Threads and SQLite connections do not survive a fork; the cached
+        dataset, records and indexes are kept and shared copy-on-write.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=self.fanout_workers, thread_name_prefix='countries-fanout')
+        if self.response_store is not None:
+            self.response_store.reconnect()
+        self.start_refresher(app, app.config.get('COUNTRIES_REFRESH_INTERVAL', 0))
+    
+    def shutdown(self, app):
+        """Stop the refresher and let in-flight fan-out lookups finish"""
+        self.start_refresher(app, 0)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+    
+    def start_refresher(self, app, interval):
+        """Refresh the dataset every interval seconds on a daemon thread (0 stops it)"""
+        if self._refresher is not None:
+            self._refresher.set()
+            self._refresher = None
+        if interval <= 0:
+            return
+        
+        stop = self._refresher = threading.Event()
+        
+        def run():
+            while not stop.wait(interval):
+                with app.app_context():
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        app.logger.error('Error refreshing countries: %s', e)
+        
+        threading.Thread(target=run, name='countries-refresh', daemon=True).start()
+    
+    def _make_request(self, endpoint, params=None, revalidate=False):
+        """
+        Make a request to the RestCountries API
+        
+        With a response store, a fresh stored response is returned without
+        a request, a stale one is revalidated with If-None-Match, and it is
+        served as it is when the upstream API fails or cannot be reached.
+        With revalidate, even a fresh stored response is revalidated, so
+        upstream is always asked and the ETag only saves the body.
+        
+        Returns:
+            tuple: (data, live) where live is whether upstream answered
+            (200 or 304) rather than data coming from the store alone
+        """
         if self.base_url is None:
             self.base_url = current_app.config.get('COUNTRIES_API_URL', 'https://restcountries.com/v3.1')
         
+        key = response_key(endpoint, params)
+        stored = self.get_stored(key)
+        if stored is not None and stored.fresh() and not revalidate:
+            return stored.data, False
+        
         url = f"{self.base_url}/{endpoint}"
+        headers = {'If-None-Match': stored.etag} if stored is not None and stored.etag else None
+        start = time.perf_counter()
+        outcome = 'success'
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+            with phase('upstream'):
+                response = requests.get(url, params=params, headers=headers)
+                if stored is not None and response.status_code == 304:
+                    outcome = 'not_modified'
+                    self.revalidated(key)
+                    return stored.data, True
+                response.raise_for_status()
+                data = response.json()
+            self.save_response(key, response.content, response.headers.get('ETag'))
+            return data, True
+        except requests.HTTPError as e:
+            status_code = e.response.status_code if e.response is not None else None
+            outcome = f'http_{status_code}' if status_code is not None else 'http_error'
+            current_app.logger.error('Countries API error: %s', e)
+            if stored is not None and (status_code is None or status_code >= 500):
+                return stored.data, False
+            return {'error': str(e), 'status': status_code}, False
         except requests.RequestException as e:
-            current_app.logger.error(f"Countries API error: {str(e)}")
-            return {'error': str(e)}
+            outcome = 'error'
+            current_app.logger.error('Countries API error: %s', e)
+            if stored is not None:
+                return stored.data, False
+            return {'error': str(e)}, False
+        finally:
+            upstream_requests_total.inc(outcome=outcome)
+            upstream_request_duration_seconds.observe(time.perf_counter() - start, outcome=outcome)
     
-    def _filter_country_data(self, country):
-        """Filter country data to include only required fields"""
+    def get_stored(self, key):
+        """Get a persisted upstream response, fresh or stale, or None"""
+        if self.response_store is None:
+            return None
+        
         try:
-            # Handle different API response structures
-            filtered = {
-                'name': country.get('name', {}).get('common', ''),
-                'official_name': country.get('name', {}).get('official', ''),
-                'capital': country.get('capital', [''])[0] if country.get('capital') else '',
-                'languages': country.get('languages', {}),
-                'currencies': {},
-                'flag': country.get('flags', {}).get('png', '')
-            }
-            
-            # Process currencies
-            currencies = country.get('currencies', {})
-            for code, details in currencies.items():
-                filtered['currencies'][code] = {
-                    'name': details.get('name', ''),
-                    'symbol': details.get('symbol', '')
-                }
-            
-            return filtered
-        except Exception as e:
-            current_app.logger.error(f"Error filtering country data: {str(e)}")
+            with phase('cache'):
+                stored = self.response_store.get(key)
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            current_app.logger.warning('Upstream store read failed: %s', e)
+            return None
+        
+        result = 'miss' if stored is None else 'hit' if stored.fresh() else 'stale'
+        cache_requests_total.inc(cache='upstream_store', result=result)
+        return stored
+    
+    def save_response(self, key, body, etag=None):
+        """Persist a raw upstream response body"""
+        if self.response_store is None:
+            return
+        try:
+            self.response_store.put(key, body, etag, self.store_ttl)
+        except sqlite3.Error as e:
+            current_app.logger.warning('Upstream store write failed: %s', e)
+    
+    def revalidated(self, key):
+        """Restart the TTL of a persisted response that upstream reported unchanged"""
+        if self.response_store is None:
+            return
+        try:
+            self.response_store.touch(key, self.store_ttl)
+        except sqlite3.Error as e:
+            current_app.logger.warning('Upstream store write failed: %s', e)
+    
+    def _get_countries(self, endpoint):
+        """
+        Get filtered countries for an endpoint, using the cache when possible
+        
+        Returns the filtered list, or None if the upstream request failed
+        or returned no list.
+        """
+        return self._lookup(endpoint)[0]
+    
+    def _lookup(self, endpoint):
+        """
+        Get filtered countries for an endpoint, telling failures from misses
+        
+        Returns:
+            tuple: (countries, failed) - the filtered list or None, and
+            whether None means the upstream request failed rather than
+            upstream finding nothing
+        """
+        cached = self.get_cached(endpoint)
+        if cached is not None:
+            return cached, False
+        if self.is_missing(endpoint):
+            return None, False
+        
+        countries, live = self._make_request(endpoint)
+        if isinstance(countries, dict) and countries.get('status') == 404:
+            self.remember_missing(endpoint)
+            return None, False
+        
+        filtered = self.store(endpoint, countries, live)
+        return filtered, filtered is None
+    
+    def is_missing(self, endpoint):
+        """Whether upstream recently answered 404 for an endpoint"""
+        with phase('cache'):
+            return self.negative_cache.get(_normalize(endpoint)) is not None
+    
+    def remember_missing(self, endpoint):
+        """Remember that upstream answered 404 for an endpoint"""
+        self.negative_cache.set(_normalize(endpoint), True)
+    
+    def get_countries_for_codes(self, kind, codes):
+        """
+        Get countries matching any of several codes, fetching them concurrently
+        
+        Each code is looked up on the fan-out pool; lookups still running
+        when the deadline passes are abandoned (they may still fill the
+        cache for a later request).
+        
+        Args:
+            kind: Upstream path prefix ('currency', 'lang' or 'region')
+            codes: List of codes
+        
+        Returns:
+            tuple: (countries, failed, timed_out) - the merged, de-duplicated
+            list, or None if no code matched, the codes whose upstream
+            request failed and the codes that missed the deadline
+        """
+        if len(codes) == 1:
+            countries, failed = self._lookup(f'{kind}/{codes[0]}')
+            return countries, codes if failed else [], []
+        
+        app = current_app._get_current_object()
+        
+        def fetch(code):
+            with app.app_context():
+                return self._lookup(f'{kind}/{code}')
+        
+        with phase('upstream'):
+            futures = [self.executor.submit(fetch, code) for code in codes]
+            done, pending = wait(futures, timeout=self.fanout_deadline)
+        
+        results = []
+        failed = []
+        timed_out = []
+        for code, future in zip(codes, futures):
+            if future in pending:
+                future.cancel()
+                timed_out.append(code)
+            elif future.exception() is not None or future.result()[1]:
+                failed.append(code)
+            elif future.result()[0] is not None:
+                results.append(future.result()[0])
+        
+        return (merge_countries(results) if results else None), failed, timed_out
+    
+    def _get_countries_by_codes(self, kind, value, not_found):
+        """
+        Look up a comma-separated filter value; returns a list or an error dict
+        
+        Codes upstream could not answer (in time) fail the request with 504
+        or 502 naming them, rather than being left out of the result or
+        reported as not found. Codes that were answered are cached, so a
+        retry only waits for the others.
+        """
+        codes = split_codes(value)
+        if not codes:
+            return {'error': not_found}
+        if len(codes) > self.max_codes:
+            return {'error': f'At most {self.max_codes} codes can be requested at once', 'status': 400}
+        
+        countries, failed, timed_out = self.get_countries_for_codes(kind, codes)
+        
+        error = unavailable_error(failed, timed_out)
+        if error is not None:
+            return error
+        if countries is not None:
+            return countries
+        return {'error': not_found}
+    
+    def get_cached(self, endpoint):
+        """Get the cached filtered countries for an endpoint, or None"""
+        with phase('cache'):
+            return self.cache.get(endpoint)
+    
+    def store(self, endpoint, countries, live):
+        """
+        Filter an upstream response and cache it for an endpoint
+        
+        live is whether upstream answered, rather than the response store
+        alone (see _make_request). Returns the filtered list, or None if
+        the response is not a list.
+        """
+        if not isinstance(countries, list):
+            return None
+        if endpoint == 'all':
+            return self._store_all(countries, live)[0]
+        
+        with phase('filter'):
+            filtered = [self._filter_country_data(country) for country in countries]
+        
+        self.cache.set(endpoint, filtered)
+        return filtered
+    
+    def _store_all(self, countries, live):
+        """
+        Diff a fetched /all dataset and cache it
+        
+        Only countries whose content changed get new records, and only the
+        cached endpoints whose results include a changed country are dropped.
+        A dataset upstream answered with (live) is then recorded in the
+        shared change log. One from this host's response store alone may be
+        older than what other instances recorded, and would revert it.
+        
+        Returns (filtered, changed, version): filtered and changed as
+        ChangeFeed.apply, and the shared version (None if not recorded)
+        """
+        with phase('filter'):
+            filtered, changed = self.feed.apply(countries, self._filter_country_data)
+            self.cache.set(COLUMNS_KEY, CountryColumns(countries))
+        
+        if changed:
+            self._invalidate(changed)
+            # Added or renamed countries may answer lookups that used to miss
+            self.negative_cache.clear()
+        self.cache.set('all', filtered)
+        return filtered, changed, self._record_changes() if live else None
+    
+    def _record_changes(self):
+        """Record this process' dataset in the shared change log; returns the version or None"""
+        try:
+            return self.change_log.record(db.engine, self.feed.snapshot())
+        except (SQLAlchemyError, RuntimeError) as e:
+            current_app.logger.error('Recording countries changes failed: %s', e)
+            return None
+    
+    def _invalidate(self, changed):
+        """Drop cached filter and name lookups that include a changed country"""
+        endpoints = set()
+        names = set()
+        for _, country_endpoints, country_names in changed.values():
+            endpoints |= country_endpoints
+            names |= country_names
+        
+        for key in self.cache.keys():
+            lowered = key.lower()
+            if lowered in endpoints:
+                self.cache.delete(key)
+            elif lowered.startswith('name/') and any(lowered[5:] in name for name in names):
+                self.cache.delete(key)
+    
+    def refresh(self):
+        """
+        Re-fetch /all and apply the differences
+        
+        Upstream is always asked, even while the stored response is fresh;
+        if it answers 304 Not Modified, the stored body is reused.
+        
+        Returns:
+            dict: The new version and counts of added, updated and removed
+            countries, or None if the upstream request failed
+        """
+        countries, live = self._make_request('all', revalidate=True)
+        if not isinstance(countries, list):
+            return None
+        
+        _, changed, version = self._store_all(countries, live)
+        summary = {'version': version, 'added': 0, 'updated': 0, 'removed': 0}
+        for change, _, _ in changed.values():
+            summary[change] += 1
+        return summary
+    
+    def get_changes(self, since):
+        """
+        Get the countries changed after a dataset version
+        
+        Returns:
+            dict: The current version and the latest change per country
+            (with its data unless removed), or an error dict with a status
+        """
+        try:
+            if self.change_log.version(db.engine) == 0 and self._get_countries('all') is None:
+                return {'error': 'Failed to retrieve countries', 'status': 500}
+            version, changes = self.change_log.changes_since(db.engine, since)
+        except SQLAlchemyError as e:
+            current_app.logger.error('Reading countries changes failed: %s', e)
+            return {'error': 'Change feed unavailable', 'status': 503}
+        
+        if changes is None:
             return {
-                'name': country.get('name', {}).get('common', ''),
-                'error': 'Could not parse all data'
+                'error': f'Changes since version {since} are not available; re-download /countries',
+                'status': 410
             }
+        return {'version': version, 'since': since, 'changes': changes}
+    
+    def get_columns(self):
+        """
+        Get the columnar view of all countries for aggregate queries
+        
+        Returns a CountryColumns, or None if the upstream request failed
+        """
+        with phase('cache'):
+            columns = self.cache.get(COLUMNS_KEY)
+        if columns is not None:
+            return columns
+        
+        countries, live = self._make_request('all')
+        if not isinstance(countries, list):
+            return None
+        
+        self._store_all(countries, live)
+        return self.cache.get(COLUMNS_KEY)
+    
+    def _filter_country_data(self, country):
+        """Filter country data into a shared Country record"""
+        try:
+            return Country.from_api(country)
+        except Exception as e:
+            current_app.logger.error('Error filtering country data: %s', e)
+            return Country.unparsed(country.get('name', {}).get('common', ''))
     
     def get_all_countries(self):
         """Get a list of all countries with filtered data"""
-        countries = self._make_request('all')
+        countries = self._get_countries('all')
         
-        if isinstance(countries, list):
-            return [self._filter_country_data(country) for country in countries]
+        if countries is not None:
+            return countries
         return {'error': 'Failed to retrieve countries'}
     
     def get_country_by_name(self, name):
         """Get a specific country by name"""
-        countries = self._make_request(f'name/{name}')
+        countries = self._get_countries(f'name/{name}')
         
-        if isinstance(countries, list) and countries:
-            return [self._filter_country_data(country) for country in countries]
+        if countries:
+            return countries
         return {'error': f'Country not found: {name}'}
     
     def get_countries_by_currency(self, currency_code):
-        """Get countries by currency code"""
-        countries = self._make_request(f'currency/{currency_code}')
-        
-        if isinstance(countries, list):
-            return [self._filter_country_data(country) for country in countries]
-        return {'error': f'No countries found with currency: {currency_code}'}
+        """Get countries by currency code (or comma-separated codes)"""
+        return self._get_countries_by_codes(
+            'currency', currency_code, f'No countries found with currency: {currency_code}'
+        )
     
     def get_countries_by_language(self, language_code):
-        """Get countries by language code"""
-        countries = self._make_request(f'lang/{language_code}')
-        
-        if isinstance(countries, list):
-            return [self._filter_country_data(country) for country in countries]
-        return {'error': f'No countries found with language: {language_code}'}
+        """Get countries by language code (or comma-separated codes)"""
+        return self._get_countries_by_codes(
+            'lang', language_code, f'No countries found with language: {language_code}'
+        )
     
     def get_countries_by_region(self, region):
-        """Get countries by region"""
-        countries = self._make_request(f'region/{region}')
-        
-        if isinstance(countries, list):
-            return [self._filter_country_data(country) for country in countries]
-        return {'error': f'No countries found in region: {region}'}
+        """Get countries by region (or comma-separated regions)"""
+        return self._get_countries_by_codes(
+            'region', region, f'No countries found in region: {region}'
+        )
+
+def _normalize(endpoint):
+    """Negative cache key of an endpoint; upstream lookups ignore case"""
+    return ' '.join(endpoint.lower().split())
 
 # Create an instance to be used with init_app pattern
-countries_service = CountriesService()
\ No newline at end of file
+countries_service = CountriesService()
@@ -0,0 +1,329 @@
+import math
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+
+# Seconds per unit accepted in rate strings such as "60/minute"
+RATE_UNITS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Lua script applying GCRA and fixed-window quotas in one round trip.
+# KEYS: rate key, daily key, monthly key
+# ARGV: now, emission interval, period, daily limit, monthly limit,
+#       daily ttl, monthly ttl (limits <= 0 mean unlimited)
+REDIS_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local daily_limit = tonumber(ARGV[4])
+local monthly_limit = tonumber(ARGV[5])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+local daily = tonumber(redis.call('GET', KEYS[2]) or 0)
+local monthly = tonumber(redis.call('GET', KEYS[3]) or 0)
+local new_tat = math.max(tat, now) + interval
+if daily_limit > 0 and daily >= daily_limit then
+    return {0, tostring(math.max(tat, now)), daily, monthly, 'daily'}
+end
+if monthly_limit > 0 and monthly >= monthly_limit then
+    return {0, tostring(math.max(tat, now)), daily, monthly, 'monthly'}
+end
+if new_tat - now > period then
+    return {0, tostring(math.max(tat, now)), daily, monthly, 'rate'}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(period * 1000))
+daily = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+monthly = redis.call('INCR', KEYS[3])
+redis.call('EXPIRE', KEYS[3], ARGV[7])
+return {1, tostring(new_tat), daily, monthly, ''}
+"""
+
+def parse_rate(rate):
+    """Parse a rate string like "60/minute" into (limit, period_seconds)"""
+    try:
+        count, unit = rate.split('/')
+        return int(count), RATE_UNITS[unit.strip().rstrip('s')]
+    except (ValueError, KeyError, AttributeError):
+        raise ValueError(f"Invalid rate: {rate!r}. Use e.g. '60/minute'")
+
+def gcra(tat, now, interval, period, daily, monthly, daily_limit, monthly_limit):
+    """
+    Apply the generic cell rate algorithm plus quota checks
+    
+    Returns (allowed, new_tat, exceeded) where exceeded names the limit
+    that rejected the request ('rate', 'daily', 'monthly') or is None.
+    """
+    tat = max(tat if tat is not None else now, now)
+    
+    if daily_limit and daily >= daily_limit:
+        return False, tat, 'daily'
+    if monthly_limit and monthly >= monthly_limit:
+        return False, tat, 'monthly'
+    
+    new_tat = tat + interval
+    if new_tat - now > period:
+        return False, tat, 'rate'
+    
+    return True, new_tat, None
+
+class MemoryStore:
+    """
+    Per-process counter store; suitable for a single worker or tests
+    
+    Expired counters are ignored and purged every PURGE_EVERY writes.
+    """
+    
+    PURGE_EVERY = 100
+    
+    def __init__(self):
+        self._data = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+    
+    def _get(self, key, now):
+        value, expires_at = self._data.get(key, (None, 0))
+        return value if expires_at > now else None
+    
+    def hit(self, keys, now, interval, period, daily_limit, monthly_limit, daily_ttl, monthly_ttl):
+        rate_key, daily_key, monthly_key = keys
+        with self._lock:
+            daily = self._get(daily_key, now) or 0
+            monthly = self._get(monthly_key, now) or 0
+            allowed, tat, exceeded = gcra(
+                self._get(rate_key, now), now, interval, period,
+                daily, monthly, daily_limit, monthly_limit
+            )
+            if allowed:
+                daily += 1
+                monthly += 1
+                self._data[rate_key] = (tat, now + period)
+                self._data[daily_key] = (daily, now + daily_ttl)
+                self._data[monthly_key] = (monthly, now + monthly_ttl)
+                
+                self._writes += 1
+                if self._writes % self.PURGE_EVERY == 0:
+                    self._data = {key: entry for key, entry in self._data.items() if entry[1] > now}
+        return allowed, tat, daily, monthly, exceeded
+    
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+    
+    def reconnect(self):
+        """Nothing to re-create in a forked process"""
+    
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteStore:
+    """
+    Counter store in a SQLite file shared by every process on the host
+    
+    Each hit reads and updates all counters for a key inside a single
+    IMMEDIATE transaction, so concurrent workers cannot double-spend.
+    Expired counters are ignored and purged every PURGE_EVERY writes.
+    """
+    
+    PURGE_EVERY = 100
+    
+    def __init__(self, path):
+        self.path = path
+        self._writes = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_counters ('
+                'key TEXT PRIMARY KEY, value REAL NOT NULL, expires_at REAL NOT NULL)'
+            )
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def hit(self, keys, now, interval, period, daily_limit, monthly_limit, daily_ttl, monthly_ttl):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = dict(conn.execute(
+                'SELECT key, value FROM rate_limit_counters WHERE key IN (?, ?, ?) AND expires_at > ?',
+                (*keys, now)
+            ).fetchall())
+            daily = int(rows.get(keys[1], 0))
+            monthly = int(rows.get(keys[2], 0))
+            allowed, tat, exceeded = gcra(
+                rows.get(keys[0]), now, interval, period,
+                daily, monthly, daily_limit, monthly_limit
+            )
+            if allowed:
+                daily += 1
+                monthly += 1
+                conn.executemany(
+                    'INSERT INTO rate_limit_counters (key, value, expires_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+                    [
+                        (keys[0], tat, now + period),
+                        (keys[1], daily, now + daily_ttl),
+                        (keys[2], monthly, now + monthly_ttl)
+                    ]
+                )
+                
+                self._writes += 1
+                if self._writes % self.PURGE_EVERY == 0:
+                    conn.execute('DELETE FROM rate_limit_counters WHERE expires_at <= ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, tat, daily, monthly, exceeded
+    
+    def reset(self):
+        self._connect().execute('DELETE FROM rate_limit_counters')
+    
+    def reconnect(self):
+        """Drop connections inherited from a parent process"""
+        self._local = threading.local()
+    
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM rate_limit_counters').fetchone()[0]
+
+class RedisStore:
+    """
+    Counter store in Redis (or any server speaking its protocol)
+    
+    Requires the redis package. All counters for a hit are evaluated by
+    one server-side script, i.e. one network round trip per request.
+    """
+    
+    def __init__(self, url, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._script = client.register_script(REDIS_SCRIPT)
+    
+    def hit(self, keys, now, interval, period, daily_limit, monthly_limit, daily_ttl, monthly_ttl):
+        allowed, tat, daily, monthly, exceeded = self._script(
+            keys=list(keys),
+            # Whole seconds, rounded up: EXPIRE 0 in the last second of a
+            # window would delete the counter and reopen the quota
+            args=[now, interval, period, daily_limit or 0, monthly_limit or 0,
+                  max(1, math.ceil(daily_ttl)), max(1, math.ceil(monthly_ttl))]
+        )
+        if isinstance(exceeded, bytes):
+            exceeded = exceeded.decode()
+        return bool(allowed), float(tat), int(daily), int(monthly), exceeded or None
+    
+    def reset(self):
+        self.client.flushdb()
+    
+    def reconnect(self):
+        """Drop connections inherited from a parent process"""
+        self.client.connection_pool.reset()
+
+def store_from_uri(uri):
+    """Create a counter store from a memory://, sqlite:/// or redis:// URI"""
+    scheme = urlparse(uri).scheme
+    if scheme == 'memory':
+        return MemoryStore()
+    if scheme == 'sqlite':
+        return SQLiteStore(uri[len('sqlite:///'):])
+    if scheme in ('redis', 'rediss'):
+        return RedisStore(uri)
+    raise ValueError(f"Unsupported rate limit storage: {uri}")
+
+class RateLimitService:
+    """Service enforcing per-API-key rate limits and usage quotas by plan"""
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.plans = {}
+        self.default_plan = 'free'
+        self.store = MemoryStore()
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialize with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('API_KEY_RATELIMIT_ENABLED', True)
+        self.plans = app.config.get('RATE_LIMIT_PLANS', {})
+        self.default_plan = app.config.get('RATE_LIMIT_DEFAULT_PLAN', 'free')
+        self.store = store_from_uri(app.config.get('API_KEY_RATELIMIT_STORAGE_URI', 'memory://'))
+    
+    def after_fork(self):
+        """Re-create counter store connections in a forked worker"""
+        self.store.reconnect()
+    
+    def get_plan(self, plan_name):
+        """Get plan limits, falling back to the default plan"""
+        return self.plans.get(plan_name) or self.plans.get(self.default_plan) or {}
+    
+    def hit(self, key_id, plan_name=None, now=None):
+        """
+        Count one request for an API key against its plan
+        
+        Returns:
+            tuple: (allowed, headers, message) where headers are the
+            X-RateLimit-* response headers and message explains a rejection
+        """
+        plan = self.get_plan(plan_name)
+        if not self.enabled or not plan.get('rate'):
+            return True, {}, None
+        
+        limit, period = parse_rate(plan['rate'])
+        interval = period / limit
+        daily_limit = plan.get('daily')
+        monthly_limit = plan.get('monthly')
+        
+        now = time.time() if now is None else now
+        today = datetime.utcfromtimestamp(now)
+        keys = (
+            f'rate:{key_id}',
+            f'daily:{key_id}:{today:%Y%m%d}',
+            f'monthly:{key_id}:{today:%Y%m}'
+        )
+        # Quota windows end at UTC midnight and the first of next month
+        daily_ttl = 86400 - (now % 86400)
+        next_month = datetime(today.year + today.month // 12, today.month % 12 + 1, 1)
+        monthly_ttl = (next_month - today).total_seconds()
+        
+        allowed, tat, daily, monthly, exceeded = self.store.hit(
+            keys, now, interval, period, daily_limit, monthly_limit, daily_ttl, monthly_ttl
+        )
+        
+        headers = {
+            'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Remaining': str(max(0, math.floor((period - (tat - now)) / interval))),
+            'X-RateLimit-Reset': str(math.ceil(tat))
+        }
+        if daily_limit:
+            headers['X-RateLimit-Daily-Remaining'] = str(max(0, daily_limit - daily))
+        if monthly_limit:
+            headers['X-RateLimit-Monthly-Remaining'] = str(max(0, monthly_limit - monthly))
+        
+        if allowed:
+            return True, headers, None
+        
+        if exceeded == 'rate':
+            retry_after = tat + interval - period - now
+            message = f"Rate limit of {plan['rate']} exceeded"
+        elif exceeded == 'daily':
+            retry_after = daily_ttl
+            message = f"Daily quota of {daily_limit} requests exceeded"
+        else:
+            retry_after = monthly_ttl
+            message = f"Monthly quota of {monthly_limit} requests exceeded"
+        
+        headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return False, headers, message
+
+# Create an instance to be used with init_app pattern
+rate_limit_service = RateLimitService()
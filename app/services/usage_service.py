@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+from datetime import datetime
+from app.models import APIKey, APIUsage
+from app.database import db, read_only
+
+# Columns included in usage exports, in output order
+EXPORT_COLUMNS = [
+    'id', 'api_key_id', 'endpoint', 'method', 'timestamp',
+    'status_code', 'response_time_ms', 'auth_ms', 'cache_ms', 'upstream_ms',
+    'filter_ms', 'serialize_ms', 'ip_address', 'user_agent'
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+class UsageService:
+    """Service for reading and exporting API usage history"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.chunk_size = 1000
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize with Flask app"""
+        self.app = app
+        self.chunk_size = app.config.get('USAGE_EXPORT_CHUNK_SIZE', 1000)
+
+    def get_owned_api_key(self, user_id, key_id):
+        """Get an API key, checking that it belongs to the user"""
+        with read_only():
+            api_key = APIKey.query.get(key_id)
+        # A key newer than the replica is only on the primary
+        if api_key is None:
+            api_key = APIKey.query.get(key_id)
+
+        if not api_key:
+            return None, {'error': 'API key not found'}, 404
+
+        if str(api_key.user_id) != str(user_id):
+            return None, {'error': 'Unauthorized'}, 403
+
+        return api_key, None, 200
+
+    def iter_usage_rows(self, key_id, start=None, end=None):
+        """
+        Iterate over usage rows for an API key without loading them all
+
+        Rows are plain tuples in EXPORT_COLUMNS order, fetched through a
+        server-side cursor in chunks of ``chunk_size`` so memory use stays
+        constant regardless of history length. Rows are read from the
+        replica, so the most recent ones may be missing.
+        """
+        columns = [getattr(APIUsage, name) for name in EXPORT_COLUMNS]
+        query = db.session.query(*columns).filter(APIUsage.api_key_id == key_id)
+
+        if start is not None:
+            query = query.filter(APIUsage.timestamp >= start)
+        if end is not None:
+            query = query.filter(APIUsage.timestamp < end)
+
+        # Iterated lazily, so the replica routing must last until the end
+        with read_only():
+            yield from query.order_by(APIUsage.id).yield_per(self.chunk_size)
+
+    def export_usage(self, key_id, export_format='csv', start=None, end=None):
+        """
+        Generate an API key's usage history as CSV or NDJSON text chunks
+
+        Args:
+            key_id: ID of the API key to export
+            export_format: 'csv' or 'ndjson'
+            start: Only include rows at or after this datetime
+            end: Only include rows before this datetime
+
+        Yields:
+            str: Encoded rows, batched per fetched chunk
+        """
+        rows = self.iter_usage_rows(key_id, start, end)
+
+        if export_format == 'ndjson':
+            return self._export_ndjson(rows)
+        return self._export_csv(rows)
+
+    def _export_csv(self, rows):
+        """Encode rows as CSV, one header line followed by data"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        pending = 0
+
+        for row in rows:
+            writer.writerow(self._format_row(row))
+            pending += 1
+
+            if pending >= self.chunk_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+
+        yield buffer.getvalue()
+
+    def _export_ndjson(self, rows):
+        """Encode rows as newline-delimited JSON objects"""
+        lines = []
+
+        for row in rows:
+            lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, self._format_row(row)))))
+
+            if len(lines) >= self.chunk_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    def _format_row(self, row):
+        """Convert database values to export-friendly values"""
+        return [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+# Create an instance to be used with init_app pattern
+usage_service = UsageService()
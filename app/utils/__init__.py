@@ -1,8 +1,9 @@
-from app.utils.security import require_api_key, update_api_usage
+from app.utils.security import require_api_key, require_admin, update_api_usage, finalize_api_usage
 from app.utils.validators import (
     validate_username, 
     validate_email_address, 
     validate_password, 
+    validate_datetime,
     sanitize_string
 )
 from app.utils.helpers import (
@@ -10,19 +11,24 @@ from app.utils.helpers import (
     error_response,
     log_error,
     paginate_results,
+    dumps,
     JSONEncoder
 )
 
 __all__ = [
     'require_api_key',
+    'require_admin',
     'update_api_usage',
+    'finalize_api_usage',
     'validate_username',
     'validate_email_address',
     'validate_password',
+    'validate_datetime',
     'sanitize_string',
     'format_response',
     'error_response',
     'log_error',
     'paginate_results',
+    'dumps',
     'JSONEncoder'
 ]
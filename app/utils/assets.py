@@ -0,0 +1,188 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import mimetypes
+from collections import namedtuple
+from flask import current_app, request, url_for, abort
+
+# Site-wide bundles: logical name -> source files (relative to the static folder)
+DEFAULT_BUNDLES = {
+    'css/site.css': ['css/style.css'],
+    'js/site.js': ['js/main.js']
+}
+
+# Default output directory of `flask build-assets`, under the static folder
+BUILD_DIR = 'dist'
+
+# A built asset; name is its content-hashed file name
+Asset = namedtuple('Asset', 'name body gzipped mimetype')
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+def minify_css(source):
+    """Drop comments and whitespace that CSS does not need"""
+    source = _CSS_COMMENT.sub('', source)
+    source = _CSS_SPACE.sub(' ', source)
+    source = _CSS_PUNCTUATION.sub(r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+def minify_js(source):
+    """
+    Drop indentation, blank lines and whole-line // comments
+    
+    Lines are never joined, so automatic semicolon insertion is unaffected
+    and no JavaScript parser is needed.
+    """
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+def hashed_name(name, body):
+    """File name with a content hash before the extension (js/site.3f2a9c1b0d4e.js)"""
+    root, ext = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(body).hexdigest()[:12]}{ext}'
+
+class AssetPipeline:
+    """
+    Bundled, minified and fingerprinted static assets
+    
+    Every JS and CSS file under the static folder, plus the configured
+    bundles, is built at startup into a file name carrying its content
+    hash. Templates reference assets by logical name through asset_url(),
+    and the built files are served with a year-long immutable
+    Cache-Control, so browsers never revalidate them; a changed file gets
+    a new name. With debug on, assets are rebuilt when a source changes.
+    """
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.static_folder = None
+        self.bundles = DEFAULT_BUNDLES
+        self.minify = True
+        self.max_age = 31536000
+        self.auto_rebuild = False
+        self.manifest = {}
+        self.files = {}
+        # Digest of the manifest; changes whenever any asset does
+        self.version = None
+        self._mtime = 0
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialize with Flask app"""
+        self.app = app
+        self.static_folder = app.static_folder
+        self.bundles = app.config.get('ASSET_BUNDLES', DEFAULT_BUNDLES)
+        self.minify = app.config.get('ASSETS_MINIFY', True)
+        self.max_age = app.config.get('ASSETS_MAX_AGE', 31536000)
+        self.auto_rebuild = app.debug
+        self.manifest = {}
+        self.files = {}
+        self.build()
+        
+        app.add_template_global(self.url, 'asset_url')
+    
+    def sources(self):
+        """Logical asset name -> source files, for bundles and standalone files"""
+        sources = dict(self.bundles)
+        bundled = {path for paths in self.bundles.values() for path in paths}
+        for directory, subdirectories, filenames in os.walk(self.static_folder):
+            if directory == self.static_folder and BUILD_DIR in subdirectories:
+                subdirectories.remove(BUILD_DIR)
+            for filename in sorted(filenames):
+                path = os.path.relpath(os.path.join(directory, filename), self.static_folder).replace(os.sep, '/')
+                if path.endswith(('.js', '.css')) and path not in bundled:
+                    sources[path] = [path]
+        return sources
+    
+    def _source_mtime(self):
+        return max(
+            (os.path.getmtime(os.path.join(self.static_folder, path))
+             for paths in self.sources().values() for path in paths),
+            default=0
+        )
+    
+    def build(self):
+        """Build every asset and update the manifest"""
+        for name, paths in self.sources().items():
+            parts = []
+            for path in paths:
+                with open(os.path.join(self.static_folder, path), encoding='utf-8') as f:
+                    parts.append(f.read())
+            
+            if name.endswith('.css'):
+                source = '\n'.join(parts)
+                body = minify_css(source) if self.minify else source
+            else:
+                # Guard against a file ending without a semicolon
+                source = '\n;\n'.join(parts)
+                body = minify_js(source) if self.minify else source
+            
+            body = body.encode('utf-8')
+            asset = Asset(
+                name=hashed_name(name, body),
+                body=body,
+                gzipped=gzip.compress(body, compresslevel=9, mtime=0),
+                mimetype=mimetypes.guess_type(name)[0]
+            )
+            # Earlier builds stay servable for pages rendered before a rebuild
+            self.files[asset.name] = asset
+            self.manifest[name] = asset.name
+        
+        self.version = hashlib.sha256(json.dumps(self.manifest, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        self._mtime = self._source_mtime()
+    
+    def refresh(self):
+        """Rebuild if auto-rebuilding and a source changed since the last build"""
+        if self.auto_rebuild and self._source_mtime() != self._mtime:
+            self.build()
+    
+    def url(self, name):
+        """URL of an asset by logical name (falls back to the static folder)"""
+        self.refresh()
+        
+        built = self.manifest.get(name)
+        if built is None:
+            return url_for('static', filename=name)
+        return url_for('web.asset', filename=built)
+    
+    def response(self, filename):
+        """Serve a built asset with immutable caching"""
+        asset = self.files.get(filename)
+        if asset is None:
+            abort(404)
+        
+        gzipped = request.accept_encodings['gzip'] > 0
+        response = current_app.response_class(asset.gzipped if gzipped else asset.body, mimetype=asset.mimetype)
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    def write(self, output_dir):
+        """
+        Write built assets, their .gz variants and manifest.json to a directory
+        
+        For serving the assets from a web server or CDN instead of the app.
+        """
+        for asset in self.files.values():
+            path = os.path.join(output_dir, asset.name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(asset.body)
+            with open(path + '.gz', 'wb') as f:
+                f.write(asset.gzipped)
+        
+        with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        return len(self.files)
+
+# Singleton instance
+assets = AssetPipeline()
@@ -0,0 +1,262 @@
+import json
+import math
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+from app.utils.metrics import cache_requests_total, cache_evictions_total, cache_entries
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after a TTL"""
+    
+    def __init__(self, maxsize=256, ttl=300, name='default'):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """Return a cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                cache_requests_total.inc(cache=self.name, result='miss')
+                return default
+            
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._update_entries()
+                self.misses += 1
+                cache_requests_total.inc(cache=self.name, result='miss')
+                return default
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            cache_requests_total.inc(cache=self.name, result='hit')
+            return value
+    
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+                cache_evictions_total.inc(cache=self.name)
+            
+            self._update_entries()
+    
+    def delete(self, key):
+        """Remove a key if present"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._update_entries()
+    
+    def keys(self):
+        """Snapshot of the cached keys (including expired ones not yet removed)"""
+        with self._lock:
+            return list(self._data)
+    
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+            self._update_entries()
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def _update_entries(self):
+        # Called with the lock held, after every change in size
+        cache_entries.set(len(self._data), cache=self.name)
+    
+    def stats(self):
+        """Return hit/miss/eviction counters"""
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+    
+    def reconnect(self):
+        """Nothing to re-create in a forked process"""
+
+class SQLiteCache:
+    """
+    Cache in a SQLite file shared by every process on the host
+    
+    Values are stored as JSON, so they must be plain data. A delete in one
+    worker is seen by every other worker on its next read. Expired entries
+    are never returned and are purged every PURGE_EVERY writes.
+    """
+    
+    PURGE_EVERY = 100
+    
+    def __init__(self, path, ttl=300, name='default'):
+        self.path = path
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS shared_cache ('
+                'name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, '
+                'PRIMARY KEY (name, key))'
+            )
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key, default=None):
+        """Return a cached value, or default if missing or expired"""
+        row = self._connect().execute(
+            'SELECT value FROM shared_cache WHERE name = ? AND key = ? AND expires_at > ?',
+            (self.name, key, time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            cache_requests_total.inc(cache=self.name, result='miss')
+            return default
+        
+        self.hits += 1
+        cache_requests_total.inc(cache=self.name, result='hit')
+        return json.loads(row[0])
+    
+    def set(self, key, value, ttl=None):
+        """Store a value for every process sharing the file"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT INTO shared_cache (name, key, value, expires_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(name, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+            (self.name, key, json.dumps(value), now + (self.ttl if ttl is None else ttl))
+        )
+        
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute('DELETE FROM shared_cache WHERE expires_at <= ?', (now,))
+    
+    def delete(self, key):
+        """Remove a key if present"""
+        self._connect().execute('DELETE FROM shared_cache WHERE name = ? AND key = ?', (self.name, key))
+    
+    def keys(self):
+        """Snapshot of the unexpired keys"""
+        rows = self._connect().execute(
+            'SELECT key FROM shared_cache WHERE name = ? AND expires_at > ?', (self.name, time.time())
+        )
+        return [row[0] for row in rows]
+    
+    def clear(self):
+        """Remove all entries"""
+        self._connect().execute('DELETE FROM shared_cache WHERE name = ?', (self.name,))
+    
+    def __len__(self):
+        return len(self.keys())
+    
+    def stats(self):
+        """Return hit/miss counters (of this process)"""
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses, 'evictions': 0}
+    
+    def reconnect(self):
+        """Drop connections inherited from a parent process"""
+        self._local = threading.local()
+
+class RedisCache:
+    """
+    Cache in Redis, shared by every process on every host
+    
+    Requires the redis package. Values are stored as JSON under
+    cache:<name>:<key> and expire through Redis TTLs.
+    """
+    
+    def __init__(self, url, ttl=300, name='default', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.name = name
+        self.prefix = f'cache:{name}:'
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, default=None):
+        """Return a cached value, or default if missing or expired"""
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            cache_requests_total.inc(cache=self.name, result='miss')
+            return default
+        
+        self.hits += 1
+        cache_requests_total.inc(cache=self.name, result='hit')
+        return json.loads(value)
+    
+    def set(self, key, value, ttl=None):
+        """Store a value for every process sharing the server"""
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, math.ceil(ttl)))
+    
+    def delete(self, key):
+        """Remove a key if present"""
+        self.client.delete(self.prefix + key)
+    
+    def keys(self):
+        """Snapshot of the cached keys"""
+        return [key.decode()[len(self.prefix):] for key in self.client.scan_iter(match=self.prefix + '*')]
+    
+    def clear(self):
+        """Remove all entries"""
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+    
+    def __len__(self):
+        return len(self.keys())
+    
+    def stats(self):
+        """Return hit/miss counters (of this process)"""
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses, 'evictions': 0}
+    
+    def reconnect(self):
+        """Drop connections inherited from a parent process"""
+        self.client.connection_pool.reset()
+
+def cache_from_uri(uri, maxsize=256, ttl=300, name='default'):
+    """
+    Create a cache from a memory://, sqlite:/// or redis:// URI
+    
+    memory:// is a TTLCache private to the process and bounded by maxsize;
+    the others are shared and hold JSON-serializable values only.
+    """
+    scheme = urlparse(uri).scheme
+    if scheme == 'memory':
+        return TTLCache(maxsize=maxsize, ttl=ttl, name=name)
+    if scheme == 'sqlite':
+        return SQLiteCache(uri[len('sqlite:///'):], ttl=ttl, name=name)
+    if scheme in ('redis', 'rediss'):
+        return RedisCache(uri, ttl=ttl, name=name)
+    raise ValueError(f"Unsupported cache storage: {uri}")
@@ -0,0 +1,234 @@
+import json
+import hashlib
+import threading
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from app.models.country_change import ChangeFeedState, CountryState, CountryChange
+
+feed = ChangeFeedState.__table__
+states = CountryState.__table__
+log = CountryChange.__table__
+
+def country_key(country):
+    """Stable identity of an upstream country (cca3, or the official name)"""
+    names = country.get('name', {})
+    return country.get('cca3') or names.get('official', '') or names.get('common', '')
+
+def content_hash(country):
+    """Hash of everything upstream returned for a country"""
+    return hashlib.blake2b(json.dumps(country, sort_keys=True).encode('utf-8'), digest_size=16).digest()
+
+def filter_endpoints(country):
+    """Lower-cased filter endpoints whose results include a country"""
+    endpoints = set()
+    if country.get('region'):
+        endpoints.add(f"region/{country['region'].lower()}")
+    for code, details in (country.get('currencies') or {}).items():
+        endpoints.add(f'currency/{code.lower()}')
+        if details.get('name'):
+            endpoints.add(f"currency/{details['name'].lower()}")
+    for code, name in (country.get('languages') or {}).items():
+        endpoints.add(f'lang/{code.lower()}')
+        endpoints.add(f'lang/{name.lower()}')
+    return endpoints
+
+class ChangeFeed:
+    """
+    This process' copy of the /all dataset, diffed against each new fetch
+    
+    Every country has a content hash. Applying a fetched dataset compares
+    hashes and rebuilds records only for countries that were added or
+    changed, so the caller can drop just the cached results those touch.
+    Versions are not kept here: workers fetch at different times, so they
+    come from the SharedChangeLog every instance records to.
+    """
+    
+    def __init__(self):
+        self.records = {}
+        # Key -> (content hash, filter endpoints, lower-cased names)
+        self._index = {}
+        self._lock = threading.Lock()
+    
+    def apply(self, countries, build):
+        """
+        Diff a fetched /all dataset against the current one
+        
+        Args:
+            countries: Upstream country dicts
+            build: Callable turning an upstream country into a record
+        
+        Returns:
+            tuple: (records in dataset order, changed) where changed maps
+            each added, updated or removed country key to (change, filter
+            endpoints, names), covering both its old and new data
+        """
+        with self._lock:
+            records = []
+            changed = {}
+            seen = set()
+            
+            for country in countries:
+                key = country_key(country)
+                if key in seen:
+                    continue
+                seen.add(key)
+                
+                digest = content_hash(country)
+                previous = self._index.get(key)
+                if previous is None or previous[0] != digest:
+                    names = country.get('name', {})
+                    entry = (
+                        digest,
+                        frozenset(filter_endpoints(country)),
+                        frozenset(name.lower() for name in (names.get('common'), names.get('official')) if name)
+                    )
+                    if previous is None:
+                        changed[key] = ('added', entry[1], entry[2])
+                    else:
+                        changed[key] = ('updated', previous[1] | entry[1], previous[2] | entry[2])
+                    self._index[key] = entry
+                    self.records[key] = build(country)
+                records.append(self.records[key])
+            
+            for key in [key for key in self._index if key not in seen]:
+                _, endpoints, names = self._index.pop(key)
+                changed[key] = ('removed', endpoints, names)
+                del self.records[key]
+            
+            return records, changed
+    
+    def snapshot(self):
+        """Content hash (hex) and record of every country, by key"""
+        with self._lock:
+            return {key: (entry[0].hex(), self.records[key]) for key, entry in self._index.items()}
+
+class SharedChangeLog:
+    """
+    Dataset versions and change log in the database, shared by all instances
+    
+    Whichever worker (on whichever node) first fetches a changed dataset
+    diffs it against the hashes recorded last, bumps the version once and
+    logs the changes; workers fetching the same data later find nothing to
+    record. A version therefore means the same on every instance. The
+    version row is bumped with a compare-and-set, so concurrent writers
+    retry instead of both claiming the next version.
+    """
+    
+    RETRIES = 5
+    
+    def __init__(self, max_changes=10000):
+        self.max_changes = max_changes
+    
+    def record(self, engine, snapshot):
+        """
+        Record the differences between a dataset snapshot and the last one
+        
+        Args:
+            engine: Engine of the primary database
+            snapshot: Key -> (content hash, record) as ChangeFeed.snapshot
+        
+        Returns:
+            int: The dataset version after recording
+        """
+        for _ in range(self.RETRIES):
+            try:
+                with engine.begin() as conn:
+                    version = self._record(conn, snapshot)
+            except IntegrityError:
+                # Another instance created the version row or claimed the version first
+                continue
+            if version is not None:
+                return version
+        raise RuntimeError('Could not record countries changes: too many concurrent writers')
+    
+    def _record(self, conn, snapshot):
+        row = conn.execute(select(feed.c.version, feed.c.trimmed_version).where(feed.c.id == 1)).first()
+        if row is None:
+            conn.execute(insert(feed).values(id=1, version=0, trimmed_version=0))
+            version, trimmed_version = 0, 0
+        else:
+            version, trimmed_version = row
+        
+        recorded = dict(conn.execute(select(states.c.country, states.c.content_hash)).fetchall())
+        changes = []
+        for key, (digest, record) in snapshot.items():
+            if recorded.get(key) != digest:
+                changes.append((key, 'added' if key not in recorded else 'updated', digest, record.json))
+        for key in recorded.keys() - snapshot.keys():
+            changes.append((key, 'removed', None, None))
+        if not changes:
+            return version
+        
+        new_version = version + 1
+        claimed = conn.execute(
+            update(feed).where(feed.c.id == 1, feed.c.version == version).values(version=new_version)
+        )
+        if claimed.rowcount != 1:
+            return None
+        
+        for key, change, digest, _ in changes:
+            if change == 'removed':
+                conn.execute(delete(states).where(states.c.country == key))
+            elif change == 'added':
+                conn.execute(insert(states).values(country=key, content_hash=digest))
+            else:
+                conn.execute(update(states).where(states.c.country == key).values(content_hash=digest))
+        conn.execute(insert(log), [
+            {'version': new_version, 'country': key, 'change': change, 'data': data}
+            for key, change, _, data in changes
+        ])
+        
+        # Keep the newest max_changes entries
+        cutoff = conn.execute(
+            select(log.c.id).order_by(log.c.id.desc()).offset(self.max_changes).limit(1)
+        ).scalar()
+        if cutoff is not None:
+            trimmed = conn.execute(select(func.max(log.c.version)).where(log.c.id <= cutoff)).scalar()
+            conn.execute(delete(log).where(log.c.id <= cutoff))
+            conn.execute(update(feed).where(feed.c.id == 1).values(
+                trimmed_version=max(trimmed_version, trimmed)
+            ))
+        return new_version
+    
+    def version(self, engine):
+        """Current dataset version (0 before anything was recorded)"""
+        with engine.connect() as conn:
+            return conn.execute(select(feed.c.version).where(feed.c.id == 1)).scalar() or 0
+    
+    def changes_since(self, engine, since):
+        """
+        Latest change per country after a version, oldest first
+        
+        Returns:
+            tuple: (version, changes), with changes None when the log no
+            longer reaches back to that version (or the version is
+            unknown), i.e. the client has to resync fully
+        """
+        with engine.connect() as conn:
+            row = conn.execute(select(feed.c.version, feed.c.trimmed_version).where(feed.c.id == 1)).first()
+            version, trimmed_version = row if row is not None else (0, 0)
+            if since > version or since < trimmed_version:
+                return version, None
+            
+            # Entries a concurrent writer adds past the version read above
+            # are left for the next poll
+            rows = conn.execute(
+                select(log.c.version, log.c.country, log.c.change, log.c.data)
+                .where(log.c.version > since, log.c.version <= version)
+                .order_by(log.c.id)
+            ).fetchall()
+        
+        latest = {}
+        for entry_version, key, change, data in rows:
+            latest.pop(key, None)
+            latest[key] = (entry_version, change, data)
+        
+        return version, [
+            {
+                'version': entry_version,
+                'country': key,
+                'change': change,
+                'data': json.loads(data) if data is not None else None
+            }
+            for key, (entry_version, change, data) in latest.items()
+        ]
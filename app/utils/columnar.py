@@ -0,0 +1,125 @@
+from array import array
+
+# Attributes that can be grouped by and filtered on
+DIMENSIONS = ('region', 'subregion', 'currency', 'language')
+
+class CountryColumns:
+    """
+    Columnar, dictionary-encoded view of country attributes for aggregates
+    
+    Every country is a row index. Each dimension value maps to a bitmap
+    (a Python int with bit i set when row i has that value), so filters are
+    bitwise ANDs and counts are popcounts over all rows at once. Region and
+    subregion are also stored as integer code columns, and population and
+    area as typed numeric arrays. Filters ignore case, like the other
+    country routes; groups keep the values as upstream spells them.
+    """
+    
+    def __init__(self, countries):
+        self.size = len(countries)
+        self.population = array('q', (int(country.get('population') or 0) for country in countries))
+        self.area = array('d', (float(country.get('area') or 0) for country in countries))
+        self.all_rows = (1 << self.size) - 1
+        
+        # Dictionary-encoded code columns
+        self.values = {}
+        self.codes = {}
+        for dimension in ('region', 'subregion'):
+            values, codes = _encode(country.get(dimension) or '' for country in countries)
+            self.values[dimension] = values
+            self.codes[dimension] = codes
+        
+        # Membership bitmaps per dimension value
+        self.bitmaps = {dimension: {} for dimension in DIMENSIONS}
+        for dimension in ('region', 'subregion'):
+            bitmaps = self.bitmaps[dimension]
+            values = self.values[dimension]
+            for row, code in enumerate(self.codes[dimension]):
+                if values[code]:
+                    bitmaps[values[code]] = bitmaps.get(values[code], 0) | (1 << row)
+        
+        for dimension, field in (('currency', 'currencies'), ('language', 'languages')):
+            bitmaps = self.bitmaps[dimension]
+            for row, country in enumerate(countries):
+                for value in (country.get(field) or {}):
+                    bitmaps[value] = bitmaps.get(value, 0) | (1 << row)
+        
+        # Bitmaps by case-folded value, for filtering
+        self.folded = {dimension: {} for dimension in DIMENSIONS}
+        for dimension, bitmaps in self.bitmaps.items():
+            folded = self.folded[dimension]
+            for value, bitmap in bitmaps.items():
+                key = value.casefold()
+                folded[key] = folded.get(key, 0) | bitmap
+    
+    def mask(self, filters):
+        """
+        Bitmap of rows matching every filter
+        
+        Args:
+            filters: dict of dimension -> value (or list of values, any of
+                which may match), compared without regard to case
+        """
+        mask = self.all_rows
+        for dimension, wanted in filters.items():
+            bitmaps = self.folded[dimension]
+            if isinstance(wanted, str):
+                wanted = [wanted]
+            matched = 0
+            for value in wanted:
+                matched |= bitmaps.get(value.casefold(), 0)
+            mask &= matched
+        return mask
+    
+    def total(self, mask):
+        """Count and measure sums over the rows of a mask"""
+        return {'count': mask.bit_count(), **self._sums(mask)}
+    
+    def group_by(self, dimension, mask=None):
+        """
+        Count and measure sums per value of a dimension within a mask
+        
+        Returns a list of groups, largest count first. Currency and language
+        groups overlap, as a country can have several of each.
+        """
+        mask = self.all_rows if mask is None else mask
+        groups = []
+        
+        for value, bitmap in self.bitmaps[dimension].items():
+            rows = bitmap & mask
+            if rows:
+                groups.append({'value': value, 'count': rows.bit_count(), **self._sums(rows)})
+        
+        groups.sort(key=lambda group: (-group['count'], group['value']))
+        return groups
+    
+    def _sums(self, mask):
+        if mask == self.all_rows:
+            return {'population': sum(self.population), 'area': round(sum(self.area), 2)}
+        
+        population = 0
+        area = 0.0
+        for row in _rows(mask):
+            population += self.population[row]
+            area += self.area[row]
+        return {'population': population, 'area': round(area, 2)}
+
+def _encode(column):
+    """Dictionary-encode a column into (distinct values, code array)"""
+    values = []
+    index = {}
+    codes = array('H')
+    for value in column:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(values)
+            values.append(value)
+        codes.append(code)
+    return values, codes
+
+def _rows(mask):
+    """Row indexes of the set bits of a mask, ascending"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,149 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from app.utils.metrics import hash_pool_rejections_total
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing pool is saturated or cannot finish in time"""
+
+def _hash(secret, rounds):
+    return bcrypt.hashpw(secret.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _verify(hashed, secret):
+    return bcrypt.checkpw(secret.encode('utf-8'), hashed.encode('utf-8'))
+
+def hash_rounds(hashed):
+    """Work factor encoded in a bcrypt hash ($2b$<rounds>$...), or None"""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    """
+    bcrypt hashing and verification on a bounded process pool
+    
+    Work is run in a small pool of worker processes so that a burst of
+    logins or registrations cannot occupy every request thread. At most
+    pool_size + max_queue calls may be pending; beyond that, or when a
+    call takes longer than the timeout, HashingPoolBusy is raised. With
+    a pool size of 0 hashing runs in the calling thread.
+    """
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.rounds = 12
+        self.pool_size = 0
+        self.max_queue = 0
+        self.timeout = 10.0
+        self.start_method = None
+        self._reset()
+        
+        if hasattr(os, 'register_at_fork'):
+            # A pool (and lock state) inherited from a parent is unusable
+            os.register_at_fork(after_in_child=self._reset)
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def _reset(self):
+        self._executor = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        """Initialize with Flask app"""
+        self.app = app
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self.max_queue = app.config.get('HASH_POOL_MAX_QUEUE', 16)
+        self.timeout = app.config.get('HASH_POOL_TIMEOUT', 10.0)
+        
+        pool_size = app.config.get('HASH_POOL_SIZE', 2)
+        start_method = app.config.get('HASH_POOL_START_METHOD')
+        if (pool_size, start_method) != (self.pool_size, self.start_method):
+            self.shutdown()
+            self.pool_size = pool_size
+            self.start_method = start_method
+    
+    @property
+    def capacity(self):
+        """Maximum number of running plus queued calls"""
+        return self.pool_size + self.max_queue
+    
+    def _get_executor(self):
+        if self._executor is None:
+            context = multiprocessing.get_context(self.start_method) if self.start_method else None
+            self._executor = ProcessPoolExecutor(self.pool_size, mp_context=context)
+        return self._executor
+    
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+    
+    def _run(self, func, *args):
+        if self.pool_size <= 0:
+            return func(*args)
+        
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                hash_pool_rejections_total.inc(reason='saturated')
+                raise HashingPoolBusy('Hashing pool is saturated')
+            executor = self._get_executor()
+            self._in_flight += 1
+        
+        try:
+            future = executor.submit(func, *args)
+        except (BrokenProcessPool, RuntimeError):
+            self._done(None)
+            self._discard(executor)
+            hash_pool_rejections_total.inc(reason='broken')
+            raise HashingPoolBusy('Hashing pool is unavailable')
+        # Count the call as pending until it really finishes, even if
+        # the caller gives up waiting on it
+        future.add_done_callback(self._done)
+        
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            hash_pool_rejections_total.inc(reason='timeout')
+            raise HashingPoolBusy('Hashing timed out')
+        except BrokenProcessPool:
+            self._discard(executor)
+            hash_pool_rejections_total.inc(reason='broken')
+            raise HashingPoolBusy('Hashing pool is unavailable')
+    
+    def _discard(self, executor):
+        """Drop a broken executor so the next call starts a fresh one"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+    
+    def hash(self, secret):
+        """Hash a secret with the configured work factor"""
+        return self._run(_hash, secret, self.rounds)
+    
+    def verify(self, hashed, secret):
+        """Check a secret against a bcrypt hash"""
+        return self._run(_verify, hashed, secret)
+    
+    def verify_in_thread(self, hashed, secret):
+        """Check a secret against a bcrypt hash in the calling thread, bypassing the pool"""
+        return _verify(hashed, secret)
+    
+    def needs_rehash(self, hashed):
+        """Whether a hash was made with a different work factor than configured"""
+        return hash_rounds(hashed) != self.rounds
+    
+    def shutdown(self):
+        """Stop the worker processes; a later call starts new ones"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+# Create an instance to be used with init_app pattern
+password_hasher = PasswordHasher()
@@ -1,18 +1,48 @@
-from flask import jsonify
-import traceback
+from flask import current_app
+from app.models.country import Country
+from app.utils.timing import phase
 import datetime
 import json
 
 class JSONEncoder(json.JSONEncoder):
-    """Custom JSON encoder that handles datetime objects"""
+    """Custom JSON encoder that handles datetime objects and country records"""
     def default(self, obj):
         if isinstance(obj, (datetime.datetime, datetime.date)):
             return obj.isoformat()
+        if isinstance(obj, Country):
+            return obj.to_dict()
         return super(JSONEncoder, self).default(obj)
 
+# Encoder shared by dumps (encoders are stateless once configured)
+_encoder = JSONEncoder(sort_keys=True, separators=(',', ':'))
+
+def dumps(data):
+    """
+    Serialize data to JSON, splicing in the cached encoding of country records
+    
+    Only dicts and lists holding records are walked; everything else is
+    encoded in one pass with JSONEncoder. Keys are sorted, as with jsonify.
+    """
+    if isinstance(data, Country):
+        return data.json
+    if isinstance(data, list) and data and isinstance(data[0], Country):
+        return '[' + ','.join(dumps(item) for item in data) + ']'
+    if isinstance(data, dict) and any(_has_records(value) for value in data.values()):
+        return '{' + ','.join(
+            f'{_encoder.encode(str(key))}:{dumps(value)}'
+            for key, value in sorted(data.items(), key=lambda item: str(item[0]))
+        ) + '}'
+    return _encoder.encode(data)
+
+def _has_records(value):
+    return isinstance(value, Country) or (isinstance(value, list) and bool(value) and isinstance(value[0], Country))
+
 def format_response(data, status_code=200):
     """Format API response consistently"""
-    response = jsonify(data)
+    with phase('serialize'):
+        response = current_app.response_class(
+            dumps(data) + '\n', mimetype=current_app.config['JSONIFY_MIMETYPE']
+        )
     response.status_code = status_code
     return response
 
@@ -25,8 +55,7 @@ def error_response(message, status_code=400):
 
 def log_error(app, e):
     """Log exception details to Flask logger"""
-    app.logger.error(f"Exception: {str(e)}")
-    app.logger.error(traceback.format_exc())
+    app.logger.exception('Exception: %s', e)
 
 def paginate_results(items, page=1, per_page=20):
     """
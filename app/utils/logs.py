@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed in `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+TEXT_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and extra fields"""
+    
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through at most `burst` records per message per interval
+    
+    Records are grouped by logger and unformatted message, so a per-request
+    line logged with arguments counts as one message. WARNING and above are
+    never dropped. The first record of the next interval carries the number
+    of records dropped in the previous one as `suppressed`.
+    """
+    
+    # Bound on tracked messages (f-string messages would be unique)
+    MAX_MESSAGES = 1024
+    
+    def __init__(self, burst=10, interval=60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        # (logger, message) -> [window start, records passed, records dropped]
+        self._windows = {}
+        self._lock = threading.Lock()
+    
+    def filter(self, record):
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is None and len(self._windows) >= self.MAX_MESSAGES:
+                    self._windows.clear()
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                self._windows[key] = [now, 1, 0]
+                return True
+            
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread
+    
+    QueueHandler.prepare() formats the message so records can be pickled;
+    the queue here stays in-process, so the record is passed as is and the
+    request thread only pays for creating it and enqueueing it.
+    """
+    
+    def prepare(self, record):
+        return record
+
+def parse_levels(value):
+    """Parse per-logger levels: 'app.routes=WARNING,sqlalchemy.engine=INFO'"""
+    if isinstance(value, dict):
+        return dict(value)
+    
+    levels = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+class LogPipeline:
+    """
+    Non-blocking, leveled logging for the app logger
+    
+    Request threads put records on an in-process queue. A listener thread
+    formats them (as text or JSON lines) and writes them to stderr, so slow
+    or blocked output never stalls a request. Repetitive records below
+    WARNING are sampled, and levels can be set per logger.
+    """
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.queue = None
+        self.handler = None
+        self.handlers = []
+        # Loggers outside the app logger that were given the queue handler
+        self.loggers = []
+        self.listener = None
+        self.sampler = None
+        
+        if hasattr(os, 'register_at_fork'):
+            # The listener thread does not survive a fork
+            os.register_at_fork(after_in_child=self._restart)
+        atexit.register(self.stop)
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialize with Flask app"""
+        self.app = app
+        self.stop()
+        self._detach()
+        
+        stream = logging.StreamHandler(sys.stderr)
+        if app.config.get('LOG_FORMAT', 'text') == 'json':
+            stream.setFormatter(JSONFormatter())
+        else:
+            stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+        self.handlers = [stream]
+        
+        self.queue = queue.SimpleQueue()
+        self.handler = DeferredQueueHandler(self.queue)
+        self.sampler = SamplingFilter(
+            burst=app.config.get('LOG_SAMPLE_BURST', 10),
+            interval=app.config.get('LOG_SAMPLE_INTERVAL', 60.0)
+        )
+        self.handler.addFilter(self.sampler)
+        
+        # Replaces Flask's default (synchronous) handler
+        app.logger.handlers = [self.handler]
+        app.logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+        app.logger.propagate = False
+        for name, level in parse_levels(app.config.get('LOG_LEVELS')).items():
+            logger = logging.getLogger(name)
+            logger.setLevel(level)
+            # Loggers under the app logger reach its handler; others (e.g.
+            # sqlalchemy.engine) would only reach the root logger, which has
+            # no handler, so they are given the queue handler themselves
+            if name != app.logger.name and not name.startswith(app.logger.name + '.'):
+                logger.addHandler(self.handler)
+                logger.propagate = False
+                self.loggers.append(logger)
+        
+        self.start()
+    
+    def start(self):
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+    
+    def stop(self):
+        """Write out queued records and stop the listener thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+    
+    def _detach(self):
+        for logger in self.loggers:
+            logger.removeHandler(self.handler)
+            logger.propagate = True
+        self.loggers = []
+    
+    def _restart(self):
+        if self.listener is not None:
+            self.queue = queue.SimpleQueue()
+            self.handler.queue = self.queue
+            self.start()
+
+# Singleton instance
+log_pipeline = LogPipeline()
@@ -0,0 +1,431 @@
+import os
+import glob
+import hmac
+import json
+import time
+import atexit
+import bisect
+import fcntl
+import ipaddress
+import threading
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Totals of exited processes in the multiprocess directory
+AGGREGATE_FILE = 'aggregate.json'
+
+class Metric:
+    """Base class for a labelled metric held in process memory"""
+    type_name = None
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+    
+    def snapshot(self):
+        """Return a copy of the current values keyed by label tuple"""
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+    
+    def _copy(self, value):
+        return value
+    
+    def reset(self):
+        """Clear all recorded values"""
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+    type_name = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """Value that can go up and down; summed over live processes"""
+    type_name = 'gauge'
+    
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets"""
+    type_name = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts, then +Inf bucket, sum and count
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+    
+    def _copy(self, value):
+        return list(value)
+
+class MetricsRegistry:
+    """
+    Collection of metrics with Prometheus text exposition
+    
+    When a multiprocess directory is configured, every process periodically
+    writes its values to its own snapshot file, and rendering merges the
+    snapshots of all processes so any worker can answer a scrape. Snapshots
+    are written after requests and by a flusher thread, so idle processes
+    stay current and a crash loses at most one flush interval.
+    
+    Snapshot files are named by pid and process start time, so a worker
+    that reuses the pid of a dead one does not overwrite its totals. The
+    counters and histograms of dead processes are folded into one
+    aggregate file and their snapshots removed, so recycled workers do not
+    make the directory (and every scrape) grow.
+    """
+    
+    def __init__(self):
+        self.metrics = {}
+        self.multiproc_dir = None
+        self.flush_interval = 5.0
+        self._last_flush = 0.0
+        self._started = time.time()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+    
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+    
+    def reset(self):
+        """Clear the values of all metrics"""
+        for metric in self.metrics.values():
+            metric.reset()
+    
+    def snapshot(self):
+        """Serializable copy of this process' values"""
+        return {
+            name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for name, metric in self.metrics.items()
+        }
+    
+    def maybe_flush(self):
+        """Write this process' snapshot if the flush interval has passed"""
+        if self.multiproc_dir and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """Atomically write this process' snapshot to the multiprocess directory"""
+        if not self.multiproc_dir:
+            return
+        
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            path = os.path.join(self.multiproc_dir, f'metrics_{os.getpid()}_{int(self._started * 1e6)}.json')
+            _write_json(path, {'pid': os.getpid(), 'started': self._started, 'metrics': self.snapshot()})
+    
+    def start_flusher(self):
+        """Flush every flush_interval seconds on a daemon thread"""
+        self.stop_flusher()
+        if not self.multiproc_dir:
+            return
+        
+        stop = self._flusher = threading.Event()
+        
+        def run():
+            while not stop.wait(self.flush_interval):
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+        
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+    
+    def stop_flusher(self):
+        if self._flusher is not None:
+            self._flusher.set()
+            self._flusher = None
+    
+    def _after_fork(self):
+        # Threads do not survive a fork, and a lock held by one of them at
+        # that moment would stay held in the child. The flusher is only
+        # restarted where the child serves requests (see app/prefork.py).
+        self._flusher = None
+        self._started = time.time()
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        for metric in self.metrics.values():
+            metric._lock = threading.Lock()
+    
+    def collect(self):
+        """Merge values from all processes, keyed by metric name and labels"""
+        merged = {name: {} for name in self.metrics}
+        self._merge(merged, self.snapshot(), gauges=True)
+        
+        if self.multiproc_dir:
+            live, dead = self._snapshot_files()
+            if dead:
+                self._fold(dead)
+            for data in live:
+                self._merge(merged, data['metrics'], gauges=True)
+            aggregate = _read_json(os.path.join(self.multiproc_dir, AGGREGATE_FILE))
+            if aggregate is not None:
+                self._merge(merged, aggregate['metrics'], gauges=False)
+        
+        return merged
+    
+    def _snapshot_files(self):
+        """Snapshots of other live processes, and paths of dead processes' snapshots"""
+        own = (os.getpid(), self._started)
+        files = []
+        for path in glob.glob(os.path.join(self.multiproc_dir, 'metrics_*.json')):
+            data = _read_json(path)
+            if data is not None:
+                files.append((path, data))
+        
+        # Of several snapshots with one pid, only the newest process can be alive
+        newest = {own[0]: own[1]}
+        for _, data in files:
+            newest[data['pid']] = max(newest.get(data['pid'], 0), data.get('started', 0))
+        
+        live, dead = [], []
+        for path, data in files:
+            pid, started = data['pid'], data.get('started', 0)
+            if (pid, started) == own:
+                continue
+            if started < newest[pid] or not _pid_alive(pid):
+                dead.append(path)
+            else:
+                live.append(data)
+        return live, dead
+    
+    def _fold(self, paths):
+        """Add dead processes' counters and histograms to the aggregate file and remove their snapshots"""
+        aggregate_path = os.path.join(self.multiproc_dir, AGGREGATE_FILE)
+        
+        # One process folds at a time, so no snapshot is counted twice
+        with open(os.path.join(self.multiproc_dir, 'metrics.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            folded = {name: {} for name in self.metrics}
+            aggregate = _read_json(aggregate_path)
+            if aggregate is not None:
+                self._merge(folded, aggregate['metrics'], gauges=False)
+            
+            paths = [path for path in paths if os.path.exists(path)]
+            for path in paths:
+                data = _read_json(path)
+                if data is not None:
+                    self._merge(folded, data['metrics'], gauges=False)
+            
+            _write_json(aggregate_path, {'pid': None, 'metrics': {
+                name: [[list(key), value] for key, value in values.items()]
+                for name, values in folded.items()
+            }})
+            for path in paths:
+                os.remove(path)
+    
+    def _merge(self, merged, metrics, gauges):
+        """Add one snapshot's values to merged (gauges only from live processes)"""
+        for name, samples in metrics.items():
+            metric = self.metrics.get(name)
+            if metric is None or (metric.type_name == 'gauge' and not gauges):
+                continue
+            values = merged[name]
+            for key, value in samples:
+                key = tuple(key)
+                if isinstance(value, list):
+                    current = values.get(key)
+                    values[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    values[key] = values.get(key, 0) + value
+    
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        merged = self.collect()
+        
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type_name}')
+            
+            for key, value in sorted(merged[name].items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.type_name != 'histogram':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    lines.append(f'{name}_bucket{_format_labels(labels + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+        
+        return '\n'.join(lines) + '\n'
+
+def scrape_allowed(token):
+    """
+    Whether the current request may read the metrics
+    
+    With a token configured, the scraper must send it as a bearer token;
+    without one, only direct (not proxied) requests from loopback are served.
+    """
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if request.headers.get('X-Forwarded-For'):
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    # Written to a temporary file and renamed, so readers never see a partial file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Shared registry and metric definitions
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    'http_requests_total', 'HTTP requests handled',
+    ('blueprint', 'endpoint', 'method', 'status'))
+http_request_duration_seconds = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency in seconds',
+    ('blueprint', 'endpoint'))
+upstream_requests_total = registry.counter(
+    'upstream_requests_total', 'Requests to the RestCountries API',
+    ('outcome',))
+upstream_request_duration_seconds = registry.histogram(
+    'upstream_request_duration_seconds', 'RestCountries API request latency in seconds',
+    ('outcome',))
+cache_requests_total = registry.counter(
+    'cache_requests_total', 'Cache lookups', ('cache', 'result'))
+cache_evictions_total = registry.counter(
+    'cache_evictions_total', 'Cache entries evicted to stay within size', ('cache',))
+cache_entries = registry.gauge(
+    'cache_entries', 'Entries currently held in a cache', ('cache',))
+db_commits_total = registry.counter(
+    'db_commits_total', 'Database session commits', ('outcome',))
+db_commit_duration_seconds = registry.histogram(
+    'db_commit_duration_seconds', 'Database commit latency in seconds (including flush)')
+bcrypt_verifications_total = registry.counter(
+    'bcrypt_verifications_total', 'bcrypt hash verifications', ('kind', 'result'))
+hash_pool_rejections_total = registry.counter(
+    'hash_pool_rejections_total', 'bcrypt calls refused by the hashing pool', ('reason',))
+api_usage_records_total = registry.counter(
+    'api_usage_records_total', 'API usage records written')
+
+def _record_request(response):
+    """Count the request and observe its latency (after_request hook)"""
+    start = g.get('request_start_ns')
+    endpoint = request.endpoint or 'unmatched'
+    blueprint = request.blueprint or ''
+    
+    http_requests_total.inc(
+        blueprint=blueprint, endpoint=endpoint,
+        method=request.method, status=response.status_code)
+    if start is not None:
+        http_request_duration_seconds.observe(
+            (time.perf_counter_ns() - start) / 1e9,
+            blueprint=blueprint, endpoint=endpoint)
+    
+    registry.maybe_flush()
+    return response
+
+def _before_commit(session):
+    session.info['commit_started_ns'] = time.perf_counter_ns()
+
+def _after_commit(session):
+    start = session.info.pop('commit_started_ns', None)
+    db_commits_total.inc(outcome='success')
+    if start is not None:
+        db_commit_duration_seconds.observe((time.perf_counter_ns() - start) / 1e9)
+
+def _after_rollback(session):
+    if session.info.pop('commit_started_ns', None) is not None:
+        db_commits_total.inc(outcome='rollback')
+
+def init_metrics(app):
+    """Initialize request and database instrumentation for the Flask app"""
+    registry.multiproc_dir = app.config.get('METRICS_MULTIPROC_DIR') or None
+    registry.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 5.0)
+    
+    if registry.multiproc_dir:
+        os.makedirs(registry.multiproc_dir, exist_ok=True)
+        # Once, however many apps are created
+        atexit.unregister(registry.flush)
+        atexit.register(registry.flush)
+        # Workers forked from a preloading master start their own
+        if not app.config.get('PRELOADING'):
+            registry.start_flusher()
+    
+    app.after_request(_record_request)
+    
+    if not event.contains(Session, 'before_commit', _before_commit):
+        event.listen(Session, 'before_commit', _before_commit)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
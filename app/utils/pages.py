@@ -0,0 +1,103 @@
+import os
+import gzip
+import hashlib
+from collections import namedtuple
+from flask import current_app, request, render_template
+from jinja2 import FileSystemBytecodeCache
+from app.utils.cache import TTLCache
+from app.utils.assets import assets
+
+# A rendered page with its gzip variant; template is kept to detect edits
+RenderedPage = namedtuple('RenderedPage', 'body gzipped etag template')
+
+class PageCache:
+    """
+    Rendered static-content pages, served like static files
+    
+    Pages without per-user data (personalization happens client-side) are
+    rendered once, gzip-compressed once, and served with a strong ETag and
+    Cache-Control. Conditional requests are answered with 304. When the
+    Jinja environment auto-reloads, a page is re-rendered once its template
+    changes on disk.
+    """
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.max_age = 300
+        self.cache = TTLCache(maxsize=64, ttl=86400, name='pages')
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialize with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('PAGE_CACHE_ENABLED', True)
+        self.max_age = app.config.get('PAGE_CACHE_MAX_AGE', 300)
+        self.cache = TTLCache(
+            maxsize=app.config.get('PAGE_CACHE_SIZE', 64),
+            ttl=app.config.get('PAGE_CACHE_TTL', 86400),
+            name='pages'
+        )
+        
+        # Keep compiled templates across restarts and workers
+        bytecode_dir = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+        if bytecode_dir:
+            os.makedirs(bytecode_dir, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+    
+    def _render(self, template_name):
+        template = current_app.jinja_env.get_template(template_name)
+        body = template.render(**self._context()).encode('utf-8')
+        return RenderedPage(
+            body=body,
+            gzipped=gzip.compress(body, compresslevel=9, mtime=0),
+            etag=hashlib.sha256(body).hexdigest()[:32],
+            template=template
+        )
+    
+    def _context(self):
+        context = {}
+        current_app.update_template_context(context)
+        return context
+    
+    def get(self, template_name):
+        """Get a rendered page, rendering it on a miss or after a template edit"""
+        # Asset URLs in templates depend on where the app is mounted and
+        # on the current asset build
+        assets.refresh()
+        key = (template_name, request.script_root, assets.version)
+        page = self.cache.get(key)
+        if page is None or (current_app.jinja_env.auto_reload and not page.template.is_up_to_date):
+            page = self._render(template_name)
+            self.cache.set(key, page)
+        return page
+    
+    def render(self, template_name):
+        """Render a static-content page as a cacheable response"""
+        if not self.enabled:
+            return render_template(template_name)
+        
+        page = self.get(template_name)
+        gzipped = request.accept_encodings['gzip'] > 0
+        # Each encoding is a different representation with its own ETag
+        etag = f'{page.etag}-gzip' if gzipped else page.etag
+        
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(page.gzipped if gzipped else page.body, mimetype='text/html')
+            if gzipped:
+                response.headers['Content-Encoding'] = 'gzip'
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    def clear(self):
+        self.cache.clear()
+
+# Singleton instance
+page_cache = PageCache()
@@ -0,0 +1,325 @@
+import os
+import sys
+import glob
+import json
+import time
+import random
+import pstats
+import cProfile
+import threading
+from collections import Counter, defaultdict
+from flask import g, request
+
+# Maximum stack depth kept per sample
+MAX_DEPTH = 64
+
+# Seconds between writes of a running sampler's stacks to the shared directory
+SAVE_INTERVAL = 1.0
+
+def _frame_label(filename, funcname):
+    """Label a stack frame as a short file:function pair"""
+    for marker in ('site-packages/', 'lib/python'):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    else:
+        filename = '/'.join(filename.rsplit('/', 2)[-2:])
+    return f'{filename}:{funcname}'
+
+class Profiler:
+    """
+    Opt-in request profiler producing collapsed stacks per endpoint
+    
+    Two modes are supported:
+    - cProfile: a random fraction of requests run under cProfile, and their
+      self time is folded onto the dominant caller chain of each function
+    - sampler: a background thread samples the stacks of threads currently
+      serving requests at a fixed interval for a bounded duration
+    
+    Request hooks are only installed when PROFILING_ENABLED is set, so a
+    disabled profiler adds no per-request work.
+    
+    With several worker processes, admin requests land on any one of them.
+    Given a directory shared by all workers (PROFILING_DIR), the sample
+    rate, sampler window and clears are written to a control file that
+    every worker applies on its next request, and each worker writes its
+    stacks to its own file, which reports merge.
+    """
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.stacks = {'cprofile': defaultdict(Counter), 'sampler': defaultdict(Counter)}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._sampler_until = 0.0
+        self.shared_dir = None
+        self._started = time.time()
+        self._control_mtime = None
+        self._cleared = 0.0
+        self._last_save = 0.0
+        
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialize with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.sample_rate = app.config.get('PROFILING_SAMPLE_RATE', 0.0)
+        self.shared_dir = app.config.get('PROFILING_DIR') or None
+        self._control_mtime = None
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+        
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.teardown_request(self._teardown_request)
+    
+    def _after_fork(self):
+        # The sampler thread does not survive a fork; this is a new worker
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._active = {}
+        self._started = time.time()
+    
+    def _before_request(self):
+        if self.shared_dir:
+            self._sync()
+        
+        endpoint = request.endpoint or 'unmatched'
+        
+        if self._sampler is not None:
+            self._active[threading.get_ident()] = endpoint
+        
+        if self.sample_rate and random.random() < self.sample_rate:
+            profile = cProfile.Profile()
+            g.profile = profile
+            profile.enable()
+    
+    def _teardown_request(self, exc=None):
+        self._active.pop(threading.get_ident(), None)
+        
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        
+        profile.disable()
+        self._fold_profile(request.endpoint or 'unmatched', profile)
+    
+    def _fold_profile(self, endpoint, profile):
+        """Fold cProfile self times into collapsed stacks (microseconds)"""
+        stats = pstats.Stats(profile).stats
+        folded = Counter()
+        
+        for func, (cc, nc, tt, ct, callers) in stats.items():
+            weight = int(tt * 1e6)
+            if weight <= 0:
+                continue
+            
+            # Walk up the heaviest caller of each frame to build a path
+            chain = [func]
+            seen = {func}
+            current = callers
+            while current and len(chain) < MAX_DEPTH:
+                caller = max(current, key=lambda c: current[c][3])
+                if caller in seen:
+                    break
+                chain.append(caller)
+                seen.add(caller)
+                current = stats.get(caller, (0, 0, 0, 0, {}))[4]
+            
+            folded[';'.join(_frame_label(f[0], f[2]) for f in reversed(chain))] += weight
+        
+        with self._lock:
+            self.stacks['cprofile'][endpoint].update(folded)
+        self._save()
+    
+    def set_sample_rate(self, rate):
+        """Set the fraction of requests profiled with cProfile (by every worker)"""
+        self.sample_rate = max(0.0, min(1.0, float(rate)))
+        self._update_control(sample_rate=self.sample_rate)
+    
+    def start_sampler(self, seconds=10, interval=0.005):
+        """
+        Sample request thread stacks in the background for a duration
+        
+        With a shared directory, every worker samples until the same time.
+        Returns False if a sampler is already running.
+        """
+        if self.shared_dir:
+            if self._read_control().get('sampler_until', 0) > time.time():
+                return False
+            self._update_control(sampler_until=time.time() + seconds, sampler_interval=interval)
+        return self._start_sampler(seconds, interval)
+    
+    def _start_sampler(self, seconds, interval):
+        with self._lock:
+            if self._sampler is not None:
+                return False
+            self._sampler_until = time.monotonic() + seconds
+            self._sampler = threading.Thread(
+                target=self._run_sampler, args=(interval,),
+                name='profiling-sampler', daemon=True
+            )
+            self._sampler.start()
+        return True
+    
+    def sampler_running(self):
+        if self.shared_dir:
+            return self._read_control().get('sampler_until', 0) > time.time()
+        return self._sampler is not None
+    
+    def _run_sampler(self, interval):
+        try:
+            while time.monotonic() < self._sampler_until:
+                frames = sys._current_frames()
+                samples = defaultdict(Counter)
+                
+                for thread_id, endpoint in list(self._active.items()):
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    
+                    stack = []
+                    while frame is not None and len(stack) < MAX_DEPTH:
+                        code = frame.f_code
+                        stack.append(_frame_label(code.co_filename, code.co_name))
+                        frame = frame.f_back
+                    samples[endpoint][';'.join(reversed(stack))] += 1
+                
+                with self._lock:
+                    for endpoint, counts in samples.items():
+                        self.stacks['sampler'][endpoint].update(counts)
+                
+                if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+                    self._save()
+                time.sleep(interval)
+        finally:
+            self._active.clear()
+            self._sampler = None
+            self._save()
+    
+    def collapsed(self, mode, endpoint=None):
+        """Render collapsed stacks ("frame;frame;frame count" per line)"""
+        stacks = self._merged()[mode]
+        endpoints = [endpoint] if endpoint else sorted(stacks)
+        lines = []
+        for name in endpoints:
+            for stack, count in stacks.get(name, {}).items():
+                lines.append(f'{name};{stack} {count}' if endpoint is None else f'{stack} {count}')
+        return '\n'.join(lines) + ('\n' if lines else '')
+    
+    def summary(self):
+        """Profiler state and number of recorded samples per endpoint"""
+        if self.shared_dir:
+            self._sync()
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'sampler_running': self.sampler_running(),
+            'endpoints': {
+                mode: {name: sum(counts.values()) for name, counts in stacks.items()}
+                for mode, stacks in self._merged().items()
+            }
+        }
+    
+    def clear(self):
+        """Discard all recorded stacks (of every worker)"""
+        self._clear_local()
+        if self.shared_dir:
+            self._cleared = time.time()
+            self._update_control(cleared=self._cleared)
+            for path in glob.glob(os.path.join(self.shared_dir, 'stacks_*.json')):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+    
+    def _clear_local(self):
+        with self._lock:
+            for stacks in self.stacks.values():
+                stacks.clear()
+    
+    def _merged(self):
+        """This worker's stacks plus those other workers wrote to the shared directory"""
+        with self._lock:
+            merged = {mode: defaultdict(Counter, {name: Counter(counts) for name, counts in stacks.items()})
+                      for mode, stacks in self.stacks.items()}
+        if not self.shared_dir:
+            return merged
+        
+        cleared = self._read_control().get('cleared', 0)
+        for path in glob.glob(os.path.join(self.shared_dir, 'stacks_*.json')):
+            data = _read_json(path)
+            # Skip this worker's own file, and stacks recorded before a clear
+            if data is None or path == self._stacks_path() or data.get('cleared', 0) < cleared:
+                continue
+            for mode, stacks in data['stacks'].items():
+                for name, counts in stacks.items():
+                    merged[mode][name].update(counts)
+        return merged
+    
+    def _stacks_path(self):
+        return os.path.join(self.shared_dir, f'stacks_{os.getpid()}_{int(self._started * 1e6)}.json')
+    
+    def _save(self):
+        """Write this worker's stacks to the shared directory"""
+        if not self.shared_dir:
+            return
+        self._last_save = time.monotonic()
+        with self._lock:
+            stacks = {mode: {name: dict(counts) for name, counts in stacks.items()}
+                      for mode, stacks in self.stacks.items()}
+        try:
+            _write_json(self._stacks_path(), {'cleared': self._cleared, 'stacks': stacks})
+        except OSError:
+            pass
+    
+    def _read_control(self):
+        return _read_json(os.path.join(self.shared_dir, 'control.json')) or {}
+    
+    def _update_control(self, **values):
+        if self.shared_dir:
+            _write_json(os.path.join(self.shared_dir, 'control.json'), dict(self._read_control(), **values))
+    
+    def _sync(self):
+        """Apply control changes made by an admin request to another worker"""
+        try:
+            mtime = os.stat(os.path.join(self.shared_dir, 'control.json')).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._control_mtime:
+            return
+        self._control_mtime = mtime
+        
+        control = self._read_control()
+        self.sample_rate = control.get('sample_rate', self.sample_rate)
+        if control.get('cleared', 0) > self._cleared:
+            self._cleared = control['cleared']
+            self._clear_local()
+        remaining = control.get('sampler_until', 0) - time.time()
+        if remaining > 0:
+            self._start_sampler(remaining, control.get('sampler_interval', 0.005))
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    # Written to a temporary file and renamed, so readers never see a partial file
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+# Create an instance to be used with init_app pattern
+profiler = Profiler()
@@ -0,0 +1,90 @@
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from collections import namedtuple
+from urllib.parse import urlencode
+
+class StoredResponse(namedtuple('StoredResponse', 'data etag fetched_at ttl')):
+    """A stored upstream response, with its parsed JSON body"""
+    
+    def fresh(self, now=None):
+        """Whether the response is still within its TTL"""
+        return (time.time() if now is None else now) < self.fetched_at + self.ttl
+
+def response_key(endpoint, params=None):
+    """Store key of an upstream request: the endpoint plus sorted query params"""
+    if not params:
+        return endpoint
+    return f'{endpoint}?{urlencode(sorted(params.items()))}'
+
+class ResponseStore:
+    """
+    Upstream responses persisted in a SQLite file
+    
+    Bodies are kept zlib-compressed with the time they were fetched, the
+    upstream ETag and their TTL, so a restarted process can answer from
+    disk, revalidate with If-None-Match, and fall back to stale responses
+    while the upstream API is unreachable.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS upstream_responses ('
+                'key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, '
+                'fetched_at REAL NOT NULL, ttl REAL NOT NULL)'
+            )
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key):
+        """Get a stored response (fresh or not), or None"""
+        row = self._connect().execute(
+            'SELECT body, etag, fetched_at, ttl FROM upstream_responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        body, etag, fetched_at, ttl = row
+        return StoredResponse(json.loads(zlib.decompress(body)), etag, fetched_at, ttl)
+    
+    def put(self, key, body, etag, ttl, now=None):
+        """Store a raw response body"""
+        self._connect().execute(
+            'INSERT INTO upstream_responses (key, body, etag, fetched_at, ttl) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET body = excluded.body, etag = excluded.etag, '
+            'fetched_at = excluded.fetched_at, ttl = excluded.ttl',
+            (key, zlib.compress(body), etag, time.time() if now is None else now, ttl)
+        )
+    
+    def touch(self, key, ttl, now=None):
+        """Mark a stored response as revalidated (upstream answered 304)"""
+        self._connect().execute(
+            'UPDATE upstream_responses SET fetched_at = ?, ttl = ? WHERE key = ?',
+            (time.time() if now is None else now, ttl, key)
+        )
+    
+    def purge(self, max_stale, now=None):
+        """Delete responses that expired more than max_stale seconds ago"""
+        now = time.time() if now is None else now
+        return self._connect().execute(
+            'DELETE FROM upstream_responses WHERE fetched_at + ttl + ? < ?', (max_stale, now)
+        ).rowcount
+    
+    def clear(self):
+        self._connect().execute('DELETE FROM upstream_responses')
+    
+    def reconnect(self):
+        """Drop connections inherited from a parent process"""
+        self._local = threading.local()
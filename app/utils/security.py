@@ -1,58 +1,107 @@
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, make_response
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app.services.auth_service import auth_service
+from app.services.rate_limit_service import rate_limit_service
 from app.models.api_usage import APIUsage
-from app.database import db
-import time
+from app.database import db, keep_on_rollback
+from app.utils.timing import phase, request_elapsed_ms, get_phase_timings
+from app.utils.metrics import api_usage_records_total
+
+MISSING_API_KEY_ERROR = {
+    'error': 'API key is required',
+    'message': 'Please provide an API key via X-API-Key header or api_key query parameter'
+}
+
+def authorize_api_key(api_key):
+    """
+    Validate an API key and charge one request to its plan's rate limit
+    
+    Returns:
+        tuple: (key, error, status_code, limit_headers) where key is None
+        and error is a response body when the request must be refused
+    """
+    with phase('auth'):
+        key, response, status_code = auth_service.validate_api_key(api_key)
+    
+    if status_code != 200:
+        return None, response, status_code, {}
+    
+    # Enforce the per-key rate limit and quotas of the user's plan
+    allowed, limit_headers, limit_message = rate_limit_service.hit(
+        key.id, response['user'].get('plan')
+    )
+    
+    if not allowed:
+        return None, {
+            'error': 'Too many requests',
+            'message': limit_message
+        }, 429, limit_headers
+    
+    return key, None, 200, limit_headers
+
+def record_api_usage(key, endpoint, method, ip_address, user_agent):
+    """
+    Add a usage record for an authorized request (committed with the
+    request, and on its own if the request fails)
+    """
+    usage = APIUsage(
+        api_key_id=key.id,
+        endpoint=endpoint,
+        method=method,
+        status_code=200,  # Will be updated on completion
+        ip_address=ip_address,
+        user_agent=user_agent
+    )
+    
+    db.session.add(usage)
+    keep_on_rollback(usage)
+    api_usage_records_total.inc()
+    return usage
+
+def complete_api_usage(usage_id, values):
+    """Update a usage record by primary key, whatever state the session is in"""
+    APIUsage.query.filter_by(id=usage_id).update(values, synchronize_session=False)
+    db.session.commit()
 
 def require_api_key(f):
     """Decorator to require valid API key for access to protected endpoints"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        start_time = time.time()
-        
         # Get API key from header or query parameter
         api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
         
         if not api_key:
-            return jsonify({
-                'error': 'API key is required',
-                'message': 'Please provide an API key via X-API-Key header or api_key query parameter'
-            }), 401
-        
-        # Validate the API key
-        key, response, status_code = auth_service.validate_api_key(api_key)
+            return jsonify(MISSING_API_KEY_ERROR), 401
         
-        if status_code != 200:
-            return jsonify(response), status_code
+        # Validate the API key and apply its rate limit
+        key, error, status_code, limit_headers = authorize_api_key(api_key)
         
-        # Calculate response time
-        response_time = int((time.time() - start_time) * 1000)
+        if error is not None:
+            return jsonify(error), status_code, limit_headers
         
         # If we reach here, the API key is valid
         try:
             # Record API usage
-            usage = APIUsage(
-                api_key_id=key.id,
+            usage = record_api_usage(
+                key,
                 endpoint=request.path,
                 method=request.method,
-                status_code=200,  # Will be updated on completion
-                response_time_ms=response_time,
                 ip_address=request.remote_addr,
                 user_agent=request.user_agent.string if request.user_agent else None
             )
             
-            db.session.add(usage)
-            db.session.commit()
-            
             # Store API key and usage info for potential updates later
+            # Response time and phases are filled in by finalize_api_usage
             request.api_key = key
             request.api_usage = usage
             
             # Proceed with the original function
-            return f(*args, **kwargs)
+            result = make_response(f(*args, **kwargs))
+            result.headers.extend(limit_headers)
+            return result
         except Exception as e:
-            current_app.logger.error(f"Error in API key middleware: {str(e)}")
+            current_app.logger.error('Error in API key middleware: %s', e)
             return jsonify({
                 'error': 'Internal server error',
                 'message': 'An error occurred while processing your request'
@@ -60,11 +109,45 @@ def require_api_key(f):
     
     return decorated
 
+def require_admin(f):
+    """Decorator to require a valid JWT belonging to an admin user"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        verify_jwt_in_request()
+        
+        identity = auth_service.get_identity(get_jwt_identity())
+        
+        if not identity or not identity['user']['is_admin']:
+            return jsonify({
+                'error': 'Forbidden',
+                'message': 'Administrator access is required'
+            }), 403
+        
+        return f(*args, **kwargs)
+    
+    return decorated
+
 def update_api_usage(status_code):
-    """Update API usage record with the final status code"""
-    try:
-        if hasattr(request, 'api_usage'):
-            request.api_usage.status_code = status_code
-            db.session.commit()
-    except Exception as e:
-        current_app.logger.error(f"Error updating API usage: {str(e)}")
\ No newline at end of file
+    """Set the final status code on the API usage record"""
+    if hasattr(request, 'api_usage'):
+        request.api_usage.status_code = status_code
+
+def finalize_api_usage(response):
+    """
+    Record end-to-end latency and its phase breakdown on the API usage
+    record (after_request hook)
+    """
+    usage = getattr(request, 'api_usage', None)
+    if usage is None:
+        return response
+    
+    # Still pending: the record is inserted once, complete, by commit_request
+    usage.status_code = response.status_code
+    elapsed_ms = request_elapsed_ms()
+    if elapsed_ms is not None:
+        usage.response_time_ms = int(round(elapsed_ms))
+    
+    for name, duration_ms in get_phase_timings().items():
+        setattr(usage, f'{name}_ms', round(duration_ms, 3))
+    
+    return response
@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context
+
+# Request phases recorded for API usage, in pipeline order
+PHASES = ('auth', 'cache', 'upstream', 'filter', 'serialize')
+
+def start_request_timer():
+    """Record the start of the current request (before_request hook)"""
+    g.request_start_ns = time.perf_counter_ns()
+    g.phase_ns = {}
+
+def request_elapsed_ms():
+    """Milliseconds since the current request started, or None if untimed"""
+    start = g.get('request_start_ns') if has_app_context() else None
+    if start is None:
+        return None
+    return (time.perf_counter_ns() - start) / 1e6
+
+@contextmanager
+def phase(name):
+    """
+    Time a block of work as one phase of the current request
+    
+    Repeated phases within a request (e.g. several upstream calls) are
+    summed. Outside a timed request this is a no-op.
+    """
+    timings = g.get('phase_ns') if has_app_context() else None
+    if timings is None:
+        yield
+        return
+    
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter_ns() - start
+
+def get_phase_timings():
+    """Phase durations of the current request in milliseconds"""
+    timings = (g.get('phase_ns') if has_app_context() else None) or {}
+    return {name: timings[name] / 1e6 for name in PHASES if name in timings}
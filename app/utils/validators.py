@@ -1,5 +1,13 @@
 import re
-from email_validator import validate_email, EmailNotValidError
+from datetime import datetime, timezone
+
+# Patterns are compiled at import, i.e. once in a preloading master process
+USERNAME_PATTERN = re.compile(r'^[a-zA-Z0-9][a-zA-Z0-9_-]*[a-zA-Z0-9]$|^[a-zA-Z0-9]$')
+UPPERCASE_PATTERN = re.compile(r'[A-Z]')
+LOWERCASE_PATTERN = re.compile(r'[a-z]')
+DIGIT_PATTERN = re.compile(r'[0-9]')
+SPECIAL_PATTERN = re.compile(r'[!@#$%^&*(),.?":{}|<>]')
+TAG_PATTERN = re.compile(r'<[^>]*>')
 
 def validate_username(username):
     """
@@ -15,13 +23,16 @@ def validate_username(username):
         return False, "Username must be 3-20 characters"
     
     # Check allowed characters
-    if not re.match(r'^[a-zA-Z0-9][a-zA-Z0-9_-]*[a-zA-Z0-9]$|^[a-zA-Z0-9]$', username):
+    if not USERNAME_PATTERN.match(username):
         return False, "Username can only contain letters, numbers, underscores and hyphens, and cannot start or end with underscore or hyphen"
     
     return True, ""
 
 def validate_email_address(email):
     """Validate email format"""
+    # email_validator pulls in a DNS resolver; only registration needs it
+    from email_validator import validate_email, EmailNotValidError
+    
     if not email or not isinstance(email, str):
         return False, "Email is required"
     
@@ -50,19 +61,19 @@ def validate_password(password):
         return False, "Password must be at least 8 characters"
     
     # Check for uppercase
-    if not re.search(r'[A-Z]', password):
+    if not UPPERCASE_PATTERN.search(password):
         return False, "Password must contain at least one uppercase letter"
     
     # Check for lowercase
-    if not re.search(r'[a-z]', password):
+    if not LOWERCASE_PATTERN.search(password):
         return False, "Password must contain at least one lowercase letter"
     
     # Check for number
-    if not re.search(r'[0-9]', password):
+    if not DIGIT_PATTERN.search(password):
         return False, "Password must contain at least one number"
     
     # Check for special character
-    if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+    if not SPECIAL_PATTERN.search(password):
         return False, "Password must contain at least one special character"
     
     return True, ""
@@ -73,7 +84,25 @@ def sanitize_string(input_string):
         return ""
     
     # Remove any HTML tags
-    sanitized = re.sub(r'<[^>]*>', '', input_string)
+    sanitized = TAG_PATTERN.sub('', input_string)
     
     # Limit length to reasonable size
-    return sanitized[:500]  # Limit to 500 characters
\ No newline at end of file
+    return sanitized[:500]  # Limit to 500 characters
+
+def validate_datetime(value):
+    """
+    Validate an ISO 8601 date or datetime string
+    - Timezone offsets are converted to naive UTC to match stored timestamps
+    """
+    if not value or not isinstance(value, str):
+        return False, "Date is required"
+    
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return False, f"Invalid date: {value}. Use ISO 8601 format, e.g. 2024-01-31T12:00:00"
+    
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return True, parsed
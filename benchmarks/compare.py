@@ -0,0 +1,41 @@
+"""
+Compare two benchmark result files
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+"""
+import sys
+import json
+
+METRICS = ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'db_writes_per_request')
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return {(r['population'], r['route']): r for r in data['results']}
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return 'n/a'
+    return f'{(new - old) / old * 100:+.1f}%'
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        print(__doc__.strip())
+        return 2
+    
+    base, new = load(argv[0]), load(argv[1])
+    print(f"{'population':>10}  {'route':<22} " + '  '.join(f'{m:>24}' for m in METRICS))
+    
+    for key in sorted(set(base) & set(new)):
+        cells = []
+        for metric in METRICS:
+            old_value, new_value = base[key].get(metric), new[key].get(metric)
+            cells.append(f'{old_value}->{new_value} ({change(old_value, new_value)})'.rjust(24))
+        print(f'{key[0]:>10}  {key[1]:<22} ' + '  '.join(cells))
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
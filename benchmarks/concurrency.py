@@ -0,0 +1,138 @@
+"""
+Concurrency scaling of the WSGI and ASGI serving modes
+
+Serves the app from one gunicorn worker with a fixed number of threads
+(WSGI) and from one uvicorn worker (ASGI), against a slow FakeRestCountries
+upstream with the countries cache disabled, so every request waits on the
+upstream. Each server is driven at increasing client concurrency and
+req/s and latency percentiles are written to a JSON file.
+
+Key verification uses a cheap bcrypt work factor in the request thread
+and per-key rate limits are disabled, so the upstream wait dominates.
+
+Usage:
+    python -m benchmarks.concurrency --levels 1,4,16,64 --latency-ms 200 \\
+        --wsgi-threads 4 --output benchmarks/results/concurrency.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+
+import requests
+
+from benchmarks.dataset import load_dataset
+from benchmarks.fake_upstream import FakeRestCountries
+from benchmarks.run_benchmarks import (
+    configure_environment, seed_api_keys, route_paths, drive, percentile, environment_info
+)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def server_command(mode, port, args):
+    """Command line starting one worker of the given serving mode"""
+    bind = f'127.0.0.1:{port}'
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', '--workers', '1', '--threads', str(args.wsgi_threads),
+                '--bind', bind, '--log-level', 'warning', 'app:create_app()']
+    return [sys.executable, '-m', 'uvicorn', '--factory', 'app.asgi:create_asgi_app',
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', '--no-access-log']
+
+def wait_until_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with code {process.returncode}')
+        try:
+            requests.get(base_url + '/health', timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError('Server did not start in time')
+
+def run(args):
+    countries = load_dataset(args.dataset)
+    upstream = FakeRestCountries(countries, args.latency_ms)
+    upstream_url = upstream.start()
+    
+    workdir = tempfile.mkdtemp(prefix='countries-bench-')
+    args.no_cache = True
+    configure_environment(os.path.join(workdir, 'bench.db'), upstream_url, args)
+    os.environ['BCRYPT_LOG_ROUNDS'] = '4'
+    os.environ['HASH_POOL_SIZE'] = '0'
+    
+    from app import create_app
+    app = create_app(os.environ.get('FLASK_ENV', 'prod'))
+    keys = seed_api_keys(app, 10)
+    path = route_paths(countries)['countries_by_region']
+    results = []
+    
+    try:
+        for mode in args.modes:
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            process = subprocess.Popen(server_command(mode, port, args))
+            
+            try:
+                wait_until_ready(base_url, process)
+                for concurrency in args.levels:
+                    total = max(args.requests, concurrency * 4)
+                    drive(base_url, path, keys, concurrency, concurrency)
+                    latencies, statuses, wall = drive(base_url, path, keys, total, concurrency)
+                    
+                    result = {
+                        'mode': mode,
+                        'concurrency': concurrency,
+                        'requests': len(latencies),
+                        'statuses': statuses,
+                        'rps': round(len(latencies) / wall, 2),
+                        'p50_ms': round(percentile(latencies, 50), 3),
+                        'p99_ms': round(percentile(latencies, 99), 3)
+                    }
+                    results.append(result)
+                    print(f"{mode:<5} c={concurrency:<4} {result['rps']:>9.1f} req/s  "
+                          f"p50 {result['p50_ms']:.1f}ms  p99 {result['p99_ms']:.1f}ms", file=sys.stderr)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+    finally:
+        upstream.stop()
+    
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compare WSGI and ASGI concurrency scaling')
+    parser.add_argument('--levels', default='1,4,16,64',
+                        type=lambda value: [int(v) for v in value.split(',')],
+                        help='Comma-separated client concurrency levels')
+    parser.add_argument('--modes', default='wsgi,asgi', type=lambda value: value.split(','))
+    parser.add_argument('--wsgi-threads', type=int, default=4, help='Threads of the gunicorn worker')
+    parser.add_argument('--requests', type=int, default=100, help='Minimum measured requests per level')
+    parser.add_argument('--latency-ms', type=float, default=200, help='Upstream latency')
+    parser.add_argument('--dataset', help='Recorded /all dataset (JSON); generated if omitted')
+    parser.add_argument('--output', default='benchmarks/results/concurrency.json')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    
+    # Fields expected by environment_info
+    args.concurrency, args.jitter_ms, args.error_rate, args.drop_rate = args.levels, 0, 0.0, 0.0
+    environment = environment_info(args)
+    environment['settings']['wsgi_threads'] = args.wsgi_threads
+    
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment, 'results': results}, f, indent=2)
+    print(f'Results written to {args.output}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import json
+import random
+import requests
+
+REGIONS = {
+    'Africa': ['Northern Africa', 'Western Africa', 'Eastern Africa', 'Middle Africa', 'Southern Africa'],
+    'Americas': ['North America', 'Caribbean', 'Central America', 'South America'],
+    'Asia': ['Eastern Asia', 'South-Eastern Asia', 'Southern Asia', 'Central Asia', 'Western Asia'],
+    'Europe': ['Northern Europe', 'Western Europe', 'Southern Europe', 'Eastern Europe'],
+    'Oceania': ['Australia and New Zealand', 'Melanesia', 'Micronesia', 'Polynesia'],
+    'Antarctic': ['Antarctic']
+}
+
+def generate_dataset(count=250, seed=42):
+    """
+    Generate a deterministic dataset shaped like RestCountries v3.1 /all
+    
+    Used when no recorded dataset is available. Currencies and languages
+    are shared between countries so filter endpoints return several results.
+    """
+    rng = random.Random(seed)
+    currency_codes = [f'C{i:02d}' for i in range(150)]
+    language_codes = [f'l{i:02d}' for i in range(100)]
+    region_names = list(REGIONS)
+    countries = []
+    
+    for i in range(count):
+        region = region_names[i % len(region_names)]
+        code = f'{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}'
+        currencies = rng.sample(currency_codes, rng.choice([1, 1, 1, 2]))
+        languages = rng.sample(language_codes, rng.choice([1, 1, 2, 3]))
+        
+        countries.append({
+            'name': {
+                'common': f'Country {i:03d}',
+                'official': f'Republic of Country {i:03d}'
+            },
+            'cca2': code,
+            'cca3': f'{code}X',
+            'capital': [f'Capital {i:03d}'],
+            'region': region,
+            'subregion': rng.choice(REGIONS[region]),
+            'languages': {lang: f'Language {lang}' for lang in languages},
+            'currencies': {
+                cur: {'name': f'Currency {cur}', 'symbol': '$'} for cur in currencies
+            },
+            'population': rng.randint(10_000, 300_000_000),
+            'area': float(rng.randint(100, 10_000_000)),
+            'flags': {
+                'png': f'https://flagcdn.com/w320/{code.lower()}.png',
+                'svg': f'https://flagcdn.com/{code.lower()}.svg'
+            }
+        })
+    
+    return countries
+
+def load_dataset(path=None):
+    """Load a recorded dataset from a JSON file, or generate one"""
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    return generate_dataset()
+
+def record_dataset(path, base_url='https://restcountries.com/v3.1'):
+    """Record the live /all dataset to a JSON file for reproducible runs"""
+    response = requests.get(f'{base_url}/all', timeout=30)
+    response.raise_for_status()
+    countries = response.json()
+    
+    with open(path, 'w') as f:
+        json.dump(countries, f)
+    
+    return len(countries)
@@ -0,0 +1,155 @@
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+class FakeRestCountries:
+    """
+    Local stand-in for the RestCountries v3.1 API
+    
+    Serves a dataset in memory with configurable latency and fault
+    injection, so benchmarks do not depend on the network or on
+    restcountries.com rate limits.
+    
+    Args:
+        countries: List of country records in RestCountries /all format
+        latency_ms: Fixed delay added to every response
+        jitter_ms: Random extra delay, uniformly 0..jitter_ms
+        error_rate: Fraction of requests answered with HTTP 500
+        drop_rate: Fraction of requests whose connection is closed unanswered
+        seed: Seed for the fault injection random generator
+    """
+    
+    def __init__(self, countries, latency_ms=0, jitter_ms=0, error_rate=0.0, drop_rate=0.0, seed=0):
+        self.countries = countries
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.request_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+    
+    def start(self, host='127.0.0.1', port=0):
+        """Start serving in a background thread and return the base URL"""
+        handler = self._make_handler()
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+    
+    def stop(self):
+        """Stop the server"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def lookup(self, path):
+        """Resolve a RestCountries path to (status, payload)"""
+        parts = [unquote(part) for part in path.split('?', 1)[0].strip('/').split('/')]
+        # Accept an optional version prefix such as /v3.1/all
+        if parts and parts[0].startswith('v3'):
+            parts = parts[1:]
+        
+        if parts == ['all']:
+            return 200, self.countries
+        if len(parts) != 2:
+            return 404, {'status': 404, 'message': 'Not Found'}
+        
+        kind, value = parts[0], parts[1].lower()
+        if kind == 'name':
+            matches = [c for c in self.countries if value in c['name']['common'].lower()]
+        elif kind == 'currency':
+            matches = [c for c in self.countries
+                       if any(value == code.lower() or value in cur.get('name', '').lower()
+                              for code, cur in c.get('currencies', {}).items())]
+        elif kind == 'lang':
+            matches = [c for c in self.countries
+                       if any(value == code.lower() or value == name.lower()
+                              for code, name in c.get('languages', {}).items())]
+        elif kind == 'region':
+            matches = [c for c in self.countries if c.get('region', '').lower() == value]
+        else:
+            matches = []
+        
+        if not matches:
+            return 404, {'status': 404, 'message': 'Not Found'}
+        return 200, matches
+    
+    def _next_fault(self):
+        with self._lock:
+            self.request_count += 1
+            roll = self._random.random()
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+        
+        if roll < self.drop_rate:
+            return 'drop', delay
+        if roll < self.drop_rate + self.error_rate:
+            return 'error', delay
+        return None, delay
+    
+    def _make_handler(self):
+        upstream = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                fault, delay = upstream._next_fault()
+                if delay:
+                    time.sleep(delay / 1000)
+                
+                if fault == 'drop':
+                    self.close_connection = True
+                    return
+                
+                if fault == 'error':
+                    status, payload = 500, {'status': 500, 'message': 'Injected fault'}
+                else:
+                    status, payload = upstream.lookup(self.path)
+                
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+if __name__ == '__main__':
+    import argparse
+    from benchmarks.dataset import load_dataset
+    
+    parser = argparse.ArgumentParser(description='Serve a local RestCountries stand-in')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--dataset', help='Recorded /all dataset (JSON); generated if omitted')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--drop-rate', type=float, default=0)
+    args = parser.parse_args()
+    
+    server = FakeRestCountries(
+        load_dataset(args.dataset), args.latency_ms, args.jitter_ms,
+        args.error_rate, args.drop_rate
+    )
+    print(f'Serving fake RestCountries at {server.start(port=args.port)}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
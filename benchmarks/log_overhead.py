@@ -0,0 +1,147 @@
+"""
+Logging overhead per request
+
+Serves a route that logs a fixed number of INFO records per request, like
+the routes used to (user ID, status and a dict of request headers), through
+the test client, and times it with logging configured three ways:
+
+- disabled: the app logger is above INFO, so records are never created
+- sync: a StreamHandler on the app logger writes in the request thread
+  (the previous setup)
+- queued: the LogPipeline (QueueHandler + listener thread) with sampling off
+
+Output goes to a stream that sleeps for --write-latency-us per write, to
+stand in for a slow or blocked stderr. Modes take turns over several
+rounds to spread out machine noise. Reported per mode: median time per
+request, the overhead over the disabled mode and the records written.
+
+Usage:
+    python -m benchmarks.log_overhead --requests 2000 --records 4 --write-latency-us 50 \\
+        --output benchmarks/results/log_overhead.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+
+class SlowStream:
+    """Write-only stream that takes a fixed time per write"""
+    
+    def __init__(self, latency):
+        self.latency = latency
+        self.writes = 0
+    
+    def write(self, text):
+        self.writes += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return len(text)
+    
+    def flush(self):
+        pass
+
+def create_app(records):
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'log_overhead.db'))
+    from flask import request
+    from app import create_app, limiter
+    
+    app = create_app('test')
+    
+    @app.route('/benchmark/logging')
+    @limiter.exempt
+    def logging_route():
+        for _ in range(records):
+            app.logger.info('Request from %s with headers %s', request.remote_addr, dict(request.headers))
+        return 'ok'
+    
+    return app
+
+def configure(app, mode, stream):
+    """Point the app logger at the stream the way a mode does"""
+    from app.utils.logs import log_pipeline, TEXT_FORMAT
+    
+    log_pipeline.stop()
+    if mode == 'queued':
+        app.config['LOG_SAMPLE_BURST'] = 0
+        log_pipeline.init_app(app)
+        for handler in log_pipeline.handlers:
+            handler.setStream(stream)
+        return
+    
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    app.logger.handlers = [handler]
+    app.logger.setLevel(logging.INFO if mode == 'sync' else logging.WARNING)
+
+def time_requests(app, mode, requests, stream):
+    """Per-request times of one round in a mode"""
+    from app.utils.logs import log_pipeline
+    
+    configure(app, mode, stream)
+    client = app.test_client()
+    for _ in range(min(requests, 50)):
+        client.get('/benchmark/logging')
+    
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get('/benchmark/logging')
+        samples.append(time.perf_counter() - start)
+    
+    # Queued records still being written do not count against requests
+    log_pipeline.stop()
+    return samples
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Measure logging overhead per request')
+    parser.add_argument('--requests', type=int, default=2000, help='Timed requests per mode')
+    parser.add_argument('--rounds', type=int, default=5, help='Rounds the requests are split over')
+    parser.add_argument('--records', type=int, default=4, help='INFO records logged per request')
+    parser.add_argument('--write-latency-us', type=float, default=50,
+                        help='Time each write to the log stream takes')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app(args.records)
+    
+    modes = ('disabled', 'sync', 'queued')
+    streams = {mode: SlowStream(args.write_latency_us / 1e6) for mode in modes}
+    samples = {mode: [] for mode in modes}
+    for _ in range(args.rounds):
+        for mode in modes:
+            samples[mode] += time_requests(app, mode, args.requests // args.rounds, streams[mode])
+    
+    results = {
+        mode: {
+            'median_us': round(statistics.median(samples[mode]) * 1e6, 1),
+            'p95_us': round(sorted(samples[mode])[int(len(samples[mode]) * 0.95)] * 1e6, 1),
+            'writes': streams[mode].writes
+        }
+        for mode in modes
+    }
+    for mode, result in results.items():
+        result['overhead_us'] = round(result['median_us'] - results['disabled']['median_us'], 1)
+        print(f"{mode:>8}: {result['median_us']:8.1f}us/request "
+              f"(+{result['overhead_us']:.1f}us logging)", file=sys.stderr)
+    
+    result = {
+        'requests': args.requests,
+        'records_per_request': args.records,
+        'write_latency_us': args.write_latency_us,
+        'modes': results
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'Results written to {args.output}', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
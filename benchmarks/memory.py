@@ -0,0 +1,157 @@
+"""
+Memory footprint of cached countries as dicts and as Country records
+
+Fills a cache the way the service does: every endpoint (/all, each
+region, currency and language) gets its own decoded upstream response,
+which is filtered and kept, so each country is held once per endpoint it
+appears in. This is done with the per-country dicts the service used to
+build and with shared Country records, each in a fresh process, and then
+a run of paginated responses is serialized from the cache.
+
+Reported per mode: retained bytes and allocated blocks (tracemalloc),
+GC-tracked objects added, peak RSS, serialization time per response
+and the peak memory of serializing 200 responses.
+
+Usage:
+    python -m benchmarks.memory --responses 2000 --output benchmarks/results/memory.json
+"""
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import subprocess
+import tracemalloc
+
+from benchmarks.dataset import load_dataset
+
+def filter_dict(country):
+    """The per-request dict the countries service built before Country records"""
+    filtered = {
+        'name': country.get('name', {}).get('common', ''),
+        'official_name': country.get('name', {}).get('official', ''),
+        'capital': country.get('capital', [''])[0] if country.get('capital') else '',
+        'languages': country.get('languages', {}),
+        'currencies': {},
+        'flag': country.get('flags', {}).get('png', '')
+    }
+    for code, details in country.get('currencies', {}).items():
+        filtered['currencies'][code] = {
+            'name': details.get('name', ''),
+            'symbol': details.get('symbol', '')
+        }
+    return filtered
+
+def endpoint_responses(countries):
+    """Upstream response bodies for every endpoint, as served by RestCountries"""
+    responses = {'all': countries}
+    for country in countries:
+        keys = [f"region/{country.get('region')}"]
+        keys += [f'currency/{code}' for code in country.get('currencies', {})]
+        keys += [f'lang/{code}' for code in country.get('languages', {})]
+        for key in keys:
+            responses.setdefault(key, []).append(country)
+    return {key: json.dumps(body) for key, body in responses.items()}
+
+def measure(mode, dataset, responses_count, per_page):
+    from app.models.country import Country
+    from app.utils.helpers import dumps, paginate_results, JSONEncoder
+    
+    bodies = endpoint_responses(load_dataset(dataset))
+    build = filter_dict if mode == 'dicts' else Country.from_api
+    
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    tracemalloc.start()
+    
+    cache = {}
+    for endpoint, body in bodies.items():
+        cache[endpoint] = [build(country) for country in json.loads(body)]
+    
+    gc.collect()
+    objects = len(gc.get_objects()) - objects_before
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    statistics = snapshot.statistics('filename')
+    retained = sum(stat.size for stat in statistics)
+    blocks = sum(stat.count for stat in statistics)
+    del snapshot, statistics
+    
+    # Serialize paginated responses from random endpoints
+    rng = random.Random(7)
+    endpoints = list(cache)
+    pages = []
+    for _ in range(responses_count):
+        items = cache[rng.choice(endpoints)]
+        pages.append(paginate_results(items, rng.randint(1, max(1, len(items) // per_page)), per_page))
+    
+    if mode == 'dicts':
+        encode = JSONEncoder(sort_keys=True, separators=(',', ':')).encode
+    else:
+        encode = dumps
+    
+    for page in pages[:100]:
+        encode(page)
+    
+    start = time.perf_counter()
+    for page in pages:
+        encode(page)
+    serialize_us = (time.perf_counter() - start) / len(pages) * 1e6
+    
+    tracemalloc.start()
+    for page in pages[:200]:
+        encode(page)
+    _, serialize_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        'mode': mode,
+        'endpoints': len(cache),
+        'cached_entries': sum(len(items) for items in cache.values()),
+        'retained_bytes': retained,
+        'retained_blocks': blocks,
+        'gc_objects': objects,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'serialize_us_per_response': round(serialize_us, 2),
+        'serialize_peak_bytes': serialize_peak
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compare memory of country dicts and records')
+    parser.add_argument('--modes', default='dicts,records', type=lambda value: value.split(','))
+    parser.add_argument('--responses', type=int, default=2000, help='Responses serialized per mode')
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--dataset', help='Recorded /all dataset (JSON); generated if omitted')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    if args.child:
+        print(json.dumps(measure(args.child, args.dataset, args.responses, args.per_page)))
+        return
+    
+    # One process per mode, so RSS and the record registry start empty
+    results = []
+    for mode in args.modes:
+        command = [sys.executable, '-m', 'benchmarks.memory', '--child', mode,
+                   '--responses', str(args.responses), '--per-page', str(args.per_page)]
+        if args.dataset:
+            command += ['--dataset', args.dataset]
+        result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+        results.append(result)
+        print(f"{mode:<8} retained {result['retained_bytes'] / 1024:>8.0f} KiB in {result['retained_blocks']:>7} blocks  "
+              f"gc objects {result['gc_objects']:>7}  rss {result['max_rss_kb']:>7} KiB  "
+              f"serialize {result['serialize_us_per_response']:.1f}us", file=sys.stderr)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+        print(f'Results written to {args.output}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
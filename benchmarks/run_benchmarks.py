@@ -0,0 +1,263 @@
+"""
+Throughput and latency benchmark for the /api/v1 country routes
+
+Starts the app on a local port against a FakeRestCountries upstream,
+seeds a fixed population of API keys, drives every route with concurrent
+clients and writes the results to a JSON file.
+
+Usage:
+    python -m benchmarks.run_benchmarks --populations 10,1000,100000 \\
+        --concurrency 16 --requests 500 --latency-ms 50 \\
+        --output benchmarks/results/run.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import uuid
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.dataset import load_dataset
+from benchmarks.fake_upstream import FakeRestCountries
+
+# Number of keys that clients actually send; the rest of the population
+# only makes the api_keys table realistically large
+ACTIVE_KEYS = 10
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def configure_environment(db_path, upstream_url, args):
+    """Point the app configuration at the benchmark database and upstream"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['COUNTRIES_API_URL'] = upstream_url
+    os.environ['RATELIMIT_ENABLED'] = 'false'
+    os.environ['API_KEY_RATELIMIT_ENABLED'] = 'false'
+    os.environ['COUNTRIES_CACHE_SIZE'] = '0' if args.no_cache else os.environ.get('COUNTRIES_CACHE_SIZE', '256')
+
+def seed_api_keys(app, population):
+    """Create one user with `population` API keys and return the active key values"""
+    from app.database import db, bcrypt
+    from app.models import User, APIKey
+    
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        
+        user = User(username='benchuser', email='bench@example.com', password='Bench123!')
+        db.session.add(user)
+        db.session.commit()
+        
+        active = [str(uuid.uuid4()) for _ in range(min(ACTIVE_KEYS, population))]
+        # Keys nobody sends share one hash; hashing 100k keys would dominate setup
+        filler_hash = bcrypt.generate_password_hash(str(uuid.uuid4())).decode('utf-8')
+        now = datetime.utcnow()
+        rows = []
+        
+        for i in range(population):
+            key_value = active[i] if i < len(active) else str(uuid.uuid4())
+            key_hash = (bcrypt.generate_password_hash(key_value).decode('utf-8')
+                        if i < len(active) else filler_hash)
+            rows.append({
+                'user_id': user.id, 'key_value': key_value, 'key_hash': key_hash,
+                'name': f'bench-{i}', 'is_active': True, 'created_at': now
+            })
+            
+            if len(rows) == 5000:
+                db.session.execute(APIKey.__table__.insert(), rows)
+                rows = []
+        
+        if rows:
+            db.session.execute(APIKey.__table__.insert(), rows)
+        db.session.commit()
+    
+    return active
+
+class WriteCounter:
+    """Count INSERT/UPDATE/DELETE statements executed on an engine"""
+    
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            with self._lock:
+                self.count += 1
+
+def route_paths(countries):
+    """Representative request paths for every /api/v1 country route"""
+    sample = countries[len(countries) // 3]
+    currency = next(iter(sample.get('currencies', {'USD': {}})))
+    language = next(iter(sample.get('languages', {'eng': ''})))
+    
+    return {
+        'countries': '/api/v1/countries?page=2&per_page=20',
+        'country_by_name': f"/api/v1/countries/{sample['name']['common']}",
+        'countries_by_currency': f'/api/v1/countries/currency/{currency}',
+        'countries_by_language': f'/api/v1/countries/language/{language}',
+        'countries_by_region': f"/api/v1/countries/region/{sample.get('region', 'Europe').lower()}"
+    }
+
+def drive(base_url, path, keys, total, concurrency):
+    """Issue `total` GET requests with `concurrency` clients; return latencies and statuses"""
+    local = threading.local()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        
+        start = time.perf_counter()
+        try:
+            status = session.get(base_url + path, headers={'X-API-Key': keys[i % len(keys)]}, timeout=60).status_code
+        except requests.RequestException:
+            status = 'error'
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+    
+    return sorted(latencies), statuses, wall
+
+def run(args):
+    countries = load_dataset(args.dataset)
+    upstream = FakeRestCountries(
+        countries, args.latency_ms, args.jitter_ms, args.error_rate, args.drop_rate
+    )
+    upstream_url = upstream.start()
+    
+    workdir = tempfile.mkdtemp(prefix='countries-bench-')
+    configure_environment(os.path.join(workdir, 'bench.db'), upstream_url, args)
+    
+    from werkzeug.serving import make_server
+    from app import create_app
+    from app.database import db
+    
+    app = create_app(os.environ.get('FLASK_ENV', 'prod'))
+    app.logger.disabled = True
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    
+    with app.app_context():
+        writes = WriteCounter(db.engine)
+    
+    paths = route_paths(countries)
+    results = []
+    
+    try:
+        for population in args.populations:
+            print(f'Seeding {population} API keys...', file=sys.stderr)
+            keys = seed_api_keys(app, population)
+            
+            for route, path in paths.items():
+                # Warm up connections and caches
+                drive(base_url, path, keys, min(args.concurrency, args.requests), args.concurrency)
+                
+                writes_before = writes.count
+                upstream_before = upstream.request_count
+                latencies, statuses, wall = drive(base_url, path, keys, args.requests, args.concurrency)
+                db_writes = writes.count - writes_before
+                
+                result = {
+                    'population': population,
+                    'route': route,
+                    'path': path,
+                    'requests': len(latencies),
+                    'concurrency': args.concurrency,
+                    'statuses': statuses,
+                    'rps': round(len(latencies) / wall, 2),
+                    'p50_ms': round(percentile(latencies, 50), 3),
+                    'p95_ms': round(percentile(latencies, 95), 3),
+                    'p99_ms': round(percentile(latencies, 99), 3),
+                    'db_writes': db_writes,
+                    'db_writes_per_request': round(db_writes / max(1, len(latencies)), 3),
+                    'upstream_requests': upstream.request_count - upstream_before
+                }
+                results.append(result)
+                print(f"{population:>7} keys  {route:<22} {result['rps']:>9.1f} req/s  "
+                      f"p50 {result['p50_ms']:.1f}ms  p99 {result['p99_ms']:.1f}ms  "
+                      f"writes/req {result['db_writes_per_request']}", file=sys.stderr)
+    finally:
+        server.shutdown()
+        upstream.stop()
+    
+    return results
+
+def environment_info(args):
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {
+            'dataset': args.dataset or 'generated',
+            'concurrency': args.concurrency,
+            'requests_per_route': args.requests,
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'error_rate': args.error_rate,
+            'drop_rate': args.drop_rate,
+            'cache': not args.no_cache
+        }
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the /api/v1 country routes')
+    parser.add_argument('--populations', default='10,1000,100000',
+                        type=lambda value: [int(v) for v in value.split(',')],
+                        help='Comma-separated API key population sizes')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per route')
+    parser.add_argument('--dataset', help='Recorded /all dataset (JSON); generated if omitted')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Upstream latency')
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--no-cache', action='store_true', help='Disable the countries cache')
+    parser.add_argument('--output', default='benchmarks/results/latest.json')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment_info(args), 'results': results}, f, indent=2)
+    print(f'Results written to {args.output}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
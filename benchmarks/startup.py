@@ -0,0 +1,114 @@
+"""
+Worker startup profile
+
+Measures, in fresh interpreters, how long a worker takes from the start of
+`import app` to answering its first request (import, create_app, first
+/health request through the test client), and breaks the import time down
+per module with `python -X importtime`. Results are compared with a target
+time to first request and written to a JSON file.
+
+Usage:
+    python -m benchmarks.startup --runs 10 --top 20 --output benchmarks/results/startup.json
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+# Time to first request a worker should stay under, in milliseconds
+DEFAULT_TARGET_MS = 400
+
+FIRST_REQUEST_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get('/health')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1e3,
+    'create_app_ms': (created - imported) * 1e3,
+    'first_request_ms': (served - created) * 1e3,
+    'total_ms': (served - start) * 1e3
+}))
+"""
+
+def child_environment():
+    env = dict(os.environ)
+    workdir = tempfile.mkdtemp(prefix='countries-startup-')
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(workdir, 'startup.db'))
+    return env
+
+def time_to_first_request(runs):
+    """Median timings of `runs` fresh worker starts"""
+    env = child_environment()
+    samples = []
+    for _ in range(runs + 1):
+        output = subprocess.run([sys.executable, '-c', FIRST_REQUEST_SCRIPT], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    # The first start also compiles bytecode; leave it out
+    samples = samples[1:]
+    return {name: round(statistics.median(sample[name] for sample in samples), 1) for name in samples[0]}
+
+def import_profile(top):
+    """Modules with the largest cumulative import time (-X importtime)"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            env=child_environment(), capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': round(int(self_us) / 1e3, 2),
+            'cumulative_ms': round(int(cumulative_us) / 1e3, 2)
+        })
+    
+    modules.sort(key=lambda module: module['cumulative_ms'], reverse=True)
+    return modules[:top]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Profile worker startup time')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh worker starts to time')
+    parser.add_argument('--top', type=int, default=20, help='Modules to list by cumulative import time')
+    parser.add_argument('--target-ms', type=float, default=DEFAULT_TARGET_MS,
+                        help='Target time to first request')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    timings = time_to_first_request(args.runs)
+    modules = import_profile(args.top)
+    
+    for module in modules:
+        print(f"{module['cumulative_ms']:>9.1f}ms {module['self_ms']:>8.1f}ms  "
+              f"{'  ' * module['depth']}{module['module']}", file=sys.stderr)
+    print(f"import {timings['import_ms']:.0f}ms, create_app {timings['create_app_ms']:.0f}ms, "
+          f"first request {timings['first_request_ms']:.0f}ms: "
+          f"{timings['total_ms']:.0f}ms to first request (target {args.target_ms:.0f}ms)", file=sys.stderr)
+    
+    result = {
+        'timings': timings,
+        'target_ms': args.target_ms,
+        'within_target': timings['total_ms'] <= args.target_ms,
+        'imports': modules
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'Results written to {args.output}', file=sys.stderr)
+    
+    return 0 if result['within_target'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
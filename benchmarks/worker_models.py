@@ -0,0 +1,134 @@
+"""
+Gunicorn worker models on the country routes
+
+Serves the app through the production entry point (gunicorn.conf.py and
+wsgi.py) once per worker model (sync, gthread and, if the gevent package
+is installed, gevent), each sized by the config's defaults for the cores
+of this machine unless --workers / --threads are given. Every /api/v1
+country route is driven at a fixed client concurrency against a
+FakeRestCountries upstream, and req/s and latency percentiles are written
+to a JSON file.
+
+By default the countries cache is off, so each request waits on the
+upstream and the models are compared on how they overlap those waits;
+--cache keeps it on, which makes the routes CPU-bound.
+
+Usage:
+    python -m benchmarks.worker_models --models sync,gthread,gevent --concurrency 32 \\
+        --latency-ms 50 --output benchmarks/results/worker_models.json
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+from benchmarks.dataset import load_dataset
+from benchmarks.fake_upstream import FakeRestCountries
+from benchmarks.concurrency import free_port, wait_until_ready
+from benchmarks.run_benchmarks import (
+    configure_environment, seed_api_keys, route_paths, drive, percentile, environment_info
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def server_environment(model, port, args):
+    """Environment of a gunicorn server running one worker model"""
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=model, GUNICORN_BIND=f'127.0.0.1:{port}')
+    if args.workers:
+        env['GUNICORN_WORKERS'] = str(args.workers)
+    if args.threads:
+        env['GUNICORN_THREADS'] = str(args.threads)
+    return env
+
+def run(args):
+    countries = load_dataset(args.dataset)
+    upstream = FakeRestCountries(countries, args.latency_ms)
+    upstream_url = upstream.start()
+    
+    workdir = tempfile.mkdtemp(prefix='countries-bench-')
+    configure_environment(os.path.join(workdir, 'bench.db'), upstream_url, args)
+    os.environ['BCRYPT_LOG_ROUNDS'] = '4'
+    os.environ['HASH_POOL_SIZE'] = '0'
+    os.environ['LOG_LEVEL'] = 'WARNING'
+    if args.no_cache:
+        # The production config also persists upstream responses
+        os.environ['UPSTREAM_STORE_PATH'] = ''
+    
+    from app import create_app
+    app = create_app(os.environ.get('FLASK_ENV', 'prod'))
+    keys = seed_api_keys(app, 10)
+    paths = route_paths(countries)
+    results = []
+    
+    try:
+        for model in args.models:
+            if model == 'gevent' and importlib.util.find_spec('gevent') is None:
+                print('gevent is not installed; skipping the gevent worker model', file=sys.stderr)
+                continue
+            
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning'],
+                cwd=ROOT, env=server_environment(model, port, args)
+            )
+            
+            try:
+                wait_until_ready(base_url, process)
+                for route, path in paths.items():
+                    drive(base_url, path, keys, args.concurrency, args.concurrency)
+                    latencies, statuses, wall = drive(base_url, path, keys, args.requests, args.concurrency)
+                    
+                    result = {
+                        'model': model,
+                        'route': route,
+                        'requests': len(latencies),
+                        'statuses': statuses,
+                        'rps': round(len(latencies) / wall, 2),
+                        'p50_ms': round(percentile(latencies, 50), 3),
+                        'p99_ms': round(percentile(latencies, 99), 3)
+                    }
+                    results.append(result)
+                    print(f"{model:<8} {route:<22} {result['rps']:>9.1f} req/s  "
+                          f"p50 {result['p50_ms']:.1f}ms  p99 {result['p99_ms']:.1f}ms", file=sys.stderr)
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+    finally:
+        upstream.stop()
+    
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker models on the country routes')
+    parser.add_argument('--models', default='sync,gthread,gevent', type=lambda value: value.split(','))
+    parser.add_argument('--workers', type=int, help='Worker processes (default: per model, from the cores)')
+    parser.add_argument('--threads', type=int, help='Threads per gthread worker (default: 4)')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per route')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Upstream latency')
+    parser.add_argument('--dataset', help='Recorded /all dataset (JSON); generated if omitted')
+    parser.add_argument('--cache', action='store_true', help='Keep the countries cache on')
+    parser.add_argument('--output', default='benchmarks/results/worker_models.json')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.no_cache = not args.cache
+    results = run(args)
+    
+    # Fields expected by environment_info
+    args.jitter_ms, args.error_rate, args.drop_rate = 0, 0.0, 0.0
+    environment = environment_info(args)
+    environment['settings'].update(models=args.models, workers=args.workers, threads=args.threads)
+    
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment, 'results': results}, f, indent=2)
+    print(f'Results written to {args.output}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
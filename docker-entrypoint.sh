@@ -0,0 +1,6 @@
+#!/bin/sh
+# Create missing database tables, then run the command (gunicorn by default)
+set -e
+
+FLASK_APP=run.py flask init-db
+exec "$@"
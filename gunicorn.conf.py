@@ -0,0 +1,69 @@
+"""
+Gunicorn configuration: pre-fork workers sharing a preloaded app
+    
+    gunicorn -c gunicorn.conf.py
+
+Every setting can be overridden with a GUNICORN_* environment variable.
+"""
+import os
+import multiprocessing
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Worker model: sync (one request per worker at a time), gthread (a
+# thread pool per worker) or gevent (greenlets; needs the gevent package)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+if worker_class not in ('sync', 'gthread', 'gevent'):
+    raise ValueError(f'Unsupported GUNICORN_WORKER_CLASS: {worker_class}')
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded, so the locks, threads and sockets
+    # it creates in the master are cooperative in the workers
+    from gevent import monkey
+    monkey.patch_all()
+
+def default_workers(worker_class, cores):
+    """
+    Worker processes for a worker model on a number of cores
+    
+    Sync workers block on the upstream API and the database, so there are
+    more of them than cores; threads and greenlets overlap those waits
+    inside a worker, which then needs little more than a core each.
+    """
+    if worker_class == 'sync':
+        return 2 * cores + 1
+    if worker_class == 'gthread':
+        return cores + 1
+    return cores
+
+workers = int(os.environ.get('GUNICORN_WORKERS', 0)) or default_workers(worker_class, multiprocessing.cpu_count())
+threads = int(os.environ.get('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1))
+# Concurrent clients per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Seconds an idle client connection is kept open for its next request
+# (only sync workers ignore it); behind a load balancer, keep it above
+# the balancer's idle timeout
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Restart a worker after this many requests, plus a random 0..jitter so
+# workers do not all restart at once; bounds memory growth (0 disables)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+# A worker silent for `timeout` seconds is killed; on shutdown, workers
+# get `graceful_timeout` seconds to finish their requests
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Create the app once in the master; workers are forked from it
+preload_app = True
+
+def post_fork(server, worker):
+    from app.prefork import post_fork as reinitialize
+    reinitialize(server.app.wsgi())
+
+def worker_exit(server, worker):
+    from app.prefork import shutdown
+    shutdown(server.app.wsgi())
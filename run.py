@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from app import create_app
+from app.database import create_schema
 
 # Load environment variables from .env file
 load_dotenv()
@@ -9,5 +10,9 @@ load_dotenv()
 app = create_app(os.getenv('FLASK_ENV', 'dev'))
 
 if __name__ == '__main__':
+    # The development server creates missing tables itself; deployments
+    # run `flask init-db` once instead of on every worker start
+    create_schema(app)
+    
     # Run the app
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', 5000)), debug=app.config['DEBUG'])
\ No newline at end of file
@@ -0,0 +1,392 @@
+document.addEventListener('DOMContentLoaded', function() {
+    console.log("API Keys page loaded");
+
+    // Initialize Bootstrap components
+    const createKeyModal = new bootstrap.Modal(document.getElementById('createKeyModal'));
+
+    // Check if alerts container exists, if not create it
+    if (!document.getElementById('alerts-container')) {
+        const alertsContainer = document.createElement('div');
+        alertsContainer.id = 'alerts-container';
+        document.body.prepend(alertsContainer);
+    }
+
+    // Utility functions
+    function showAlert(message, type = 'info') {
+        const alertsContainer = document.getElementById('alerts-container');
+        if (!alertsContainer) {
+            console.error('Alerts container not found');
+            return;
+        }
+
+        const alertDiv = document.createElement('div');
+        alertDiv.className = `alert alert-${type} alert-dismissible fade show`;
+        alertDiv.innerHTML = `
+            ${message}
+            <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+        `;
+        alertsContainer.appendChild(alertDiv);
+
+        // Auto-dismiss after 5 seconds
+        setTimeout(() => {
+            alertDiv.classList.remove('show');
+            setTimeout(() => {
+                if (alertsContainer.contains(alertDiv)) {
+                    alertsContainer.removeChild(alertDiv);
+                }
+            }, 150);
+        }, 5000);
+    }
+
+    function checkAndDisplayAuthStatus() {
+        const authInfo = document.getElementById('auth-info');
+        const token = localStorage.getItem('access_token');
+
+        if (!token) {
+            authInfo.innerHTML = `
+                <div class="alert alert-danger mb-0">
+                    <strong>Not authenticated.</strong> Please <a href="/login" class="alert-link">login</a> first.
+                </div>
+            `;
+
+            // Disable key creation button
+            const createKeyBtn = document.getElementById('create-key-btn');
+            if (createKeyBtn) {
+                createKeyBtn.disabled = true;
+                createKeyBtn.classList.add('disabled');
+            }
+
+            return false;
+        }
+
+        try {
+            // Validate token format
+            const tokenParts = token.split('.');
+            if (tokenParts.length !== 3) {
+                throw new Error('Invalid token format');
+            }
+
+            const payload = JSON.parse(atob(tokenParts[1]));
+            const currentTime = Math.floor(Date.now() / 1000);
+
+            // Check if token is expired
+            if (payload.exp && payload.exp < currentTime) {
+                authInfo.innerHTML = `
+                    <div class="alert alert-warning mb-0">
+                        <strong>Token expired.</strong> Please <a href="/login" class="alert-link">login</a> again.
+                    </div>
+                `;
+                return false;
+            }
+
+            // Token is valid
+            const expiresIn = payload.exp - currentTime;
+            const hoursLeft = Math.floor(expiresIn / 3600);
+            const minutesLeft = Math.floor((expiresIn % 3600) / 60);
+
+            authInfo.innerHTML = `
+                <div class="alert alert-success mb-0">
+                    <strong>Authenticated</strong> as ${payload.sub}. 
+                    <br>Token expires in ${hoursLeft} hours and ${minutesLeft} minutes.
+                </div>
+            `;
+            return true;
+
+        } catch (error) {
+            console.error('Token validation error:', error);
+            authInfo.innerHTML = `
+                <div class="alert alert-danger mb-0">
+                    <strong>Authentication error:</strong> ${error.message}. 
+                    Please <a href="/login" class="alert-link">login</a> again.
+                </div>
+            `;
+            return false;
+        }
+    }
+
+    // Initialize buttons and UI
+    function initUI() {
+        // Check authentication first
+        const isAuthenticated = checkAndDisplayAuthStatus();
+
+        // Set up create key button
+        const createKeyBtn = document.getElementById('create-key-btn');
+        if (createKeyBtn) {
+            createKeyBtn.addEventListener('click', function() {
+                if (isAuthenticated) {
+                    createKeyModal.show();
+                } else {
+                    showAlert('Please login first', 'warning');
+                    setTimeout(() => {
+                        window.location.href = '/login';
+                    }, 1000);
+                }
+            });
+        }
+
+        // Set up confirm create key button
+        const confirmCreateKeyBtn = document.getElementById('confirm-create-key');
+        if (confirmCreateKeyBtn) {
+            confirmCreateKeyBtn.addEventListener('click', createApiKey);
+        }
+
+        // Set up copy key button
+        const copyKeyBtn = document.getElementById('copy-new-key');
+        if (copyKeyBtn) {
+            copyKeyBtn.addEventListener('click', function() {
+                const newKeyInput = document.getElementById('new-key-display');
+                if (newKeyInput) {
+                    newKeyInput.select();
+                    document.execCommand('copy');
+                    showAlert('API key copied to clipboard', 'info');
+                }
+            });
+        }
+
+        // Check if authenticated before loading API keys
+        if (isAuthenticated) {
+            loadApiKeys();
+        } else {
+            // Hide loading indicator
+            const loadingIndicator = document.getElementById('keys-loading');
+            if (loadingIndicator) {
+                loadingIndicator.classList.add('d-none');
+            }
+
+            // Show empty state
+            const emptyState = document.getElementById('keys-empty');
+            if (emptyState) {
+                emptyState.classList.remove('d-none');
+                emptyState.textContent = 'Please login to view your API keys';
+            }
+        }
+    }
+
+    // API Key Functions
+    async function loadApiKeys() {
+        const loadingIndicator = document.getElementById('keys-loading');
+        const errorContainer = document.getElementById('keys-error');
+        const emptyStateContainer = document.getElementById('keys-empty');
+        const keysTableContainer = document.getElementById('keys-table-container');
+
+        try {
+            // Show loading
+            if (loadingIndicator) loadingIndicator.classList.remove('d-none');
+            if (errorContainer) errorContainer.classList.add('d-none');
+            if (emptyStateContainer) emptyStateContainer.classList.add('d-none');
+            if (keysTableContainer) keysTableContainer.classList.add('d-none');
+
+            const accessToken = localStorage.getItem('access_token');
+            if (!accessToken) {
+                throw new Error('No access token available');
+            }
+
+            console.log('Fetching API keys...');
+            const response = await fetch('/user/api-keys', {
+                method: 'GET',
+                headers: {
+                    'Authorization': `Bearer ${accessToken}`
+                }
+            });
+
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.message || `HTTP error ${response.status}`);
+            }
+
+            const data = await response.json();
+            console.log('API keys loaded:', data);
+
+            // Hide loading
+            if (loadingIndicator) loadingIndicator.classList.add('d-none');
+
+            // Check if we have any keys
+            if (!data.api_keys || data.api_keys.length === 0) {
+                if (emptyStateContainer) {
+                    emptyStateContainer.classList.remove('d-none');
+                    emptyStateContainer.textContent = 'You don\'t have any API keys yet. Click "Create New Key" to get started.';
+                }
+                return;
+            }
+
+            // Render the keys
+            renderApiKeys(data.api_keys);
+
+        } catch (error) {
+            console.error('Error loading API keys:', error);
+            if (loadingIndicator) loadingIndicator.classList.add('d-none');
+
+            if (errorContainer) {
+                errorContainer.classList.remove('d-none');
+                errorContainer.textContent = `Failed to load API keys: ${error.message}`;
+            }
+
+            showAlert(`Failed to load API keys: ${error.message}`, 'danger');
+        }
+    }
+
+    function renderApiKeys(keys) {
+        const keysList = document.getElementById('keys-list');
+        const keysTableContainer = document.getElementById('keys-table-container');
+
+        if (!keysList || !keysTableContainer) {
+            console.error('Keys table elements not found');
+            return;
+        }
+
+        // Clear existing keys
+        keysList.innerHTML = '';
+
+        // Add keys to the table
+        keys.forEach(key => {
+            const row = document.createElement('tr');
+            row.innerHTML = `
+                <td>${key.name || '<em>Unnamed</em>'}</td>
+                <td>${new Date(key.created_at).toLocaleDateString()}</td>
+                <td>${key.expires_at ? new Date(key.expires_at).toLocaleDateString() : 'Never'}</td>
+                <td>${key.last_used ? new Date(key.last_used).toLocaleDateString() : 'Never'}</td>
+                <td>
+                    <span class="badge ${key.is_active ? 'bg-success' : 'bg-danger'}">
+                        ${key.is_active ? 'Active' : 'Revoked'}
+                    </span>
+                </td>
+                <td>
+                    ${key.is_active ? 
+                        `<button class="btn btn-sm btn-danger revoke-key" data-key-id="${key.id}">
+                            Revoke
+                        </button>` : 
+                        '<em>Revoked</em>'
+                    }
+                </td>
+            `;
+            keysList.appendChild(row);
+        });
+
+        // Show the table
+        keysTableContainer.classList.remove('d-none');
+
+        // Set up revoke buttons
+        setupRevokeButtons();
+    }
+
+    function setupRevokeButtons() {
+        // Add click listeners for revoke buttons
+        const revokeButtons = document.querySelectorAll('.revoke-key');
+        revokeButtons.forEach(button => {
+            button.addEventListener('click', function() {
+                const keyId = this.getAttribute('data-key-id');
+                if (keyId) {
+                    showRevokeConfirmation(keyId);
+                }
+            });
+        });
+    }
+
+    function showRevokeConfirmation(keyId) {
+        const revokeModal = new bootstrap.Modal(document.getElementById('revokeKeyModal'));
+        const confirmRevokeBtn = document.getElementById('confirm-revoke-key');
+
+        if (confirmRevokeBtn) {
+            confirmRevokeBtn.onclick = function() {
+                revokeApiKey(keyId);
+            };
+        }
+
+        revokeModal.show();
+    }
+
+    async function createApiKey() {
+        try {
+            const keyName = document.getElementById('key-name')?.value.trim();
+            const expirationDays = document.getElementById('key-expiration')?.value;
+
+            const accessToken = localStorage.getItem('access_token');
+            if (!accessToken) {
+                throw new Error('No access token available');
+            }
+
+            const response = await fetch('/user/api-keys', {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${accessToken}`,
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    name: keyName || undefined,
+                    expires_in_days: parseInt(expirationDays || '365')
+                })
+            });
+
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.message || `HTTP error ${response.status}`);
+            }
+
+            const data = await response.json();
+            console.log('API key created:', data);
+
+            // Hide create modal
+            createKeyModal.hide();
+
+            // Show the new key in the display modal
+            const newKeyDisplay = document.getElementById('new-key-display');
+            if (newKeyDisplay) {
+                newKeyDisplay.value = data.api_key.key;
+
+                // Show new key modal
+                const newKeyModal = new bootstrap.Modal(document.getElementById('newKeyModal'));
+                newKeyModal.show();
+            }
+
+            // Reload the API keys
+            loadApiKeys();
+
+            // Show success message
+            showAlert('API key created successfully', 'success');
+
+        } catch (error) {
+            console.error('Error creating API key:', error);
+            showAlert(`Failed to create API key: ${error.message}`, 'danger');
+        }
+    }
+
+    async function revokeApiKey(keyId) {
+        try {
+            const accessToken = localStorage.getItem('access_token');
+            if (!accessToken) {
+                throw new Error('No access token available');
+            }
+
+            const response = await fetch(`/user/api-keys/${keyId}`, {
+                method: 'DELETE',
+                headers: {
+                    'Authorization': `Bearer ${accessToken}`
+                }
+            });
+
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.message || `HTTP error ${response.status}`);
+            }
+
+            // Hide the revoke modal
+            const revokeModal = bootstrap.Modal.getInstance(document.getElementById('revokeKeyModal'));
+            if (revokeModal) {
+                revokeModal.hide();
+            }
+
+            // Reload the API keys
+            loadApiKeys();
+
+            // Show success message
+            showAlert('API key revoked successfully', 'success');
+
+        } catch (error) {
+            console.error('Error revoking API key:', error);
+            showAlert(`Failed to revoke API key: ${error.message}`, 'danger');
+        }
+    }
+
+    // Initialize the page
+    initUI();
+});
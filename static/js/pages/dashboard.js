@@ -0,0 +1,145 @@
+// Load the fixed dashboard authentication code
+document.addEventListener('DOMContentLoaded', function() {
+    // Alert function for showing messages
+    window.showAlert = function(message, type) {
+        const alertsContainer = document.getElementById('alerts-container');
+        const alert = document.createElement('div');
+        alert.className = `alert alert-${type} alert-dismissible fade show`;
+        alert.role = 'alert';
+        alert.innerHTML = `
+            ${message}
+            <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+        `;
+        alertsContainer.appendChild(alert);
+
+        // Auto-dismiss after 5 seconds
+        setTimeout(() => {
+            alert.classList.remove('show');
+            setTimeout(() => {
+                alertsContainer.removeChild(alert);
+            }, 150);
+        }, 5000);
+    };
+
+    // SINGLE Authentication Check Function
+    function checkAuthentication() {
+        const accessToken = localStorage.getItem('access_token');
+
+        // If no token exists, redirect to login
+        if (!accessToken) {
+            console.error('No access token found');
+            window.location.href = '/login';
+            return false;
+        }
+
+        // Validate token format and expiration
+        try {
+            const tokenParts = accessToken.split('.');
+            if (tokenParts.length !== 3) {
+                throw new Error('Invalid token format');
+            }
+
+            const payload = JSON.parse(atob(tokenParts[1]));
+            const currentTime = Math.floor(Date.now() / 1000);
+
+            if (payload.exp && payload.exp < currentTime) {
+                console.error('Token expired');
+                refreshAccessToken();
+                return false;
+            }
+
+            // Token is valid
+            return true;
+        } catch (error) {
+            console.error('Token validation error:', error);
+            window.location.href = '/login';
+            return false;
+        }
+    }
+
+    // Token refresh function
+    function refreshAccessToken() {
+        const refreshToken = localStorage.getItem('refresh_token');
+
+        if (!refreshToken) {
+            window.location.href = '/login';
+            return;
+        }
+
+        fetch('/auth/refresh', {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${refreshToken}`,
+                'Content-Type': 'application/json'
+            }
+        })
+        .then(response => {
+            if (response.ok) {
+                return response.json();
+            }
+            throw new Error('Token refresh failed');
+        })
+        .then(data => {
+            localStorage.setItem('access_token', data.access_token);
+            window.location.reload();
+        })
+        .catch(() => {
+            localStorage.removeItem('access_token');
+            localStorage.removeItem('refresh_token');
+            localStorage.removeItem('user');
+            window.location.href = '/login';
+        });
+    }
+
+    // Update navigation function
+    function updateNavigation() {
+        // Make sure navigation elements exist before trying to modify them
+        const loginLink = document.getElementById('login-link');
+        const registerLink = document.getElementById('register-link');
+        const dashboardLink = document.getElementById('dashboard-link');
+        const logoutLink = document.getElementById('logout-link');
+
+        if (loginLink) loginLink.classList.add('d-none');
+        if (registerLink) registerLink.classList.add('d-none');
+        if (dashboardLink) dashboardLink.classList.remove('d-none');
+        if (logoutLink) logoutLink.classList.remove('d-none');
+    }
+
+    // Helper function for API requests
+    window.sendRequestWithToken = function(url, options = {}) {
+        const accessToken = localStorage.getItem('access_token');
+
+        const headers = {
+            ...options.headers,
+            'Authorization': `Bearer ${accessToken}`,
+            'Content-Type': 'application/json'
+        };
+
+        return fetch(url, {
+            ...options,
+            headers: headers
+        });
+    };
+
+    // Logout function
+    window.logout = function() {
+        localStorage.removeItem('access_token');
+        localStorage.removeItem('refresh_token');
+        localStorage.removeItem('user');
+        window.location.href = '/login';
+    };
+
+    // Initialize dashboard
+    function initDashboard() {
+        if (checkAuthentication()) {
+            updateNavigation();
+            showAlert('Welcome to your dashboard!', 'success');
+
+            // Add any dashboard initialization code here
+            // For example, fetching user data or statistics
+        }
+    }
+
+    // Run initialization
+    initDashboard();
+});
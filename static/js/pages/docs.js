@@ -0,0 +1,35 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Update navigation based on login status
+    if (localStorage.getItem('access_token')) {
+        document.getElementById('login-link').classList.add('d-none');
+        document.getElementById('register-link').classList.add('d-none');
+        document.getElementById('dashboard-link').classList.remove('d-none');
+        document.getElementById('logout-link').classList.remove('d-none');
+    }
+
+    // Smooth scrolling for documentation links
+    document.querySelectorAll('.list-group-item').forEach(link => {
+        link.addEventListener('click', function(e) {
+            const targetId = this.getAttribute('href');
+            const targetElement = document.querySelector(targetId);
+
+            if (targetElement) {
+                e.preventDefault();
+                window.scrollTo({
+                    top: targetElement.offsetTop - 20,
+                    behavior: 'smooth'
+                });
+            }
+        });
+    });
+});
+
+function logout() {
+    // Clear local storage
+    localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+    localStorage.removeItem('user');
+
+    // Redirect to login page
+    window.location.href = '/login';
+}
@@ -0,0 +1,98 @@
+// Add this to your login.html page's JavaScript section
+document.addEventListener('DOMContentLoaded', function () {
+    // Check if user is already logged in
+    if (localStorage.getItem('access_token')) {
+        window.location.href = '/dashboard';
+    }
+
+    // Create alerts container if it doesn't exist
+    if (!document.getElementById('alerts-container')) {
+        const alertsContainer = document.createElement('div');
+        alertsContainer.id = 'alerts-container';
+        document.body.prepend(alertsContainer);
+    }
+
+    const loginForm = document.getElementById('login-form');
+
+    loginForm.addEventListener('submit', async function (e) {
+        e.preventDefault();
+
+        const username = document.getElementById('username').value;
+        const password = document.getElementById('password').value;
+
+        try {
+            console.log('Attempting login...');
+            const response = await fetch('/auth/login', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    username: username,
+                    password: password
+                })
+            });
+
+            console.log('Login response status:', response.status);
+
+            // Check for non-JSON responses
+            const contentType = response.headers.get('content-type');
+            if (!contentType || !contentType.includes('application/json')) {
+                const textResponse = await response.text();
+                console.error('Non-JSON response:', textResponse);
+                showAlert('Server error. Please try again later.', 'danger');
+                return;
+            }
+
+            const data = await response.json();
+            console.log('Login response data:', data);
+
+            if (response.ok) {
+                // Store tokens in localStorage
+                localStorage.setItem('access_token', data.access_token);
+                localStorage.setItem('refresh_token', data.refresh_token);
+                localStorage.setItem('user', JSON.stringify(data.user));
+
+                // Show success message
+                showAlert('Login successful!', 'success');
+
+                // Redirect to dashboard
+                setTimeout(() => {
+                    window.location.href = '/dashboard';
+                }, 1000);
+            } else {
+                showAlert(data.error || data.message || 'Login failed!', 'danger');
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            showAlert('An error occurred. Please try again.', 'danger');
+        }
+    });
+});
+
+function showAlert(message, type) {
+    const alertsContainer = document.getElementById('alerts-container');
+    if (!alertsContainer) {
+        console.error('Alerts container not found');
+        return;
+    }
+
+    const alert = document.createElement('div');
+    alert.className = `alert alert-${type} alert-dismissible fade show`;
+    alert.role = 'alert';
+    alert.innerHTML = `
+    ${message}
+    <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+`;
+    alertsContainer.appendChild(alert);
+
+    // Auto-dismiss after 5 seconds
+    setTimeout(() => {
+        alert.classList.remove('show');
+        setTimeout(() => {
+            if (alertsContainer.contains(alert)) {
+                alertsContainer.removeChild(alert);
+            }
+        }, 150);
+    }, 5000);
+}
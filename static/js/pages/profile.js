@@ -0,0 +1,71 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Check if user is logged in
+    if (!localStorage.getItem('access_token')) {
+        window.location.href = '/login';
+    }
+
+    // Update navigation
+    updateNavigation();
+
+    // Load profile data
+    loadProfile();
+});
+
+function updateNavigation() {
+    // Hide login/register links
+    document.getElementById('login-link').classList.add('d-none');
+    document.getElementById('register-link').classList.add('d-none');
+
+    // Show dashboard and logout links
+    document.getElementById('dashboard-link').classList.remove('d-none');
+    document.getElementById('logout-link').classList.remove('d-none');
+}
+
+async function loadProfile() {
+    // Show loading state
+    document.getElementById('profile-loading').classList.remove('d-none');
+    document.getElementById('profile-content').classList.add('d-none');
+    document.getElementById('profile-error').classList.add('d-none');
+
+    try {
+        const response = await fetch('/user/profile', {
+            method: 'GET',
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('access_token')}`
+            }
+        });
+
+        if (!response.ok) {
+            throw new Error('Failed to load profile');
+        }
+
+        const data = await response.json();
+
+        // Hide loading
+        document.getElementById('profile-loading').classList.add('d-none');
+
+        // Populate profile fields
+        document.getElementById('username').value = data.user.username;
+        document.getElementById('email').value = data.user.email;
+        document.getElementById('created-at').value = new Date(data.user.created_at).toLocaleString();
+        document.getElementById('last-login').value = data.user.last_login ? 
+            new Date(data.user.last_login).toLocaleString() : 'Never';
+
+        // Show profile content
+        document.getElementById('profile-content').classList.remove('d-none');
+    } catch (error) {
+        console.error('Error loading profile:', error);
+        document.getElementById('profile-loading').classList.add('d-none');
+        document.getElementById('profile-error').classList.remove('d-none');
+    }
+}
+
+function logout() {
+    // Clear local storage
+    localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+    localStorage.removeItem('user');
+
+    // Redirect to login page
+    window.location.href = '/login';
+}
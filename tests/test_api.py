@@ -1,10 +1,18 @@
 import pytest
 import json
+import time
+import requests
+from datetime import timedelta
 from unittest.mock import patch, MagicMock
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 from app import create_app
 from app.database import db
-from app.models import User, APIKey
-from app.services.countries_service import CountriesService
+from app.models import User, APIKey, APIUsage
+from app.services.countries_service import CountriesService, countries_service
+from app.utils.security import require_api_key
 
 # Sample country data for mocking API responses
 SAMPLE_COUNTRIES = [
@@ -214,6 +222,484 @@ def test_get_countries_by_region(client, mock_requests):
     assert 'items' in data
     assert 'pagination' in data
 
+def test_usage_records_latency_phases(client, mock_requests):
+    """Test that usage records hold end-to-end latency broken into phases"""
+    app = client.application
+    
+    response = client.get(
+        '/api/v1/countries',
+        headers={'X-API-Key': app.config['TEST_API_KEY']}
+    )
+    assert response.status_code == 200
+    
+    # Latency is recorded at teardown, which the test client defers
+    # until the next request
+    client.get('/health')
+    
+    with app.app_context():
+        usage = APIUsage.query.order_by(APIUsage.id.desc()).first()
+        assert usage.status_code == 200
+        assert usage.response_time_ms is not None
+        assert usage.auth_ms is not None
+        assert usage.upstream_ms is not None
+        assert usage.filter_ms is not None
+        assert usage.serialize_ms is not None
+        # Phases are part of the end-to-end time
+        assert usage.auth_ms + usage.upstream_ms <= usage.response_time_ms + 1
+
+def test_repeated_request_served_from_cache(client, mock_requests):
+    """Test that identical upstream lookups are cached"""
+    app = client.application
+    
+    for _ in range(2):
+        response = client.get(
+            '/api/v1/countries/region/americas',
+            headers={'X-API-Key': app.config['TEST_API_KEY']}
+        )
+        assert response.status_code == 200
+    
+    # Only the first request reached the upstream API
+    mock_requests.get.assert_called_once()
+    
+    client.get('/health')
+    with app.app_context():
+        usage = APIUsage.query.order_by(APIUsage.id.desc()).first()
+        assert usage.cache_ms is not None
+        assert usage.upstream_ms is None
+
+def test_multiple_currencies_fanned_out_and_merged(client, mock_requests):
+    """Test that comma-separated codes are fetched separately and de-duplicated"""
+    app = client.application
+    
+    def upstream(url, params=None, headers=None):
+        # USD matches the US only; CAD matches both sample countries
+        response = MagicMock()
+        response.json.return_value = SAMPLE_COUNTRIES[:1] if url.endswith('/USD') else SAMPLE_COUNTRIES
+        return response
+    
+    mock_requests.get.side_effect = upstream
+    
+    response = client.get(
+        '/api/v1/countries/currency/USD,CAD,USD',
+        headers={'X-API-Key': app.config['TEST_API_KEY']}
+    )
+    
+    assert response.status_code == 200
+    names = [country['name'] for country in response.get_json()['items']]
+    assert names == ['United States', 'Canada']
+    # Duplicate codes are requested once
+    assert mock_requests.get.call_count == 2
+
+def test_multi_code_deadline(client, mock_requests):
+    """Test that a fan-out missing its deadline answers 504"""
+    app = client.application
+    
+    def slow_upstream(url, params=None, headers=None):
+        if url.endswith('/fra'):
+            time.sleep(0.5)
+        response = MagicMock()
+        response.json.return_value = SAMPLE_COUNTRIES
+        return response
+    
+    mock_requests.get.side_effect = slow_upstream
+    countries_service.fanout_deadline = 0.1
+    
+    response = client.get(
+        '/api/v1/countries/language/eng,fra',
+        headers={'X-API-Key': app.config['TEST_API_KEY']}
+    )
+    
+    assert response.status_code == 504
+    assert response.get_json()['message'] == 'Upstream deadline exceeded for: fra'
+
+def test_multi_code_upstream_failure(client, mock_requests):
+    """Test that codes upstream failed to answer are named, not reported as not found"""
+    app = client.application
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    
+    def failing_upstream(url, params=None, headers=None):
+        response = MagicMock()
+        response.json.return_value = SAMPLE_COUNTRIES
+        if url.endswith('/spa'):
+            response.raise_for_status.side_effect = requests.HTTPError(
+                '503 Server Error', response=MagicMock(status_code=503)
+            )
+        return response
+    
+    mock_requests.HTTPError = requests.HTTPError
+    mock_requests.RequestException = requests.RequestException
+    mock_requests.get.side_effect = failing_upstream
+    
+    response = client.get('/api/v1/countries/language/eng,spa', headers=headers)
+    assert response.status_code == 502
+    assert response.get_json()['message'] == 'Upstream request failed for: spa'
+    
+    # A single code that failed is not a 404 either
+    response = client.get('/api/v1/countries/language/spa', headers=headers)
+    assert response.status_code == 502
+
+def test_upstream_store_survives_restart_and_outage(client, mock_requests, tmp_path):
+    """Test serving persisted upstream responses, revalidated with ETags"""
+    app = client.application
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    app.config['UPSTREAM_STORE_PATH'] = str(tmp_path / 'upstream.db')
+    countries_service.init_app(app)
+    
+    upstream = mock_requests.get.return_value
+    upstream.status_code = 200
+    upstream.content = json.dumps(SAMPLE_COUNTRIES).encode('utf-8')
+    upstream.headers = {'ETag': '"v1"'}
+    
+    assert client.get('/api/v1/countries', headers=headers).status_code == 200
+    
+    # A restarted process answers from disk without asking upstream
+    countries_service.init_app(app)
+    response = client.get('/api/v1/countries', headers=headers)
+    assert response.get_json()['pagination']['total_items'] == 2
+    mock_requests.get.assert_called_once()
+    
+    # Once stale, the response is revalidated with its ETag
+    countries_service.init_app(app)
+    countries_service.response_store.touch('all', ttl=0)
+    upstream.status_code = 304
+    assert client.get('/api/v1/countries', headers=headers).status_code == 200
+    assert mock_requests.get.call_args[1]['headers'] == {'If-None-Match': '"v1"'}
+    
+    # and served as it is while upstream is unreachable
+    countries_service.init_app(app)
+    countries_service.response_store.touch('all', ttl=0)
+    mock_requests.RequestException = requests.RequestException
+    mock_requests.HTTPError = requests.HTTPError
+    mock_requests.get.side_effect = requests.ConnectionError('offline')
+    response = client.get('/api/v1/countries', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['items'][0]['name'] == 'United States'
+    
+    app.config['UPSTREAM_STORE_PATH'] = None
+    countries_service.init_app(app)
+
+def test_refresh_revalidates_fresh_stored_response(client, mock_requests, tmp_path):
+    """Test that a background refresh asks upstream even while the stored /all is fresh"""
+    app = client.application
+    app.config['UPSTREAM_STORE_PATH'] = str(tmp_path / 'upstream.db')
+    
+    upstream = mock_requests.get.return_value
+    upstream.status_code = 200
+    upstream.content = json.dumps(SAMPLE_COUNTRIES).encode('utf-8')
+    upstream.headers = {'ETag': '"v1"'}
+    
+    try:
+        with app.app_context():
+            countries_service.init_app(app)
+            assert countries_service.refresh()['version'] == 1
+            
+            # Unchanged: the stored body is reused
+            upstream.status_code = 304
+            assert countries_service.refresh() == {'version': 1, 'added': 0, 'updated': 0, 'removed': 0}
+            assert mock_requests.get.call_args[1]['headers'] == {'If-None-Match': '"v1"'}
+            
+            # Changed within the store's TTL: the change is still seen
+            canada = dict(SAMPLE_COUNTRIES[1], capital=['Toronto'])
+            upstream.status_code = 200
+            upstream.json.return_value = [SAMPLE_COUNTRIES[0], canada]
+            upstream.headers = {'ETag': '"v2"'}
+            assert countries_service.refresh() == {'version': 2, 'added': 0, 'updated': 1, 'removed': 0}
+            assert mock_requests.get.call_count == 3
+    finally:
+        app.config['UPSTREAM_STORE_PATH'] = None
+        countries_service.init_app(app)
+
+def test_not_found_lookups_cached(client, mock_requests):
+    """Test that repeated lookups upstream answered with 404 stay local"""
+    app = client.application
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    
+    not_found = MagicMock(status_code=404)
+    mock_requests.HTTPError = requests.HTTPError
+    mock_requests.get.return_value.raise_for_status.side_effect = requests.HTTPError(
+        '404 Client Error: Not Found', response=not_found
+    )
+    
+    for path in ('/api/v1/countries/xyz', '/api/v1/countries/XYZ', '/api/v1/countries/currency/ZZZ'):
+        assert client.get(path, headers=headers).status_code == 404
+    assert client.get('/api/v1/countries/currency/zzz', headers=headers).status_code == 404
+    
+    # Only the first lookup of each normalized key reached upstream
+    assert mock_requests.get.call_count == 2
+    assert countries_service.negative_cache.stats()['hits'] == 2
+    
+    # Upstream failures other than 404 are not remembered
+    not_found.status_code = 503
+    client.get('/api/v1/countries/atlantis', headers=headers)
+    client.get('/api/v1/countries/atlantis', headers=headers)
+    assert mock_requests.get.call_count == 4
+
+def test_country_change_feed(client, mock_requests):
+    """Test that refreshing /all diffs countries and feeds the changes"""
+    app = client.application
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    countries = [dict(country, region='Americas') for country in SAMPLE_COUNTRIES]
+    mock_requests.get.return_value.json.return_value = countries
+    
+    response = client.get('/api/v1/countries/changes', headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['version'] == 1
+    assert [change['change'] for change in data['changes']] == ['added', 'added']
+    assert data['changes'][1]['data']['name'] == 'Canada'
+    
+    # Cache lookups for a region that will and one that will not change
+    mock_requests.get.return_value.json.return_value = countries[1:]
+    client.get('/api/v1/countries/region/americas', headers=headers)
+    mock_requests.get.return_value.json.return_value = []
+    client.get('/api/v1/countries/region/europe', headers=headers)
+    
+    # Canada's capital moves, the United States is unchanged
+    canada = dict(countries[1], capital=['Toronto'])
+    mock_requests.get.return_value.json.return_value = [countries[0], canada]
+    with app.app_context():
+        assert countries_service.refresh() == {'version': 2, 'added': 0, 'updated': 1, 'removed': 0}
+        keys = countries_service.cache.keys()
+        assert 'region/americas' not in keys
+        assert 'region/europe' in keys
+    
+    response = client.get('/api/v1/countries/changes?since=1', headers=headers)
+    changes = response.get_json()['changes']
+    assert [(change['country'], change['change']) for change in changes] == [('Canada', 'updated')]
+    assert changes[0]['data']['capital'] == 'Toronto'
+    
+    # Nothing changed: same version, no new changes
+    with app.app_context():
+        assert countries_service.refresh()['version'] == 2
+    assert client.get('/api/v1/countries/changes?since=2', headers=headers).get_json()['changes'] == []
+    
+    response = client.get('/api/v1/countries/changes?since=5', headers=headers)
+    assert response.status_code == 410
+
+def test_change_feed_versions_shared_between_workers(client, mock_requests):
+    """Test that workers fetching the same data at different times agree on versions"""
+    app = client.application
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    canada = dict(SAMPLE_COUNTRIES[1], capital=['Toronto'])
+    
+    # Worker A sees the dataset, then Canada's change
+    worker_a = CountriesService()
+    worker_b = CountriesService()
+    with app.app_context():
+        worker_a.init_app(app)
+        worker_b.init_app(app)
+        
+        mock_requests.get.return_value.json.return_value = SAMPLE_COUNTRIES
+        assert worker_a.refresh()['version'] == 1
+        mock_requests.get.return_value.json.return_value = [SAMPLE_COUNTRIES[0], canada]
+        assert worker_a.refresh()['version'] == 2
+        
+        # Worker B only fetches now: the same change is not recorded again
+        assert worker_b.refresh() == {'version': 2, 'added': 2, 'updated': 0, 'removed': 0}
+        assert worker_b.get_changes(1)['changes'] == worker_a.get_changes(1)['changes']
+    
+    changes = client.get('/api/v1/countries/changes?since=1', headers=headers).get_json()
+    assert changes['version'] == 2
+    assert [(change['country'], change['change']) for change in changes['changes']] == [('Canada', 'updated')]
+
+def test_stale_instance_does_not_move_version(client, mock_requests, tmp_path):
+    """Test that a dataset served from a stale stored response is not recorded"""
+    app = client.application
+    canada = dict(SAMPLE_COUNTRIES[1], capital=['Toronto'])
+    upstream = mock_requests.get.return_value
+    upstream.status_code = 200
+    upstream.headers = {'ETag': '"v1"'}
+    mock_requests.RequestException = requests.RequestException
+    mock_requests.HTTPError = requests.HTTPError
+    
+    stale = CountriesService()
+    current = CountriesService()
+    with app.app_context():
+        app.config['UPSTREAM_STORE_PATH'] = str(tmp_path / 'stale.db')
+        stale.init_app(app)
+        app.config['UPSTREAM_STORE_PATH'] = None
+        current.init_app(app)
+        
+        upstream.content = json.dumps(SAMPLE_COUNTRIES).encode('utf-8')
+        assert stale.refresh()['version'] == 1
+        upstream.content = json.dumps([SAMPLE_COUNTRIES[0], canada]).encode('utf-8')
+        upstream.json.return_value = [SAMPLE_COUNTRIES[0], canada]
+        assert current.refresh()['version'] == 2
+        
+        # Upstream is down: the stale instance serves its stored dataset
+        # but does not record it as the newest one
+        mock_requests.get.side_effect = requests.ConnectionError('offline')
+        assert stale.refresh() == {'version': None, 'added': 0, 'updated': 0, 'removed': 0}
+        stale.cache.clear()
+        assert len(stale.get_all_countries()) == 2
+        
+        changes = current.get_changes(1)
+        assert changes['version'] == 2
+        assert [change['change'] for change in changes['changes']] == ['updated']
+
+def test_change_log_trimmed(client, mock_requests):
+    """Test that versions older than the retained log answer 410"""
+    app = client.application
+    service = CountriesService()
+    
+    with app.app_context():
+        service.init_app(app)
+        service.change_log.max_changes = 1
+        
+        mock_requests.get.return_value.json.return_value = SAMPLE_COUNTRIES
+        service.refresh()
+        mock_requests.get.return_value.json.return_value = SAMPLE_COUNTRIES[:1]
+        assert service.refresh()['version'] == 2
+        
+        assert service.get_changes(0)['status'] == 410
+        assert service.get_changes(1)['changes'][0]['change'] == 'removed'
+
+def test_one_commit_per_request(client, mock_requests):
+    """Test that each request's writes are committed together, once"""
+    app = client.application
+    commits = []
+    
+    def count_commit(session):
+        commits.append(session)
+    
+    event.listen(Session, 'after_commit', count_commit)
+    try:
+        # API key usage and last_used update
+        response = client.get(
+            '/api/v1/countries',
+            headers={'X-API-Key': app.config['TEST_API_KEY']}
+        )
+        assert response.status_code == 200
+        client.get('/health')
+        assert len(commits) == 1
+        
+        # Read-only requests do not commit
+        del commits[:]
+        client.get('/health')
+        client.get('/api/v1/countries', headers={'X-API-Key': 'invalid_key'})
+        client.get('/health')
+        assert len(commits) == 0
+        
+        # Login updates last_login
+        response = client.post(
+            '/auth/login',
+            json={'username': 'testuser', 'password': 'Test123!'}
+        )
+        assert response.status_code == 200
+        client.get('/health')
+        assert len(commits) == 1
+    finally:
+        event.remove(Session, 'after_commit', count_commit)
+    
+    with app.app_context():
+        usage = APIUsage.query.order_by(APIUsage.id.desc()).first()
+        assert usage.status_code == 200
+        assert usage.response_time_ms is not None
+        api_key = APIKey.query.filter_by(key_value=app.config['TEST_API_KEY']).first()
+        assert api_key.last_used is not None
+
+def test_last_used_written_once_per_granularity(client, mock_requests):
+    """Test that a key's last_used is only rewritten once it is old enough"""
+    app = client.application
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    
+    def last_used():
+        client.get('/health')
+        with app.app_context():
+            return APIKey.query.filter_by(key_value=app.config['TEST_API_KEY']).first().last_used
+    
+    client.get('/api/v1/countries', headers=headers)
+    first = last_used()
+    assert first is not None
+    
+    # Within the granularity the stored value is kept
+    client.get('/api/v1/countries', headers=headers)
+    assert last_used() == first
+    
+    # Once it is older, the next call moves it
+    with app.app_context():
+        api_key = APIKey.query.filter_by(key_value=app.config['TEST_API_KEY']).first()
+        api_key.last_used = first - timedelta(seconds=app.config['LAST_USED_GRANULARITY'] + 1)
+        db.session.commit()
+    client.get('/api/v1/countries', headers=headers)
+    assert last_used() > first
+
+def test_failed_requests_roll_back(client, mock_requests):
+    """Test that 5xx responses roll back and a failed commit is reported as a 500"""
+    app = client.application
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    with app.app_context():
+        user_id = User.query.filter_by(username='testuser').first().id
+        usages = APIUsage.query.count()
+    
+    @app.route('/test/write-then-fail')
+    def write_then_fail():
+        db.session.add(APIKey(user_id=user_id, name='Half written'))
+        return {'error': 'Failed to create API key'}, 500
+    
+    assert client.get('/test/write-then-fail').status_code == 500
+    
+    with patch('sqlalchemy.orm.Session.commit', side_effect=SQLAlchemyError('disk I/O error')):
+        response = client.get('/api/v1/countries', headers=headers)
+    assert response.status_code == 500
+    
+    with app.app_context():
+        assert APIKey.query.filter_by(name='Half written').count() == 0
+        assert APIUsage.query.count() == usages
+
+def test_failed_request_keeps_usage_record(client, mock_requests):
+    """Test that a request failing with a 5xx still stores its usage record"""
+    app = client.application
+    with app.app_context():
+        countries_service.init_app(app)
+    mock_requests.RequestException = requests.RequestException
+    mock_requests.get.side_effect = requests.ConnectionError('offline')
+    
+    @app.route('/test/usage-then-fail')
+    @require_api_key
+    def usage_then_fail():
+        db.session.add(APIKey(user_id=request.api_key.user_id, name='Half written'))
+        return {'error': 'Upstream request failed'}, 502
+    
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    response = client.get('/api/v1/countries', headers=headers)
+    assert response.status_code == 500
+    assert client.get('/test/usage-then-fail', headers=headers).status_code == 502
+    
+    with app.app_context():
+        usages = APIUsage.query.order_by(APIUsage.id).all()[-2:]
+        assert [(u.endpoint, u.status_code) for u in usages] == [
+            ('/api/v1/countries', 500),
+            ('/test/usage-then-fail', 502)
+        ]
+        assert all(u.response_time_ms is not None for u in usages)
+        assert APIKey.query.filter_by(name='Half written').count() == 0
+
+def test_country_stats(client, mock_requests):
+    """Test grouped and filtered aggregate statistics"""
+    app = client.application
+    countries = [dict(country, region='Americas', population=population)
+                 for country, population in zip(SAMPLE_COUNTRIES, (331000000, 38000000))]
+    mock_requests.get.return_value.json.return_value = countries
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    
+    response = client.get('/api/v1/stats?group_by=currency&language=eng', headers=headers)
+    
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total'] == {'count': 2, 'population': 369000000, 'area': 0.0}
+    assert [group['value'] for group in data['groups']] == ['CAD', 'USD']
+    
+    # The columnar view is cached with the /all dataset
+    response = client.get('/api/v1/stats?currency=CAD&group_by=region', headers=headers)
+    assert response.get_json()['groups'] == [
+        {'value': 'Americas', 'count': 1, 'population': 38000000, 'area': 0.0}
+    ]
+    mock_requests.get.assert_called_once()
+    
+    response = client.get('/api/v1/stats?group_by=capital', headers=headers)
+    assert response.status_code == 400
+
 def test_invalid_api_key(client):
     """Test request with invalid API key"""
     response = client.get(
@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+import httpx
+from app import create_app
+from app.asgi import AsyncCountriesApp
+from app.database import db
+from app.models import User, APIKey, APIUsage
+from tests.test_api import SAMPLE_COUNTRIES
+
+@pytest.fixture
+def asgi_app():
+    """Create the ASGI app with a test user, API key and mocked upstream"""
+    app = create_app('test')
+    
+    with app.app_context():
+        db.create_all()
+        
+        user = User(username='testuser', email='test@example.com', password='Test123!')
+        db.session.add(user)
+        db.session.commit()
+        
+        api_key = APIKey(user_id=user.id, name='Test Key')
+        db.session.add(api_key)
+        db.session.commit()
+        
+        app.config['TEST_API_KEY'] = api_key.key_value
+    
+    asgi_app = AsyncCountriesApp(app)
+    asgi_app.upstream_calls = []
+    
+    async def upstream(request):
+        asgi_app.upstream_calls.append(request.url.path)
+        # Slow enough for concurrent requests to overlap
+        await asyncio.sleep(0.05)
+        if request.url.path.endswith('/name/atlantis'):
+            return httpx.Response(404, json={'status': 404, 'message': 'Not Found'})
+        if request.url.path.endswith('/region/antarctic'):
+            return httpx.Response(503, json={'status': 503, 'message': 'Unavailable'})
+        return httpx.Response(200, json=SAMPLE_COUNTRIES)
+    
+    asgi_app.client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    
+    yield asgi_app
+    
+    with app.app_context():
+        db.drop_all()
+
+def request_all(asgi_app, *paths, api_key=True):
+    """Issue GET requests to the ASGI app concurrently and return the responses"""
+    headers = {'X-API-Key': asgi_app.flask_app.config['TEST_API_KEY']} if api_key else {}
+    
+    async def run():
+        async with httpx.AsyncClient(app=asgi_app, base_url='http://testserver') as client:
+            return await asyncio.gather(*(client.get(path, headers=headers) for path in paths))
+    
+    return asyncio.run(run())
+
+def test_async_country_routes(asgi_app):
+    """Test that country routes are served natively with the Flask response shapes"""
+    all_countries, by_name, by_region, missing = request_all(
+        asgi_app,
+        '/api/v1/countries?per_page=1',
+        '/api/v1/countries/canada',
+        '/api/v1/countries/region/americas',
+        '/api/v1/countries/atlantis'
+    )
+    
+    assert all_countries.status_code == 200
+    data = all_countries.json()
+    assert len(data['items']) == 1
+    assert data['pagination']['total_items'] == 2
+    assert 'X-RateLimit-Remaining' in all_countries.headers
+    
+    assert by_name.status_code == 200
+    assert by_name.json()[0]['currencies']
+    assert by_region.json()['items'][0]['name'] == 'United States'
+    
+    assert missing.status_code == 404
+    assert missing.json()['message'] == 'Country not found: atlantis'
+
+def test_async_not_found_cached(asgi_app):
+    """Test that a lookup upstream answered with 404 is not repeated"""
+    first, = request_all(asgi_app, '/api/v1/countries/atlantis')
+    second, = request_all(asgi_app, '/api/v1/countries/Atlantis')
+    
+    assert first.status_code == second.status_code == 404
+    assert len(asgi_app.upstream_calls) == 1
+
+def test_concurrent_misses_share_upstream_request(asgi_app):
+    """Test that concurrent requests for one endpoint make a single upstream call"""
+    responses = request_all(asgi_app, *['/api/v1/countries/region/europe'] * 5)
+    
+    assert [response.status_code for response in responses] == [200] * 5
+    assert len(asgi_app.upstream_calls) == 1
+    assert asgi_app.upstream_calls[0].endswith('/region/europe')
+    
+    # Later requests are served from the shared countries cache
+    request_all(asgi_app, '/api/v1/countries/region/europe')
+    assert len(asgi_app.upstream_calls) == 1
+
+def test_async_multiple_regions(asgi_app):
+    """Test that comma-separated regions are fetched concurrently and merged"""
+    response, = request_all(asgi_app, '/api/v1/countries/region/americas,europe')
+    
+    assert response.status_code == 200
+    assert response.json()['pagination']['total_items'] == 2
+    assert sorted(call.rsplit('/', 1)[1] for call in asgi_app.upstream_calls) == ['americas', 'europe']
+
+def test_async_region_upstream_failure(asgi_app):
+    """Test that a region upstream failed to answer is named, not reported as not found"""
+    response, = request_all(asgi_app, '/api/v1/countries/region/americas,antarctic')
+    
+    assert response.status_code == 502
+    assert response.json()['message'] == 'Upstream request failed for: antarctic'
+
+def test_async_usage_records(asgi_app):
+    """Test that usage records are completed with status and latency"""
+    request_all(asgi_app, '/api/v1/countries/atlantis')
+    
+    with asgi_app.flask_app.app_context():
+        usage = APIUsage.query.order_by(APIUsage.id.desc()).first()
+        assert usage.endpoint == '/api/v1/countries/atlantis'
+        assert usage.status_code == 404
+        assert usage.response_time_ms is not None
+        assert usage.upstream_ms is not None
+
+def test_missing_key_and_fallback_to_flask(asgi_app):
+    """Test API key enforcement and that other paths are served by Flask"""
+    unauthorized, health = request_all(asgi_app, '/api/v1/countries', '/health', api_key=False)
+    
+    assert unauthorized.status_code == 401
+    assert health.status_code == 200
+    assert health.json()['status'] == 'ok'
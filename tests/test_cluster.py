@@ -0,0 +1,215 @@
+import os
+import sys
+import math
+import time
+import subprocess
+import pytest
+import requests
+from app import create_app
+from app.config import config
+from app.database import db
+from app.models import User, APIKey
+from app.cluster import per_process_state, missing_drivers
+from app.utils.cache import SQLiteCache, TTLCache, cache_from_uri
+from benchmarks.dataset import generate_dataset
+from benchmarks.fake_upstream import FakeRestCountries
+from benchmarks.concurrency import free_port, wait_until_ready
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nodes started for the multi-node tests
+NODES = 2
+
+def test_per_process_settings_reported():
+    """Test that per-process and relative-path backends are reported"""
+    problems = per_process_state({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///countries_api.db',
+        'RATELIMIT_STORAGE_URL': 'memory://',
+        'API_KEY_RATELIMIT_STORAGE_URI': 'sqlite:///limits.db',
+        'SHARED_CACHE_URL': 'memory://'
+    })
+    assert len(problems) == 4
+    
+    assert per_process_state({
+        'SQLALCHEMY_DATABASE_URI': 'postgresql://db/countries',
+        'RATELIMIT_STORAGE_URL': 'redis://cache:6379/0',
+        'API_KEY_RATELIMIT_STORAGE_URI': 'sqlite:////var/lib/countries/limits.db',
+        'SHARED_CACHE_URL': 'redis://cache:6379/2'
+    }) == []
+    
+    # Disabled features need no backend
+    assert per_process_state({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:////var/lib/countries/api.db',
+        'RATELIMIT_ENABLED': False,
+        'API_KEY_RATELIMIT_ENABLED': False,
+        'USER_CACHE_TTL': 0
+    }) == []
+
+def test_missing_drivers_reported(monkeypatch):
+    """Test that backends whose driver is not installed are reported by package"""
+    monkeypatch.setattr('app.cluster.find_spec', lambda module: None)
+    problems = missing_drivers({
+        'SQLALCHEMY_DATABASE_URI': 'postgresql://db/countries',
+        'RATELIMIT_STORAGE_URL': 'redis://cache:6379/0',
+        'API_KEY_RATELIMIT_STORAGE_URI': 'sqlite:////var/lib/countries/limits.db',
+        'SHARED_CACHE_URL': 'redis://cache:6379/2'
+    })
+    
+    assert len(problems) == 3
+    assert 'psycopg2-binary' in problems[0]
+    assert 'SHARED_CACHE_URL (redis://) needs the redis package' in problems[2]
+
+def test_create_app_requires_shared_state(monkeypatch):
+    """Test that an instance requiring shared state refuses to start without it"""
+    monkeypatch.setattr(config, 'REQUIRE_SHARED_STATE', True)
+    
+    with pytest.raises(RuntimeError, match='SHARED_CACHE_URL'):
+        create_app('cluster')
+
+def test_sqlite_cache_shared_between_instances(tmp_path):
+    """Test that caches on one SQLite file see each other's writes and deletes"""
+    uri = f"sqlite:///{tmp_path / 'cache.db'}"
+    first = cache_from_uri(uri, ttl=30, name='users')
+    second = cache_from_uri(uri, ttl=30, name='users')
+    other = cache_from_uri(uri, ttl=30, name='other')
+    assert isinstance(first, SQLiteCache)
+    assert isinstance(cache_from_uri('memory://'), TTLCache)
+    
+    first.set('1', {'user': {'id': 1}, 'api_keys': []})
+    assert second.get('1') == {'user': {'id': 1}, 'api_keys': []}
+    assert other.get('1') is None
+    
+    second.delete('1')
+    assert first.get('1') is None
+    
+    first.set('2', {'user': {'id': 2}}, ttl=-1)
+    assert second.get('2', 'expired') == 'expired'
+
+@pytest.fixture(scope='module')
+def cluster(tmp_path_factory):
+    """
+    Two gunicorn instances with two workers each, sharing only the
+    configured backends, plus an in-process app as a third instance
+    """
+    workdir = tmp_path_factory.mktemp('cluster')
+    upstream = FakeRestCountries(generate_dataset(20))
+    upstream_url = upstream.start()
+    
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{workdir / 'api.db'}",
+        'SHARED_CACHE_URL': f"sqlite:///{workdir / 'cache.db'}",
+        'API_KEY_RATELIMIT_STORAGE_URI': f"sqlite:///{workdir / 'limits.db'}",
+        'RATELIMIT_ENABLED': False,
+        'COUNTRIES_API_URL': upstream_url,
+        'HASH_POOL_SIZE': 0,
+        'BCRYPT_LOG_ROUNDS': 4
+    }
+    
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for name, value in settings.items():
+            monkeypatch.setattr(config, name, value)
+        app = create_app('cluster')
+        
+        with app.app_context():
+            db.create_all()
+            
+            user = User(username='clusteruser', email='cluster@example.com', password='Cluster123!')
+            db.session.add(user)
+            db.session.commit()
+            
+            keys = {}
+            for name in ('limits', 'revoke'):
+                api_key = APIKey(user_id=user.id, name=name)
+                db.session.add(api_key)
+                db.session.commit()
+                keys[name] = api_key.key_value
+        
+        env = dict(
+            os.environ,
+            FLASK_ENV='cluster',
+            DATABASE_URL=settings['SQLALCHEMY_DATABASE_URI'],
+            SHARED_CACHE_URL=settings['SHARED_CACHE_URL'],
+            API_KEY_RATELIMIT_STORAGE_URI=settings['API_KEY_RATELIMIT_STORAGE_URI'],
+            RATELIMIT_ENABLED='false',
+            COUNTRIES_API_URL=upstream_url,
+            HASH_POOL_SIZE='0',
+            BCRYPT_LOG_ROUNDS='4',
+            GUNICORN_WORKERS='2',
+            LOG_LEVEL='WARNING'
+        )
+        nodes = []
+        try:
+            for _ in range(NODES):
+                port = free_port()
+                process = subprocess.Popen(
+                    [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning'],
+                    cwd=ROOT, env=dict(env, GUNICORN_BIND=f'127.0.0.1:{port}'),
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                nodes.append((f'http://127.0.0.1:{port}', process))
+                wait_until_ready(nodes[-1][0], process)
+            
+            yield app, [url for url, _ in nodes], keys
+        finally:
+            for _, process in nodes:
+                process.terminate()
+            for _, process in nodes:
+                process.wait(timeout=30)
+            upstream.stop()
+
+def test_rate_limits_shared_across_nodes(cluster):
+    """Test that an API key's rate limit is enforced across all instances together"""
+    app, urls, keys = cluster
+    statuses = []
+    
+    start = time.monotonic()
+    for i in range(80):
+        response = requests.get(
+            urls[i % len(urls)] + '/api/v1/countries',
+            headers={'X-API-Key': keys['limits']}, timeout=30
+        )
+        statuses.append(response.status_code)
+    elapsed = time.monotonic() - start
+    
+    # The free plan allows a burst of 60 plus one request per second in
+    # total; per-worker counters would let all 80 through
+    assert 429 in statuses
+    assert statuses.count(200) <= 60 + math.ceil(elapsed)
+
+def test_revocation_seen_by_every_node(cluster):
+    """Test that a key revoked through one instance is rejected by all of them"""
+    app, urls, keys = cluster
+    headers = {'X-API-Key': keys['revoke']}
+    for url in urls:
+        assert requests.get(url + '/api/v1/countries', headers=headers, timeout=30).status_code == 200
+    
+    with app.app_context():
+        APIKey.query.filter_by(key_value=keys['revoke']).first().revoke()
+        db.session.commit()
+    
+    for url in urls * 2:
+        assert requests.get(url + '/api/v1/countries', headers=headers, timeout=30).status_code == 401
+
+def test_identity_cache_invalidated_on_every_node(cluster):
+    """Test that a change made on one instance clears the cached identity for all"""
+    app, urls, keys = cluster
+    login = requests.post(
+        urls[0] + '/auth/login',
+        json={'username': 'clusteruser', 'password': 'Cluster123!'}, timeout=30
+    )
+    assert login.status_code == 200
+    headers = {'Authorization': f"Bearer {login.json()['access_token']}"}
+    
+    def key_names():
+        # Several requests per node, so every worker answers from its cache
+        return [
+            sorted(key['name'] for key in requests.get(url + '/user/api-keys', headers=headers, timeout=30).json()['api_keys'])
+            for url in urls * 4
+        ]
+    
+    before = key_names()
+    assert all(names == before[0] for names in before)
+    
+    response = requests.post(urls[-1] + '/user/api-keys', headers=headers, json={'name': 'added'}, timeout=30)
+    assert response.status_code == 201
+    assert all(names == sorted(before[0] + ['added']) for names in key_names())
@@ -0,0 +1,53 @@
+from app.utils.columnar import CountryColumns
+
+COUNTRIES = [
+    {'name': {'common': 'France'}, 'region': 'Europe', 'subregion': 'Western Europe',
+     'population': 67000000, 'area': 551695.0,
+     'currencies': {'EUR': {}}, 'languages': {'fra': 'French'}},
+    {'name': {'common': 'Belgium'}, 'region': 'Europe', 'subregion': 'Western Europe',
+     'population': 11500000, 'area': 30528.0,
+     'currencies': {'EUR': {}}, 'languages': {'fra': 'French', 'nld': 'Dutch', 'deu': 'German'}},
+    {'name': {'common': 'Canada'}, 'region': 'Americas', 'subregion': 'North America',
+     'population': 38000000, 'area': 9984670.0,
+     'currencies': {'CAD': {}}, 'languages': {'eng': 'English', 'fra': 'French'}},
+    {'name': {'common': 'Antarctica'}, 'region': 'Antarctic', 'population': 1000, 'area': 14000000.0}
+]
+
+def test_group_by_region():
+    """Test counts and sums per region"""
+    columns = CountryColumns(COUNTRIES)
+    groups = columns.group_by('region')
+    
+    assert [group['value'] for group in groups] == ['Europe', 'Americas', 'Antarctic']
+    assert groups[0] == {'value': 'Europe', 'count': 2, 'population': 78500000, 'area': 582223.0}
+    assert columns.total(columns.all_rows)['count'] == 4
+
+def test_filters_combine():
+    """Test that filters intersect and multiple values of one filter unite"""
+    columns = CountryColumns(COUNTRIES)
+    
+    french_outside_europe = columns.mask({'language': ['fra'], 'region': ['Americas', 'Antarctic']})
+    assert columns.total(french_outside_europe) == {'count': 1, 'population': 38000000, 'area': 9984670.0}
+    
+    assert columns.total(columns.mask({'currency': ['XXX']}))['count'] == 0
+
+def test_filters_ignore_case():
+    """Test that filter values match whatever their case"""
+    columns = CountryColumns(COUNTRIES)
+    
+    assert columns.total(columns.mask({'region': 'europe', 'currency': ['eur']}))['count'] == 2
+    assert columns.total(columns.mask({'language': 'FRA', 'subregion': 'north AMERICA'}))['count'] == 1
+    # Groups keep upstream's spelling
+    assert [group['value'] for group in columns.group_by('currency', columns.mask({'region': 'EUROPE'}))] == ['EUR']
+
+def test_languages_shared_within_region():
+    """Test grouping a multi-valued dimension inside a filter"""
+    columns = CountryColumns(COUNTRIES)
+    groups = columns.group_by('language', columns.mask({'region': 'Europe'}))
+    
+    assert groups[0]['value'] == 'fra'
+    assert groups[0]['count'] == 2
+    assert {group['value'] for group in groups} == {'fra', 'nld', 'deu'}
+    # Subregion is missing for Antarctica, which is not grouped
+    assert 'North America' in [group['value'] for group in columns.group_by('subregion')]
+    assert '' not in [group['value'] for group in columns.group_by('subregion')]
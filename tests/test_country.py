@@ -0,0 +1,41 @@
+import json
+import pytest
+from app.models.country import Country
+from app.utils.helpers import dumps
+
+CANADA = {
+    'name': {'common': 'Canada', 'official': 'Canada'},
+    'capital': ['Ottawa'],
+    'languages': {'eng': 'English', 'fra': 'French'},
+    'currencies': {'CAD': {'name': 'Canadian dollar', 'symbol': '$'}},
+    'flags': {'png': 'https://flagcdn.com/w320/ca.png'}
+}
+
+def test_records_are_shared():
+    """Test that equal countries share one immutable record"""
+    first = Country.from_api(CANADA)
+    second = Country.from_api(json.loads(json.dumps(CANADA)))
+    
+    assert first is second
+    assert first.currencies == (('CAD', 'Canadian dollar', '$'),)
+    with pytest.raises(AttributeError):
+        first.name = 'Kanada'
+    with pytest.raises(AttributeError):
+        first.population = 38000000
+
+def test_record_serialization():
+    """Test that the cached encoding matches the dict format"""
+    record = Country.from_api(CANADA)
+    
+    assert json.loads(record.json) == {
+        'name': 'Canada',
+        'official_name': 'Canada',
+        'capital': 'Ottawa',
+        'languages': {'eng': 'English', 'fra': 'French'},
+        'currencies': {'CAD': {'name': 'Canadian dollar', 'symbol': '$'}},
+        'flag': 'https://flagcdn.com/w320/ca.png'
+    }
+    assert record.json is record.json
+    
+    payload = {'items': [record], 'pagination': {'page': 1}}
+    assert json.loads(dumps(payload)) == {'items': [record.to_dict()], 'pagination': {'page': 1}}
@@ -0,0 +1,90 @@
+import pytest
+from flask import Flask
+from app import create_app
+from app.database import db
+from app.models import User, APIKey
+from app.utils.hashing import PasswordHasher, HashingPoolBusy, hash_rounds, password_hasher
+from tests.test_api import mock_requests
+
+def make_hasher(**config):
+    app = Flask(__name__)
+    app.config.update({'BCRYPT_LOG_ROUNDS': 4, 'HASH_POOL_SIZE': 1, 'HASH_POOL_MAX_QUEUE': 0}, **config)
+    return PasswordHasher(app)
+
+@pytest.fixture
+def client():
+    """Create a Flask app with a cheap bcrypt work factor"""
+    app = create_app('test')
+    app.config['BCRYPT_LOG_ROUNDS'] = 4
+    password_hasher.init_app(app)
+    
+    with app.app_context():
+        db.create_all()
+        user = User(username='testuser', email='test@example.com', password='Test123!')
+        db.session.add(user)
+        db.session.commit()
+    
+    with app.test_client() as client:
+        yield client
+    
+    with app.app_context():
+        db.drop_all()
+
+def test_hash_and_verify_in_pool():
+    """Test hashing and verification on worker processes"""
+    hasher = make_hasher()
+    try:
+        hashed = hasher.hash('Test123!')
+        assert hash_rounds(hashed) == 4
+        assert hasher.verify(hashed, 'Test123!')
+        assert not hasher.verify(hashed, 'wrong')
+    finally:
+        hasher.shutdown()
+
+def test_saturated_pool_rejects():
+    """Test that calls beyond the pool capacity are refused"""
+    hasher = make_hasher()
+    hasher._in_flight = hasher.capacity
+    with pytest.raises(HashingPoolBusy):
+        hasher.hash('Test123!')
+
+def test_login_rehashes_outdated_hash(client):
+    """Test that logging in upgrades a hash made with another work factor"""
+    app = client.application
+    app.config['BCRYPT_LOG_ROUNDS'] = 5
+    password_hasher.init_app(app)
+    
+    response = client.post('/auth/login', json={'username': 'testuser', 'password': 'Test123!'})
+    assert response.status_code == 200
+    
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        assert hash_rounds(user.password_hash) == 5
+        assert user.check_password('Test123!')
+
+def test_login_when_pool_saturated(client):
+    """Test that logins get 503 while the hashing pool is saturated"""
+    password_hasher._in_flight = password_hasher.capacity
+    try:
+        response = client.post('/auth/login', json={'username': 'testuser', 'password': 'Test123!'})
+    finally:
+        password_hasher._in_flight = 0
+    assert response.status_code == 503
+
+def test_api_keys_checked_outside_pool(client, mock_requests):
+    """Test that API requests are served while the hashing pool is saturated"""
+    app = client.application
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        api_key = APIKey(user_id=user.id, name='Test Key')
+        db.session.add(api_key)
+        db.session.commit()
+        headers = {'X-API-Key': api_key.key_value}
+    
+    password_hasher._in_flight = password_hasher.capacity
+    try:
+        for _ in range(2):
+            response = client.get('/api/v1/countries', headers=headers)
+            assert response.status_code == 200
+    finally:
+        password_hasher._in_flight = 0
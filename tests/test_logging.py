@@ -0,0 +1,92 @@
+import json
+import logging
+import pytest
+from app import create_app
+from app.config import config
+from app.utils.logs import log_pipeline, SamplingFilter, JSONFormatter, parse_levels
+
+class CountingArg:
+    """Log argument that records when it is formatted"""
+    
+    def __init__(self):
+        self.formatted = 0
+    
+    def __str__(self):
+        self.formatted += 1
+        return 'arg'
+
+@pytest.fixture
+def app():
+    """Create a Flask app with the queued log pipeline"""
+    app = create_app('test')
+    yield app
+    log_pipeline.stop()
+
+def record(msg='Accessing %s', level=logging.INFO, args=('page',)):
+    return logging.LogRecord('app', level, __file__, 1, msg, args, None)
+
+def test_records_formatted_off_request_thread(app):
+    """Test that logging only enqueues records; the listener formats them"""
+    written = []
+    handler = logging.Handler()
+    handler.emit = lambda rec: written.append(handler.format(rec))
+    log_pipeline.listener.handlers = (handler,)
+    
+    arg = CountingArg()
+    app.logger.info('Retrieving %s', arg)
+    app.logger.debug('Hidden %s', arg)
+    log_pipeline.stop()
+    
+    assert written == ['Retrieving arg']
+    assert arg.formatted == 1
+
+def test_levels_for_other_loggers_are_written(monkeypatch):
+    """Test that a logger outside the app logger named in LOG_LEVELS is written out"""
+    monkeypatch.setattr(config, 'LOG_LEVELS', 'app.tests=WARNING,tests.other=INFO')
+    app = create_app('test')
+    
+    written = []
+    handler = logging.Handler()
+    handler.emit = lambda rec: written.append(handler.format(rec))
+    log_pipeline.listener.handlers = (handler,)
+    
+    logging.getLogger('tests.other').info('Other %s', 'logger')
+    logging.getLogger('app.tests').info('Hidden')
+    log_pipeline.stop()
+    
+    assert written == ['Other logger']
+    assert log_pipeline.handler in logging.getLogger('tests.other').handlers
+    assert log_pipeline.handler not in logging.getLogger('app.tests').handlers
+    
+    monkeypatch.setattr(config, 'LOG_LEVELS', '')
+    create_app('test')
+    log_pipeline.stop()
+    assert not logging.getLogger('tests.other').handlers
+
+def test_sampling_filter():
+    """Test that repeated messages are capped per interval and warnings pass"""
+    sampler = SamplingFilter(burst=3, interval=60)
+    
+    passed = [sampler.filter(record(args=(n,))) for n in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+    assert sampler.filter(record('Other %s')) is True
+    assert sampler.filter(record(level=logging.WARNING)) is True
+    
+    sampler.interval = 0
+    summary = record()
+    assert sampler.filter(summary) is True
+    assert summary.suppressed == 7
+
+def test_json_format_and_levels():
+    """Test JSON lines with extra fields, and per-logger level parsing"""
+    rec = record()
+    rec.suppressed = 2
+    entry = json.loads(JSONFormatter().format(rec))
+    
+    assert entry['message'] == 'Accessing page'
+    assert entry['level'] == 'INFO'
+    assert entry['suppressed'] == 2
+    assert parse_levels('app.routes=warning, sqlalchemy.engine=INFO') == {
+        'app.routes': 'WARNING',
+        'sqlalchemy.engine': 'INFO'
+    }
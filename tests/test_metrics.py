@@ -0,0 +1,197 @@
+import os
+import sys
+import glob
+import json
+import time
+import atexit
+import subprocess
+import pytest
+from unittest.mock import patch, MagicMock
+from app import create_app
+from app.config import config
+from app.database import db
+from app.models import User, APIKey
+from app.utils.metrics import registry, MetricsRegistry, cache_entries
+from app.utils.cache import TTLCache
+
+@pytest.fixture
+def client():
+    """Create and configure a Flask app for testing"""
+    app = create_app('test')
+    registry.reset()
+    
+    with app.app_context():
+        db.create_all()
+        
+        user = User(
+            username='metricsuser',
+            email='metrics@example.com',
+            password='Test123!'
+        )
+        db.session.add(user)
+        db.session.commit()
+        
+        api_key = APIKey(user_id=user.id, name='Metrics Key')
+        db.session.add(api_key)
+        db.session.commit()
+        
+        app.config['TEST_API_KEY'] = api_key.key_value
+    
+    with app.test_client() as client:
+        yield client
+    
+    with app.app_context():
+        db.drop_all()
+
+def test_metrics_exposition(client):
+    """Test that requests, upstream calls and caches are instrumented"""
+    app = client.application
+    
+    with patch('app.services.countries_service.requests') as mock_req:
+        mock_response = MagicMock()
+        mock_response.json.return_value = []
+        mock_req.get.return_value = mock_response
+        
+        for _ in range(2):
+            client.get(
+                '/api/v1/countries',
+                headers={'X-API-Key': app.config['TEST_API_KEY']}
+            )
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_requests_total counter' in text
+    assert 'http_requests_total{blueprint="api",endpoint="api.get_all_countries",method="GET",status="200"} 2' in text
+    assert 'http_request_duration_seconds_count{blueprint="api",endpoint="api.get_all_countries"} 2' in text
+    assert 'upstream_requests_total{outcome="success"} 1' in text
+    assert 'cache_requests_total{cache="countries",result="hit"} 1' in text
+    assert 'cache_requests_total{cache="countries",result="miss"} 1' in text
+    # The second request's key check is served from the verification cache
+    assert 'bcrypt_verifications_total{kind="api_key",result="match"} 1' in text
+    assert 'cache_requests_total{cache="api_keys",result="hit"} 1' in text
+    assert 'db_commits_total{outcome="success"}' in text
+
+def test_metrics_aggregate_across_processes(tmp_path):
+    """Test that snapshots written by other live processes are merged"""
+    local = MetricsRegistry()
+    local.multiproc_dir = str(tmp_path)
+    requests_total = local.counter('requests_total', 'Requests', ('status',))
+    latency = local.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    
+    requests_total.inc(status='200')
+    latency.observe(0.05)
+    
+    # Snapshot from another live process (the test runner's parent)
+    other_pid = os.getppid()
+    with open(tmp_path / f'metrics_{other_pid}.json', 'w') as f:
+        json.dump({'pid': other_pid, 'metrics': {
+            'requests_total': [[['200'], 3]],
+            'latency_seconds': [[[], [0, 1, 0, 0.5, 1]]]
+        }}, f)
+    
+    text = local.render()
+    assert 'requests_total{status="200"} 4' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'latency_seconds_count 2' in text
+
+def test_dead_process_snapshots_folded(tmp_path):
+    """Test that exited processes' totals are kept in one file and their snapshots removed"""
+    local = MetricsRegistry()
+    local.multiproc_dir = str(tmp_path)
+    requests_total = local.counter('requests_total', 'Requests')
+    entries = local.gauge('entries', 'Entries')
+    requests_total.inc()
+    entries.set(5)
+    
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    snapshots = {
+        # An exited worker, and an earlier process that had this process' pid
+        f'metrics_{exited.pid}_1.json': {'pid': exited.pid, 'started': 1.0},
+        f'metrics_{os.getpid()}_2.json': {'pid': os.getpid(), 'started': 2.0}
+    }
+    for name, data in snapshots.items():
+        with open(tmp_path / name, 'w') as f:
+            json.dump(dict(data, metrics={'requests_total': [[[], 2]], 'entries': [[[], 7]]}), f)
+    
+    for _ in range(2):
+        text = local.render()
+        assert 'requests_total 5' in text
+        assert 'entries 5' in text
+    
+    assert sorted(os.listdir(tmp_path)) == ['aggregate.json', 'metrics.lock']
+    
+    local.flush()
+    assert 'requests_total 5' in local.render()
+
+def test_cache_entries_follow_removals():
+    """Test that the cache size gauge drops when entries are removed or expire"""
+    cache = TTLCache(maxsize=2, ttl=30, name='gauge-test')
+    
+    def entries():
+        return cache_entries.snapshot().get(('gauge-test',))
+    
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=0)
+    assert entries() == 2
+    assert cache.get('b') is None
+    assert entries() == 1
+    cache.delete('a')
+    assert entries() == 0
+    cache.set('c', 3)
+    cache.clear()
+    assert entries() == 0
+
+def test_exit_flush_registered_once(tmp_path, monkeypatch):
+    """Test that creating several apps registers one exit flush"""
+    monkeypatch.setattr(config, 'METRICS_MULTIPROC_DIR', str(tmp_path))
+    registered = []
+    monkeypatch.setattr(atexit, 'register', lambda func: registered.append(func))
+    monkeypatch.setattr(atexit, 'unregister', lambda func: registered.remove(func) if func in registered else None)
+    
+    create_app('test')
+    create_app('test')
+    registry.stop_flusher()
+    registry.multiproc_dir = None
+    
+    assert registered.count(registry.flush) == 1
+
+def test_metrics_endpoint_restricted(client, monkeypatch):
+    """Test that /metrics is only served to loopback or to holders of the token"""
+    app = client.application
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code == 403
+    assert client.get('/metrics', headers={'X-Forwarded-For': '203.0.113.7'}).status_code == 403
+    
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scrape-token')
+    assert client.get('/metrics').status_code == 403
+    
+    response = client.get(
+        '/metrics', headers={'Authorization': 'Bearer scrape-token'},
+        environ_base={'REMOTE_ADDR': '203.0.113.7'}
+    )
+    assert response.status_code == 200
+
+def test_idle_process_flushes_periodically(tmp_path):
+    """Test that snapshots are written without waiting for a request"""
+    local = MetricsRegistry()
+    local.multiproc_dir = str(tmp_path)
+    local.flush_interval = 0.05
+    requests_total = local.counter('requests_total', 'Requests')
+    
+    local.start_flusher()
+    try:
+        requests_total.inc()
+        deadline = time.monotonic() + 5
+        while not glob.glob(str(tmp_path / f'metrics_{os.getpid()}_*.json')) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        with open(glob.glob(str(tmp_path / f'metrics_{os.getpid()}_*.json'))[0]) as f:
+            assert json.load(f)['metrics']['requests_total'] == [[[], 1]]
+    finally:
+        local.stop_flusher()
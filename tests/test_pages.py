@@ -0,0 +1,69 @@
+import re
+import gzip
+import pytest
+from app import create_app
+from app.utils.assets import minify_css, minify_js
+from app.utils.pages import page_cache
+
+@pytest.fixture
+def client():
+    """Create a Flask app for page tests"""
+    app = create_app('test')
+    
+    with app.test_client() as client:
+        yield client
+
+def test_static_page_rendered_once(client, monkeypatch):
+    """Test that repeated page views are served from the rendered-page cache"""
+    renders = []
+    render = page_cache._render
+    monkeypatch.setattr(page_cache, '_render', lambda name: renders.append(name) or render(name))
+    
+    first = client.get('/docs')
+    second = client.get('/docs')
+    
+    assert first.status_code == 200
+    assert first.mimetype == 'text/html'
+    assert second.data == first.data
+    assert renders == ['docs.html']
+    assert first.headers['Cache-Control'] == 'public, max-age=300'
+    assert 'Accept-Encoding' in first.headers['Vary']
+
+def test_page_conditional_and_compressed(client):
+    """Test ETag revalidation and the pre-compressed variant"""
+    plain = client.get('/login')
+    etag = plain.headers['ETag']
+    
+    not_modified = client.get('/login', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+    assert not_modified.headers['ETag'] == etag
+    
+    compressed = client.get('/login', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['ETag'] != etag
+    assert gzip.decompress(compressed.data) == plain.data
+    
+    # The plain ETag does not validate the gzip representation
+    assert client.get('/login', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 200
+
+def test_assets_fingerprinted_and_immutable(client):
+    """Test that pages reference hashed asset URLs served with immutable caching"""
+    html = client.get('/dashboard').data.decode('utf-8')
+    
+    assert '/static/' not in html
+    urls = re.findall(r'(?:src|href)="(/assets/[^"]+)"', html)
+    assert len(urls) == 3
+    
+    for url in urls:
+        assert re.search(r'\.[0-9a-f]{12}\.(js|css)$', url)
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    
+    assert client.get('/assets/js/site.000000000000.js').status_code == 404
+
+def test_asset_minification():
+    """Test that minification keeps code but drops comments and whitespace"""
+    assert minify_css('/* nav */\na  > b {\n    color: red;\n}\n') == 'a>b{color:red}'
+    assert minify_js('// setup\nfunction f() {\n    return 1\n}\n\n') == 'function f() {\nreturn 1\n}'
@@ -0,0 +1,111 @@
+import os
+import gc
+import runpy
+import pytest
+from app import create_app
+from app.config import config
+from app.database import db
+from app.models import User, APIKey
+from app.prefork import preload, post_fork, shutdown
+from app.utils.logs import log_pipeline
+from app.services.countries_service import countries_service
+from tests.test_api import mock_requests
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Create an app on a database file that forked workers can reopen"""
+    monkeypatch.setattr(config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'prefork.db'}")
+    # Forked test workers exit with os._exit, which would orphan hashing pool processes
+    monkeypatch.setattr(config, 'HASH_POOL_SIZE', 0)
+    app = create_app('test')
+    
+    with app.app_context():
+        db.create_all()
+        
+        user = User(username='testuser', email='test@example.com', password='Test123!')
+        db.session.add(user)
+        db.session.commit()
+        
+        api_key = APIKey(user_id=user.id, name='Test Key')
+        db.session.add(api_key)
+        db.session.commit()
+        
+        app.config['TEST_API_KEY'] = api_key.key_value
+    
+    yield app
+    
+    gc.unfreeze()
+    with app.app_context():
+        db.drop_all()
+
+def test_preload_warms_shared_state(app, mock_requests):
+    """Test that preloading caches the dataset and templates and freezes the heap"""
+    preload(app)
+    
+    assert countries_service.cache.get('all') is not None
+    assert mock_requests.get.call_count == 1
+    assert app.jinja_env.cache
+    assert gc.get_freeze_count() > 0
+
+def test_forked_worker_serves_preloaded_app(app, mock_requests):
+    """Test that a worker forked after preload serves requests without refetching"""
+    preload(app)
+    calls = mock_requests.get.call_count
+    
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            post_fork(app)
+            client = app.test_client()
+            health = client.get('/health')
+            countries = client.get('/api/v1/countries', headers={'X-API-Key': app.config['TEST_API_KEY']})
+            if health.status_code == 200 and countries.status_code == 200 and mock_requests.get.call_count == calls:
+                status = 0
+        finally:
+            os._exit(status)
+    
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status)
+    assert os.WEXITSTATUS(status) == 0
+
+def test_preloading_master_starts_no_refresher(tmp_path, monkeypatch, mock_requests):
+    """Test that the refresher is started in forked workers, not the preloading master"""
+    monkeypatch.setattr(config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'prefork.db'}")
+    monkeypatch.setattr(config, 'COUNTRIES_REFRESH_INTERVAL', 3600)
+    app = create_app('test', preload=True)
+    
+    assert countries_service._refresher is None
+    
+    post_fork(app)
+    assert countries_service._refresher is not None
+    
+    shutdown(app)
+    assert countries_service._refresher is None
+
+def test_worker_defaults_follow_cores(monkeypatch):
+    """Test that the gunicorn config sizes each worker model from the cores"""
+    monkeypatch.delenv('GUNICORN_WORKERS', raising=False)
+    monkeypatch.delenv('GUNICORN_WORKER_CLASS', raising=False)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    settings = runpy.run_path(os.path.join(root, 'gunicorn.conf.py'))
+    
+    assert settings['default_workers']('sync', 4) == 9
+    assert settings['default_workers']('gthread', 4) == 5
+    assert settings['default_workers']('gevent', 4) == 4
+    assert settings['workers'] == settings['default_workers']('sync', os.cpu_count())
+    assert 0 < settings['max_requests_jitter'] < settings['max_requests']
+    
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'eventlet')
+    with pytest.raises(ValueError):
+        runpy.run_path(os.path.join(root, 'gunicorn.conf.py'))
+
+def test_shutdown_releases_worker_resources(app, mock_requests):
+    """Test that a worker's pools and log thread are stopped on graceful shutdown"""
+    client = app.test_client()
+    assert client.get('/api/v1/countries', headers={'X-API-Key': app.config['TEST_API_KEY']}).status_code == 200
+    
+    shutdown(app)
+    
+    assert countries_service.executor is None
+    assert log_pipeline.listener is None
@@ -0,0 +1,128 @@
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.database import db
+from app.models import User
+from app.utils.profiling import profiler, Profiler
+
+@pytest.fixture
+def client():
+    """Create and configure a Flask app with profiling enabled"""
+    app = create_app('test')
+    app.config['PROFILING_ENABLED'] = True
+    profiler.init_app(app)
+    profiler.clear()
+    
+    with app.app_context():
+        db.create_all()
+        
+        admin = User(
+            username='adminuser',
+            email='admin@example.com',
+            password='Password123!',
+            is_admin=True
+        )
+        user = User(
+            username='plainuser',
+            email='plain@example.com',
+            password='Password123!'
+        )
+        db.session.add_all([admin, user])
+        db.session.commit()
+        
+        app.config['ADMIN_TOKEN'] = create_access_token(identity=str(admin.id))
+        app.config['USER_TOKEN'] = create_access_token(identity=str(user.id))
+    
+    with app.test_client() as client:
+        yield client
+    
+    profiler.set_sample_rate(0)
+    with app.app_context():
+        db.drop_all()
+
+def test_profiling_requires_admin(client):
+    """Test that non-admin users cannot use the profiler"""
+    app = client.application
+    
+    response = client.get(
+        '/admin/profiling',
+        headers={'Authorization': f"Bearer {app.config['USER_TOKEN']}"}
+    )
+    assert response.status_code == 403
+    
+    response = client.get('/admin/profiling')
+    assert response.status_code == 401
+
+def test_cprofile_collapsed_stacks(client):
+    """Test that sampled requests produce collapsed stacks per endpoint"""
+    app = client.application
+    headers = {'Authorization': f"Bearer {app.config['ADMIN_TOKEN']}"}
+    
+    response = client.put('/admin/profiling/cprofile', headers=headers, json={'sample_rate': 1})
+    assert response.status_code == 200
+    assert response.get_json()['sample_rate'] == 1.0
+    
+    for _ in range(3):
+        client.get('/health')
+    
+    response = client.get('/admin/profiling/stacks?mode=cprofile&endpoint=health_check', headers=headers)
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).strip().splitlines()
+    assert lines
+    # Each line is "frame;frame;... <count>"
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert any('jsonify' in line or 'health_check' in line for line in lines)
+    
+    response = client.get('/admin/profiling/stacks?mode=bogus', headers=headers)
+    assert response.status_code == 400
+
+def test_profiling_disabled(client):
+    """Test that profiling controls are refused when disabled"""
+    app = client.application
+    headers = {'Authorization': f"Bearer {app.config['ADMIN_TOKEN']}"}
+    
+    profiler.enabled = False
+    try:
+        response = client.post('/admin/profiling/sampler', headers=headers, json={'seconds': 1})
+        assert response.status_code == 409
+    finally:
+        profiler.enabled = True
+
+def test_profiling_shared_between_workers(client, tmp_path):
+    """Test that controls reach, and reports include, another worker sharing PROFILING_DIR"""
+    app = client.application
+    headers = {'Authorization': f"Bearer {app.config['ADMIN_TOKEN']}"}
+    profiler.shared_dir = str(tmp_path)
+    
+    # Another worker process, with its own profiler
+    worker = Flask('worker')
+    worker.config.update(PROFILING_ENABLED=True, PROFILING_DIR=str(tmp_path))
+    worker.add_url_rule('/work', 'work', lambda: 'done')
+    other = Profiler(worker)
+    
+    try:
+        assert client.put('/admin/profiling/cprofile', headers=headers, json={'sample_rate': 1}).status_code == 200
+        worker.test_client().get('/work')
+        assert other.sample_rate == 1.0
+        
+        response = client.get('/admin/profiling/stacks?mode=cprofile&endpoint=work', headers=headers)
+        assert response.get_data(as_text=True).strip()
+        assert client.get('/admin/profiling', headers=headers).get_json()['endpoints']['cprofile']['work'] > 0
+        
+        # The sampler runs in every worker that serves requests meanwhile
+        assert client.post('/admin/profiling/sampler', headers=headers, json={'seconds': 1}).status_code == 202
+        worker.test_client().get('/work')
+        assert other._sampler is not None
+        assert client.post('/admin/profiling/sampler', headers=headers, json={'seconds': 1}).status_code == 409
+        
+        # Clearing and turning profiling off apply to the other worker too
+        client.delete('/admin/profiling/stacks', headers=headers)
+        client.put('/admin/profiling/cprofile', headers=headers, json={'sample_rate': 0})
+        worker.test_client().get('/work')
+        assert other.sample_rate == 0.0
+        assert not other.stacks['cprofile']
+        assert client.get('/admin/profiling/stacks?mode=cprofile&endpoint=work', headers=headers).get_data() == b''
+    finally:
+        profiler.shared_dir = None
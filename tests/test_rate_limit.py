@@ -0,0 +1,172 @@
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from app import create_app
+from app.database import db
+from app.models import User, APIKey
+from app.services.rate_limit_service import (
+    MemoryStore, SQLiteStore, RedisStore, RateLimitService, parse_rate, rate_limit_service
+)
+
+PLANS = {
+    'free': {'rate': '2/second', 'daily': 3, 'monthly': 100},
+    'pro': {'rate': '100/second', 'daily': None, 'monthly': None}
+}
+
+def make_service(store):
+    service = RateLimitService()
+    service.plans = PLANS
+    service.store = store
+    return service
+
+@pytest.fixture
+def client():
+    """Create a Flask app whose free plan allows one request per minute"""
+    app = create_app('test')
+    app.config['RATE_LIMIT_PLANS'] = {'free': {'rate': '1/minute', 'daily': 10, 'monthly': 10}}
+    app.config['API_KEY_RATELIMIT_STORAGE_URI'] = 'memory://'
+    rate_limit_service.init_app(app)
+    
+    with app.app_context():
+        db.create_all()
+        
+        user = User(username='testuser', email='test@example.com', password='Test123!')
+        db.session.add(user)
+        db.session.commit()
+        
+        api_key = APIKey(user_id=user.id, name='Test Key')
+        db.session.add(api_key)
+        db.session.commit()
+        
+        app.config['TEST_API_KEY'] = api_key.key_value
+    
+    with app.test_client() as client:
+        yield client
+    
+    with app.app_context():
+        db.drop_all()
+
+def redis_client():
+    """
+    Client for the Redis store's script: the server at REDIS_URL (a
+    scratch database, it is flushed), or fakeredis with Lua in process
+    """
+    url = os.environ.get('REDIS_URL')
+    if url:
+        redis = pytest.importorskip('redis')
+        client = redis.Redis.from_url(url)
+        try:
+            client.flushdb()
+        except redis.ConnectionError:
+            pytest.skip(f'No Redis server at {url}')
+        return client
+    
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    return fakeredis.FakeRedis()
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def service(request, tmp_path):
+    if request.param == 'memory':
+        return make_service(MemoryStore())
+    if request.param == 'redis':
+        return make_service(RedisStore(None, client=redis_client()))
+    return make_service(SQLiteStore(str(tmp_path / 'limits.db')))
+
+def test_parse_rate():
+    """Test parsing rate strings"""
+    assert parse_rate('60/minute') == (60, 60)
+    assert parse_rate('10/seconds') == (10, 1)
+    with pytest.raises(ValueError):
+        parse_rate('ten per minute')
+
+def test_burst_then_rate_limited(service):
+    """Test that a burst up to the limit is allowed, then requests are rejected"""
+    now = 1_000_000.0
+    assert service.hit(1, 'free', now)[0]
+    allowed, headers, _ = service.hit(1, 'free', now)
+    assert allowed
+    assert headers['X-RateLimit-Remaining'] == '0'
+    
+    allowed, headers, message = service.hit(1, 'free', now)
+    assert not allowed
+    assert 'Rate limit' in message
+    assert headers['Retry-After'] == '1'
+    
+    # One emission interval later a request is allowed again
+    assert service.hit(1, 'free', now + 0.5)[0]
+
+def test_daily_quota(service):
+    """Test that the daily quota is enforced and resets the next day"""
+    now = 1_000_000.0
+    for i in range(3):
+        allowed, headers, _ = service.hit(1, 'free', now + i)
+        assert allowed
+    assert headers['X-RateLimit-Daily-Remaining'] == '0'
+    
+    allowed, headers, message = service.hit(1, 'free', now + 10)
+    assert not allowed
+    assert 'Daily quota' in message
+    
+    # Rejected requests are not counted, other keys are unaffected
+    assert service.hit(2, 'free', now + 10)[0]
+    assert service.hit(1, 'free', now + 86400)[0]
+
+def test_daily_quota_in_last_second_of_day(service):
+    """Test that counters written just before UTC midnight are not expired at once"""
+    midnight = 12 * 86400.0
+    for now in (midnight - 0.9, midnight - 0.9, midnight - 0.4):
+        assert service.hit(1, 'free', now)[0]
+    
+    allowed, _, message = service.hit(1, 'free', midnight - 0.4)
+    assert not allowed
+    assert 'Daily quota' in message
+
+def test_plan_without_quotas(service):
+    """Test that unlimited quotas are not reported"""
+    allowed, headers, _ = service.hit(1, 'pro', 1_000_000.0)
+    assert allowed
+    assert headers['X-RateLimit-Limit'] == '100'
+    assert 'X-RateLimit-Daily-Remaining' not in headers
+
+def test_sqlite_store_shared_between_instances(tmp_path):
+    """Test that counters in a SQLite store are shared by separate stores"""
+    path = str(tmp_path / 'limits.db')
+    first = make_service(SQLiteStore(path))
+    second = make_service(SQLiteStore(path))
+    now = 1_000_000.0
+    
+    assert first.hit(1, 'free', now)[0]
+    assert second.hit(1, 'free', now)[0]
+    assert not first.hit(1, 'free', now)[0]
+
+def test_expired_counters_purged(service, monkeypatch):
+    """Test that counters of past windows do not accumulate in the store"""
+    if isinstance(service.store, RedisStore):
+        pytest.skip('Redis expires counters itself')
+    monkeypatch.setattr(service.store, 'PURGE_EVERY', 1)
+    now = 1_000_000.0
+    
+    assert service.hit(1, 'free', now)[0]
+    assert len(service.store) == 3
+    
+    # A new day and month: yesterday's counters are dropped, not kept forever
+    assert service.hit(1, 'free', now + 40 * 86400)[0]
+    assert len(service.store) == 3
+
+@patch('app.services.countries_service.requests')
+def test_api_rate_limit_headers_and_429(mock_requests, client):
+    """Test that API responses carry limit headers and excess requests get 429"""
+    mock_requests.get.return_value = MagicMock(json=MagicMock(return_value=[]))
+    headers = {'X-API-Key': client.application.config['TEST_API_KEY']}
+    
+    response = client.get('/api/v1/countries', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['X-RateLimit-Limit'] == '1'
+    assert response.headers['X-RateLimit-Remaining'] == '0'
+    assert response.headers['X-RateLimit-Daily-Remaining'] == '9'
+    
+    response = client.get('/api/v1/countries', headers=headers)
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+    assert response.get_json()['error'] == 'Too many requests'
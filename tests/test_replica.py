@@ -0,0 +1,135 @@
+import sqlite3
+import pytest
+from app import create_app
+from app.config import config
+from app.database import db, read_only, REPLICA_BIND
+from app.models import User, APIKey
+from app.services.auth_service import auth_service
+from tests.test_api import mock_requests
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Create an app on a primary database file with a replica copy of it"""
+    primary = tmp_path / 'primary.db'
+    replica = tmp_path / 'replica.db'
+    monkeypatch.setattr(config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{primary}')
+    monkeypatch.setattr(config, 'DATABASE_REPLICA_URL', f'sqlite:///{replica}')
+    monkeypatch.setattr(config, 'HASH_POOL_SIZE', 0)
+    monkeypatch.setattr(config, 'BCRYPT_LOG_ROUNDS', 4)
+    app = create_app('test')
+    
+    with app.app_context():
+        db.create_all()
+        
+        user = User(username='testuser', email='test@example.com', password='Test123!')
+        db.session.add(user)
+        db.session.commit()
+        
+        api_key = APIKey(user_id=user.id, name='Test Key')
+        db.session.add(api_key)
+        db.session.commit()
+        
+        app.config['TEST_USER_ID'] = user.id
+        app.config['TEST_API_KEY'] = api_key.key_value
+    
+    app.config['PRIMARY_PATH'] = str(primary)
+    app.config['REPLICA_PATH'] = str(replica)
+    replicate(app)
+    return app
+
+def replicate(app):
+    """Bring the replica up to date with the primary"""
+    source = sqlite3.connect(app.config['PRIMARY_PATH'])
+    target = sqlite3.connect(app.config['REPLICA_PATH'])
+    source.backup(target)
+    source.close()
+    target.close()
+
+def execute(path, sql, params=()):
+    """Run a statement directly on one of the database files"""
+    conn = sqlite3.connect(path)
+    with conn:
+        rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+def login(client):
+    response = client.post('/auth/login', json={'username': 'testuser', 'password': 'Test123!'})
+    assert response.status_code == 200
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+def test_session_routes_reads_marked_read_only(app):
+    """Test that only read-only blocks without pending changes use the replica"""
+    with app.app_context():
+        session = db.session()
+        replica = db.get_engine(app, bind=REPLICA_BIND)
+        assert session.get_bind() is db.engine
+        
+        with read_only():
+            assert session.get_bind() is replica
+            with read_only(False):
+                assert session.get_bind() is db.engine
+            
+            # A session that wrote reads its own writes from the primary
+            session.add(APIKey(user_id=app.config['TEST_USER_ID'], name='Pending Key'))
+            assert session.get_bind() is db.engine
+        
+        session.rollback()
+        assert session.get_bind() is db.engine
+
+def test_api_key_lookups_read_from_replica(app, mock_requests):
+    """Test that key lookups and key listings are served by the replica"""
+    client = app.test_client()
+    headers = login(client)
+    
+    # Logging in changed the user; let the replica catch up
+    replicate(app)
+    auth_service.recent_changes.clear()
+    
+    # Visible only to reads that go to the replica
+    execute(app.config['REPLICA_PATH'], "UPDATE api_keys SET name = 'Replica Key'")
+    
+    response = client.get('/user/api-keys', headers=headers)
+    assert response.status_code == 200
+    assert [key['name'] for key in response.get_json()['api_keys']] == ['Replica Key']
+    
+    response = client.get('/api/v1/countries', headers={'X-API-Key': app.config['TEST_API_KEY']})
+    assert response.status_code == 200
+    client.get('/health')
+    
+    # Writes still go to the primary only
+    assert execute(app.config['PRIMARY_PATH'], 'SELECT COUNT(*) FROM api_usage')[0][0] == 1
+    assert execute(app.config['REPLICA_PATH'], 'SELECT COUNT(*) FROM api_usage')[0][0] == 0
+    assert execute(app.config['PRIMARY_PATH'], 'SELECT last_used FROM api_keys')[0][0] is not None
+
+def test_new_key_accepted_before_replication(app, mock_requests):
+    """Test that a key not yet on the replica is looked up on the primary"""
+    client = app.test_client()
+    headers = login(client)
+    
+    response = client.post('/user/api-keys', headers=headers, json={'name': 'New Key'})
+    assert response.status_code == 201
+    new_key = response.get_json()['api_key']['key']
+    
+    # The listing was invalidated; it must not be re-cached from the replica
+    response = client.get('/user/api-keys', headers=headers)
+    assert sorted(key['name'] for key in response.get_json()['api_keys']) == ['New Key', 'Test Key']
+    
+    response = client.get('/api/v1/countries', headers={'X-API-Key': new_key})
+    assert response.status_code == 200
+
+def test_revoked_key_rejected_despite_replica_lag(app, mock_requests):
+    """Test that a key revoked on the primary is refused while the replica still shows it active"""
+    client = app.test_client()
+    headers = {'X-API-Key': app.config['TEST_API_KEY']}
+    assert client.get('/api/v1/countries', headers=headers).status_code == 200
+    client.get('/health')
+    auth_service.recent_changes.clear()
+    
+    with app.app_context():
+        APIKey.query.filter_by(key_value=app.config['TEST_API_KEY']).first().revoke()
+        db.session.commit()
+    assert execute(app.config['REPLICA_PATH'], 'SELECT is_active FROM api_keys')[0][0] == 1
+    
+    response = client.get('/api/v1/countries', headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,34 @@
+import sqlite3
+from app import create_app
+from app.config import config
+from app.database import db, create_schema
+from app.models import User, APIUsage
+
+def test_create_schema_upgrades_existing_tables(tmp_path, monkeypatch):
+    """Test that tables of an earlier release get the columns added since"""
+    path = tmp_path / 'old.db'
+    connection = sqlite3.connect(path)
+    connection.executescript('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY, username VARCHAR(100) NOT NULL UNIQUE,
+            email VARCHAR(120) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL,
+            created_at DATETIME, last_login DATETIME, is_admin BOOLEAN);
+        INSERT INTO users (username, email, password_hash) VALUES ('old', 'old@example.com', 'x');
+        CREATE TABLE api_usage (
+            id INTEGER PRIMARY KEY, api_key_id INTEGER NOT NULL, endpoint VARCHAR(255) NOT NULL,
+            method VARCHAR(10) NOT NULL, timestamp DATETIME, status_code INTEGER NOT NULL,
+            response_time_ms INTEGER, ip_address VARCHAR(45), user_agent VARCHAR(255));
+    ''')
+    connection.close()
+    monkeypatch.setattr(config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{path}')
+    app = create_app('test')
+    
+    create_schema(app)
+    create_schema(app)
+    
+    with app.app_context():
+        assert User.query.filter_by(username='old').first().plan == 'free'
+        assert APIUsage.query.count() == 0
+        assert 'country_changes' in db.inspect(db.engine).get_table_names()
+        db.session.remove()
+        db.engine.dispose()
@@ -1,5 +1,7 @@
 import pytest
+import json
 from datetime import datetime, timedelta
+from sqlalchemy import event
 from app import create_app
 from app.database import db
 from app.models import User, APIKey, APIUsage
@@ -103,6 +105,44 @@ def test_get_api_keys(client):
     # Ensure key value is not included in the response
     assert 'key' not in data['api_keys'][0]
 
+def test_repeated_dashboard_loads_skip_database(client):
+    """Test that cached identities serve profile and key lists without queries"""
+    app = client.application
+    headers = {'Authorization': f"Bearer {app.config['TEST_ACCESS_TOKEN']}"}
+    
+    with app.app_context():
+        engine = db.engine
+    statements = []
+    
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        assert client.get('/user/api-keys', headers=headers).status_code == 200
+        # User and keys are loaded together
+        assert len(statements) <= 2
+        
+        statements.clear()
+        assert client.get('/user/api-keys', headers=headers).status_code == 200
+        assert client.get('/user/profile', headers=headers).status_code == 200
+        assert statements == []
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+def test_key_list_reflects_new_key(client):
+    """Test that creating a key invalidates the cached key list"""
+    app = client.application
+    headers = {'Authorization': f"Bearer {app.config['TEST_ACCESS_TOKEN']}"}
+    
+    assert len(client.get('/user/api-keys', headers=headers).get_json()['api_keys']) == 1
+    
+    response = client.post('/user/api-keys', headers=headers, json={'name': 'Second Key'})
+    assert response.status_code == 201
+    
+    data = client.get('/user/api-keys', headers=headers).get_json()
+    assert [key['name'] for key in data['api_keys']] == ['Test Profile Key', 'Second Key']
+
 def test_create_api_key(client):
     """Test creating a new API key"""
     app = client.application
@@ -246,4 +286,82 @@ def test_revoke_other_users_key(client):
     assert response.status_code == 403
     data = response.get_json()
     assert 'error' in data
-    assert 'Unauthorized' in data['error']
\ No newline at end of file
+    assert 'Unauthorized' in data['error']
+def test_export_api_key_usage_csv(client):
+    """Test exporting API key usage history as CSV"""
+    app = client.application
+    access_token = app.config['TEST_ACCESS_TOKEN']
+    
+    keys_response = client.get(
+        '/user/api-keys',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    key_id = keys_response.get_json()['api_keys'][0]['id']
+    
+    response = client.get(
+        f'/user/api-keys/{key_id}/usage/export',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    
+    # Check response
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).strip().splitlines()
+    assert lines[0].startswith('id,api_key_id,endpoint')
+    assert len(lines) == 2
+    assert '/api/v1/countries' in lines[1]
+
+def test_export_api_key_usage_ndjson_time_range(client):
+    """Test exporting API key usage as NDJSON with a time range"""
+    app = client.application
+    access_token = app.config['TEST_ACCESS_TOKEN']
+    
+    keys_response = client.get(
+        '/user/api-keys',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    key_id = keys_response.get_json()['api_keys'][0]['id']
+    
+    # Rows inside the range are included
+    start = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+    response = client.get(
+        f'/user/api-keys/{key_id}/usage/export?format=ndjson&start={start}',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = response.get_data(as_text=True).strip().splitlines()
+    assert len(rows) == 1
+    assert json.loads(rows[0])['status_code'] == 200
+    
+    # Rows outside the range are excluded
+    end = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+    response = client.get(
+        f'/user/api-keys/{key_id}/usage/export?format=ndjson&end={end}',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == ''
+
+def test_export_api_key_usage_invalid_params(client):
+    """Test exporting API key usage with invalid parameters"""
+    app = client.application
+    access_token = app.config['TEST_ACCESS_TOKEN']
+    
+    response = client.get(
+        '/user/api-keys/1/usage/export?format=xml',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    assert response.status_code == 400
+    
+    response = client.get(
+        '/user/api-keys/1/usage/export?start=yesterday',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    assert response.status_code == 400
+    
+    response = client.get(
+        '/user/api-keys/999999/usage/export',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    assert response.status_code == 404
@@ -0,0 +1,29 @@
+"""
+Production WSGI entry point
+    
+    gunicorn -c gunicorn.conf.py
+    uwsgi --http :5000 --master --processes 4 --module wsgi:app
+
+The app is created with the production configuration (unless FLASK_ENV
+says otherwise) and preloaded, so pre-fork servers share it with their
+workers. Under uWSGI, the same per-worker setup and graceful shutdown as
+in gunicorn.conf.py are registered here.
+"""
+import os
+
+os.environ.setdefault('FLASK_ENV', 'prod')
+
+from app.prefork import create_prefork_app, post_fork, shutdown
+
+app = create_prefork_app(os.environ['FLASK_ENV'])
+
+try:
+    # Only importable inside a uWSGI process
+    import uwsgi
+    from uwsgidecorators import postfork
+except ImportError:
+    uwsgi = None
+
+if uwsgi is not None:
+    postfork(lambda: post_fork(app))
+    uwsgi.atexit = lambda: shutdown(app)